@@ -0,0 +1,116 @@
+"""
+Замер скорости построения отчета /stats по тому же пути, что и обработчик send_stats:
+загрузка профиля, получение истории за период (основное хранилище и, если период
+старше HISTORY_HOT_DAYS, холодный архив), построение и форматирование отчета.
+
+Пользователь с историей сохраняется в базу SQLite во временном каталоге.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_stats --days 90 --history 365
+"""
+import os
+import sys
+import time
+import asyncio
+import argparse
+import statistics
+import tempfile
+from datetime import date, timedelta
+from typing import Dict
+
+import numpy as np
+
+TELEGRAM_ID = "1"
+
+
+def configure_environment(workdir: str) -> None:
+    """
+    Направляет данные и логи бота во временный каталог. Вызывается до импорта модулей бота,
+    потому что настройки читаются из окружения при импорте.
+    """
+    os.environ.setdefault("BOT_TOKEN", "123456:BENCH")
+    os.environ.setdefault("ADMIN_ID", "1")
+    os.environ.update({
+        "STORAGE_BACKEND": "sqlite",
+        "SQLITE_PATH": os.path.join(workdir, "users.sqlite3"),
+        "ARCHIVE_DIR": os.path.join(workdir, "archive"),
+        "LOG_FILE": os.path.join(workdir, "bot.log"),
+        "TRACE_FILE": os.path.join(workdir, "trace.log"),
+        "LOG_CONSOLE_LEVEL": "ERROR",
+    })
+
+
+def make_series(days: int, end: date, seed: int = 0):
+    """
+    Создает ряды со случайными данными за days дней, заканчивая датой end.
+
+    :param days: Количество дней.
+    :param end: Последний день.
+    :param seed: Зерно генератора случайных чисел.
+    :return: Ряды пользователя.
+    """
+    # pylint: disable=import-outside-toplevel
+    from core.tools.day_series import METRICS, HOURS, DaySeries
+
+    rng = np.random.default_rng(seed)
+    dates = [str(end - timedelta(days=offset)) for offset in range(days - 1, -1, -1)]
+    data = rng.integers(0, 300, size=(days, len(METRICS), HOURS), dtype=np.int32)
+    return DaySeries(dates, data)
+
+
+async def bench(days: int, history: int, repeat: int) -> Dict[str, float]:
+    """
+    Замеряет отчет за days дней у пользователя с историей за history дней.
+
+    :param days: Длительность отчета в днях.
+    :param history: Сколько дней истории хранится у пользователя.
+    :param repeat: Количество повторов.
+    :return: Медианное время в миллисекундах: всего пути обработчика (total),
+             загрузки пользователя и истории (load) и построения отчета (report).
+    """
+    # pylint: disable=import-outside-toplevel
+    from core.tools.users import User, UserStorage
+    from core.tools.stats import build_report, format_report
+
+    today = date.today()
+    start = today - timedelta(days=days - 1)
+    UserStorage()
+    user = User(telegram_id=int(TELEGRAM_ID), weight=70, height=180, age=30, activity=30, city="Moscow")
+    user.days = make_series(history, today)
+    # Дни старше HISTORY_HOT_DAYS переносятся в архив, как в работающем боте
+    UserStorage.put_user(user)
+
+    timings: Dict[str, list] = {"total": [], "load": [], "report": []}
+    try:
+        for _ in range(repeat):
+            started = time.perf_counter()
+            profile = await UserStorage.aget_user_days(TELEGRAM_ID, days=[])
+            series = await UserStorage.get_history(TELEGRAM_ID, str(start), str(today))
+            loaded = time.perf_counter()
+            report = build_report(series, start, days, profile.calc_base_water_goal(), profile.calc_calorie_goal())
+            format_report(report, "Статистика")
+            finished = time.perf_counter()
+            timings["total"].append((finished - started) * 1000)
+            timings["load"].append((loaded - started) * 1000)
+            timings["report"].append((finished - loaded) * 1000)
+    finally:
+        await UserStorage.close()
+    return {name: statistics.median(values) for name, values in timings.items()}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Замер скорости построения отчета /stats")
+    parser.add_argument("--days", type=int, default=90, help="длительность отчета в днях")
+    parser.add_argument("--history", type=int, default=365, help="дней истории у пользователя")
+    parser.add_argument("--repeat", type=int, default=1000)
+    parser.add_argument("--max-ms", type=float, default=5.0, help="допустимое медианное время всего пути")
+    args = parser.parse_args()
+    configure_environment(tempfile.mkdtemp(prefix="fitness_bot_bench_stats_"))
+    medians = asyncio.run(bench(args.days, args.history, args.repeat))
+    print(
+        f"Отчет за {args.days} дн. (история {args.history} дн.): медиана {medians['total']:.3f} мс "
+        f"(загрузка {medians['load']:.3f} мс, отчет {medians['report']:.3f} мс)"
+    )
+    if medians["total"] > args.max_ms:
+        print(f"Медиана превышает {args.max_ms} мс")
+        sys.exit(1)
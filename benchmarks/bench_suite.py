@@ -0,0 +1,476 @@
+"""
+Набор повторяемых замеров горячих путей бота с сохранением результатов в JSON.
+
+Замеряются:
+    - UserStorage.get_user, get_user_days и put_user;
+    - User.calc_calorie_goal;
+    - переход на новый день (User.add_day) у пользователя с историей;
+    - графики plot_water и plot_food: отрисовка в пуле (кэш графиков сброшен)
+      и ответ из кэша графиков.
+
+Хранилище заполняется профилями --users пользователей (по умолчанию 1 тыс., 100 тыс.
+и 1 млн), а полная история за --days дней (по умолчанию 30 и 365) записывается
+выборке из --sample пользователей, с которой и выполняются замеры: история каждого
+пользователя на 365 дней занимает около 140 КБ, и у 1 млн пользователей не уместилась бы
+на диске. Данные пишутся во временный каталог.
+
+Результаты сохраняются в JSON (--output). Если передан --baseline (JSON прошлого запуска),
+медианы сравниваются с ним, и при замедлении больше --tolerance скрипт завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python -m benchmarks.bench_suite --users 1000,100000 --days 30,365 --output bench.json
+    python -m benchmarks.bench_suite --baseline bench.json --output bench-new.json
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import argparse
+import platform
+import subprocess
+import tempfile
+from datetime import date, datetime, timedelta, timezone
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+
+import numpy as np
+
+# Сколько профилей записывается в хранилище одной транзакцией при заполнении
+SEED_CHUNK = 10000
+
+
+def parse_list(value: str) -> List[int]:
+    """
+    Разбирает список чисел через запятую.
+
+    :param value: Строка вида 1000,100000.
+    :return: Список чисел.
+    """
+    return [int(part) for part in value.split(",") if part.strip()]
+
+
+def configure_environment(args: argparse.Namespace, workdir: str) -> None:
+    """
+    Направляет данные и логи бота во временный каталог. Вызывается до импорта модулей бота,
+    потому что настройки читаются из окружения при импорте.
+    """
+    os.environ.setdefault("BOT_TOKEN", "123456:BENCH")
+    os.environ.setdefault("ADMIN_ID", "1")
+    os.environ.update({
+        "STORAGE_BACKEND": args.backend,
+        "HISTORY_HOT_DAYS": str(args.hot_days),
+        "ARCHIVE_DIR": os.path.join(workdir, "archive"),
+        "FSM_DB_PATH": os.path.join(workdir, "fsm.sqlite3"),
+        "FOOD_CACHE_PATH": os.path.join(workdir, "food_cache.json"),
+        "FOOD_INDEX_PATH": os.path.join(workdir, "food_index.npz"),
+        "LOG_FILE": os.path.join(workdir, "bot.log"),
+        "TRACE_FILE": os.path.join(workdir, "trace.log"),
+        "LOG_CONSOLE_LEVEL": "ERROR",
+    })
+
+
+def summarize(timings: List[float], params: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Считает статистику замера.
+
+    :param timings: Время повторов в секундах.
+    :param params: Параметры замера (количество пользователей, дней истории).
+    :return: Медиана, 90-й перцентиль и минимум в миллисекундах.
+    """
+    values = np.array(timings) * 1000
+    return {
+        "params": params,
+        "repeat": len(timings),
+        "median_ms": round(float(np.median(values)), 4),
+        "p90_ms": round(float(np.percentile(values, 90)), 4),
+        "min_ms": round(float(values.min()), 4),
+    }
+
+
+class Suite:
+    """
+    Выполняет замеры и накапливает результаты.
+
+    Атрибуты:
+        results (Dict[str, Dict[str, Any]]): Результаты по названию замера
+                                             вида storage.get_user[users=1000,days=30].
+    """
+
+    def __init__(self, repeat: int, only: Optional[str] = None):
+        """
+        :param repeat: Количество повторов каждого замера.
+        :param only: Подстрока названия: если задана, выполняются только подходящие замеры.
+        """
+        self.repeat = repeat
+        self.only = only
+        self.results: Dict[str, Dict[str, Any]] = {}
+
+    @staticmethod
+    def name(base: str, params: Dict[str, Any]) -> str:
+        if not params:
+            return base
+        return f"{base}[{','.join(f'{key}={value}' for key, value in params.items())}]"
+
+    def wanted(self, base: str) -> bool:
+        return self.only is None or self.only in base
+
+    def _record(self, base: str, params: Dict[str, Any], timings: List[float]) -> None:
+        name = self.name(base, params)
+        self.results[name] = summarize(timings, params)
+        print(f"{name:<60} медиана {self.results[name]['median_ms']:>10.4f} мс"
+              f"   p90 {self.results[name]['p90_ms']:>10.4f} мс", flush=True)
+
+    def run(
+        self,
+        base: str,
+        func: Callable[[Any], Any],
+        params: Optional[Dict[str, Any]] = None,
+        setup: Optional[Callable[[int], Any]] = None,
+        repeat: Optional[int] = None,
+    ) -> None:
+        """
+        Замеряет синхронную функцию.
+
+        :param base: Название замера.
+        :param func: Замеряемая функция; получает результат setup.
+        :param params: Параметры замера.
+        :param setup: Подготовка повтора (не входит в замер); получает номер повтора.
+        :param repeat: Количество повторов, по умолчанию общее для набора.
+        """
+        if not self.wanted(base):
+            return
+        timings = []
+        for index in range(repeat or self.repeat):
+            arg = setup(index) if setup is not None else None
+            started = time.perf_counter()
+            func(arg)
+            timings.append(time.perf_counter() - started)
+        self._record(base, params or {}, timings)
+
+    async def run_async(
+        self,
+        base: str,
+        func: Callable[[Any], Awaitable[Any]],
+        params: Optional[Dict[str, Any]] = None,
+        setup: Optional[Callable[[int], Any]] = None,
+        repeat: Optional[int] = None,
+    ) -> None:
+        """
+        Замеряет корутину. Параметры такие же, как у run.
+        """
+        if not self.wanted(base):
+            return
+        timings = []
+        for index in range(repeat or self.repeat):
+            arg = setup(index) if setup is not None else None
+            started = time.perf_counter()
+            await func(arg)
+            timings.append(time.perf_counter() - started)
+        self._record(base, params or {}, timings)
+
+
+def make_history(days: int, end: date, rng: np.random.Generator) -> Any:
+    """
+    Создает ряды со случайными данными за days дней, заканчивая датой end.
+
+    :param days: Количество дней.
+    :param end: Последний день.
+    :param rng: Генератор случайных чисел.
+    :return: Ряды пользователя (DaySeries).
+    """
+    # pylint: disable=import-outside-toplevel
+    from core.tools.day_series import METRICS, HOURS, DaySeries
+
+    dates = [str(end - timedelta(days=offset)) for offset in range(days - 1, -1, -1)]
+    data = rng.integers(0, 300, size=(days, len(METRICS), HOURS), dtype=np.int32)
+    return DaySeries(dates, data)
+
+
+def make_user(telegram_id: int, rng: np.random.Generator, days: Any = None) -> Any:
+    """
+    Создает пользователя со случайным профилем и нормами, рассчитанными на сегодня,
+    чтобы графики не запрашивали погоду.
+
+    :param telegram_id: Идентификатор пользователя.
+    :param rng: Генератор случайных чисел.
+    :param days: Ряды пользователя (DaySeries), по умолчанию пустые.
+    :return: Пользователь.
+    """
+    # pylint: disable=import-outside-toplevel
+    from core.tools.users import User
+
+    user = User(
+        telegram_id=telegram_id,
+        weight=int(rng.integers(45, 120)),
+        height=int(rng.integers(150, 200)),
+        age=int(rng.integers(18, 70)),
+        activity=int(rng.integers(0, 120)),
+        city="Moscow",
+    )
+    if days is not None:
+        user.days = days
+    user.water_goal = user.calc_base_water_goal()
+    user.calorie_goal = user.calc_calorie_goal()
+    user.goals_day = str(date.today())
+    return user
+
+
+def create_backend(kind: str, workdir: str, users: int) -> Any:
+    """
+    Создает пустой бэкенд хранилища для заданного масштаба.
+
+    :param kind: Бэкенд: sqlite или sharded.
+    :param workdir: Временный каталог.
+    :param users: Количество пользователей (входит в имя файла или каталога).
+    :return: Бэкенд хранилища.
+    """
+    # pylint: disable=import-outside-toplevel
+    from core.tools.storage import ShardedBackend, SqliteBackend
+
+    if kind == "sqlite":
+        return SqliteBackend(os.path.join(workdir, f"users-{users}.sqlite3"))
+    return ShardedBackend(os.path.join(workdir, f"users-{users}"))
+
+
+def seed_profiles(backend: Any, users: int, rng: np.random.Generator) -> float:
+    """
+    Записывает в хранилище профили пользователей без истории.
+
+    :param backend: Бэкенд хранилища.
+    :param users: Количество пользователей; идентификаторы от 1 до users.
+    :param rng: Генератор случайных чисел.
+    :return: Время заполнения в секундах.
+    """
+    started = time.perf_counter()
+    for first in range(1, users + 1, SEED_CHUNK):
+        last = min(first + SEED_CHUNK, users + 1)
+        backend.save_many([make_user(telegram_id, rng) for telegram_id in range(first, last)])
+    return time.perf_counter() - started
+
+
+async def bench_user_model(suite: Suite, history: List[int], rng: np.random.Generator) -> None:
+    """
+    Замеряет расчет нормы калорий и переход на новый день.
+
+    :param suite: Набор замеров.
+    :param history: Варианты длины истории в днях.
+    :param rng: Генератор случайных чисел.
+    """
+    user = make_user(1, rng)
+    suite.run("user.calc_calorie_goal", lambda _: user.calc_calorie_goal(), repeat=suite.repeat * 100)
+
+    yesterday = date.today() - timedelta(days=1)
+    for days in history:
+        base = make_history(days, yesterday, rng)
+        # Каждый повтор получает свою копию пользователя, у которой сегодняшнего дня еще нет
+        await suite.run_async(
+            "user.add_day",
+            lambda target: target.add_day(),
+            {"days": days},
+            setup=lambda _: make_user(1, rng, base.copy()),
+        )
+        suite.run(
+            "day_series.add_day",
+            lambda series: series.add_day(str(date.today())),
+            {"days": days},
+            setup=lambda _: base.copy(),
+        )
+
+
+async def bench_scale(
+    suite: Suite,
+    backend: Any,
+    users: int,
+    days: int,
+    sample: int,
+    rng: np.random.Generator,
+) -> None:
+    """
+    Замеряет хранилище и графики на выборке пользователей с историей за days дней.
+
+    :param suite: Набор замеров.
+    :param backend: Заполненный профилями бэкенд хранилища.
+    :param users: Количество пользователей в хранилище.
+    :param days: Длина истории выборки в днях.
+    :param sample: Размер выборки.
+    :param rng: Генератор случайных чисел.
+    """
+    # pylint: disable=import-outside-toplevel
+    from core.tools.plots import chart_cache, plot_food, plot_water
+    from core.tools.users import UserStorage
+
+    UserStorage(backend)
+    params = {"users": users, "days": days}
+    # Выборка равномерно распределена по идентификаторам, чтобы чтения не попадали в одну область базы
+    ids = [str(int(telegram_id)) for telegram_id in np.linspace(1, users, min(sample, users), dtype=np.int64)]
+    today = date.today()
+    for telegram_id in ids:
+        backend.save_many([make_user(int(telegram_id), rng, make_history(days, today, rng))])
+
+    def pick(index: int) -> str:
+        return ids[index % len(ids)]
+
+    suite.run("storage.get_user", UserStorage.get_user, params, setup=pick)
+    suite.run("storage.get_user_days", UserStorage.get_user_days, params, setup=pick)
+
+    loaded = {telegram_id: UserStorage.get_user(telegram_id) for telegram_id in ids}
+    hour = datetime.now().replace(minute=0, second=0, microsecond=0)
+
+    def changed_user(index: int) -> Any:
+        # Запись одного значения за сегодня: меняется только последний день
+        user = loaded[pick(index)]
+        user.record("logged_water", 250, hour)
+        return user
+
+    suite.run("storage.put_user", UserStorage.put_user, params, setup=changed_user)
+
+    def changed_user_days(index: int) -> Any:
+        user = UserStorage.get_user_days(pick(index))
+        user.record("logged_water", 250, hour)
+        return user
+
+    suite.run("storage.put_user_days", UserStorage.put_user, params, setup=changed_user_days)
+
+    def uncached(index: int) -> int:
+        telegram_id = pick(index)
+        chart_cache.invalidate(telegram_id)
+        return int(telegram_id)
+
+    await suite.run_async("plots.plot_water", plot_water, params, setup=uncached)
+    await suite.run_async("plots.plot_food", plot_food, params, setup=uncached)
+
+    # Повторный запрос тех же графиков без изменений данных отдается из кэша
+    cached_id = int(ids[0])
+    await plot_water(cached_id)
+    await plot_food(cached_id)
+    await suite.run_async("plots.plot_water_cached", plot_water, params, setup=lambda _: cached_id)
+    await suite.run_async("plots.plot_food_cached", plot_food, params, setup=lambda _: cached_id)
+
+
+def metadata(args: argparse.Namespace) -> Dict[str, Any]:
+    """
+    Собирает сведения об окружении запуска, без которых результаты нельзя сравнивать.
+
+    :param args: Аргументы командной строки.
+    :return: Словарь со сведениями о запуске.
+    """
+    try:
+        commit = subprocess.run(
+            ["git", "rev-parse", "HEAD"], capture_output=True, text=True, check=True, timeout=10,
+        ).stdout.strip()
+    except (OSError, subprocess.SubprocessError):
+        commit = None
+    return {
+        "time": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "commit": commit,
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "config": {
+            "users": args.users,
+            "days": args.days,
+            "sample": args.sample,
+            "repeat": args.repeat,
+            "backend": args.backend,
+            "hot_days": args.hot_days,
+            "seed": args.seed,
+        },
+    }
+
+
+def compare(
+    results: Dict[str, Dict[str, Any]],
+    baseline: Dict[str, Dict[str, Any]],
+    tolerance: float,
+    min_delta_ms: float,
+) -> List[str]:
+    """
+    Сравнивает медианы с базовым запуском.
+
+    :param results: Результаты текущего запуска.
+    :param baseline: Результаты базового запуска.
+    :param tolerance: Допустимое относительное замедление (0.2 — на 20%).
+    :param min_delta_ms: Замедление меньше этого значения не считается регрессией,
+                         чтобы шум не срабатывал на замерах в микросекунды.
+    :return: Названия замеров, которые замедлились.
+    """
+    regressions = []
+    print()
+    print(f"{'Замер':<60} {'база, мс':>10} {'сейчас, мс':>11} {'изм.':>8}")
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            print(f"{name:<60} {'—':>10} {result['median_ms']:>11.4f}   нет в базе")
+            continue
+        before, after = base["median_ms"], result["median_ms"]
+        change = after / before - 1 if before else 0.0
+        regressed = change > tolerance and after - before > min_delta_ms
+        mark = "  РЕГРЕССИЯ" if regressed else ""
+        print(f"{name:<60} {before:>10.4f} {after:>11.4f} {change:>+8.1%}{mark}")
+        if regressed:
+            regressions.append(name)
+    return regressions
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    workdir = tempfile.mkdtemp(prefix="fitness_bot_bench_")
+    configure_environment(args, workdir)
+
+    # pylint: disable=import-outside-toplevel
+    from core.tools.render_pool import render_pool
+
+    rng = np.random.default_rng(args.seed)
+    suite = Suite(args.repeat, args.only)
+    seeding: Dict[str, float] = {}
+    await render_pool.start()
+    try:
+        await bench_user_model(suite, args.days, rng)
+        for users in args.users:
+            backend = create_backend(args.backend, workdir, users)
+            try:
+                seeding[str(users)] = round(seed_profiles(backend, users, rng), 2)
+                print(f"Заполнено {users} профилей за {seeding[str(users)]} с", flush=True)
+                for days in args.days:
+                    await bench_scale(suite, backend, users, days, args.sample, rng)
+            finally:
+                backend.close()
+    finally:
+        render_pool.close()
+    meta = metadata(args)
+    meta["seed_seconds"] = seeding
+    return {"meta": meta, "results": suite.results}
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Повторяемые замеры хранилища, модели пользователя и графиков")
+    parser.add_argument("--users", type=parse_list, default=[1000, 100000, 1000000],
+                        help="количество пользователей в хранилище через запятую")
+    parser.add_argument("--days", type=parse_list, default=[30, 365],
+                        help="длина истории выборки в днях через запятую")
+    parser.add_argument("--sample", type=int, default=100, help="пользователей с историей в выборке")
+    parser.add_argument("--repeat", type=int, default=200, help="повторов каждого замера")
+    parser.add_argument("--backend", choices=("sqlite", "sharded"), default="sqlite")
+    parser.add_argument("--hot-days", type=int, default=0,
+                        help="HISTORY_HOT_DAYS; 0 — вся история хранится вместе с профилем")
+    parser.add_argument("--only", help="выполнить только замеры, в названии которых есть подстрока")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="файл для результатов в JSON")
+    parser.add_argument("--baseline", help="JSON прошлого запуска для сравнения")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="допустимое замедление медианы (0.2 — 20%%)")
+    parser.add_argument("--min-delta-ms", type=float, default=0.05,
+                        help="замедление меньше этого значения в мс не считается регрессией")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"Результаты записаны в {args.output}")
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report["results"], baseline["results"], args.tolerance, args.min_delta_ms)
+        if regressions:
+            print(f"Замедлились замеры: {len(regressions)}")
+            sys.exit(1)
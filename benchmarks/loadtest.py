@@ -0,0 +1,466 @@
+"""
+Нагрузочный тест бота: поток обновлений через Dispatcher.feed_update.
+
+Виртуальные пользователи заполняют профиль (/set_profile), а затем в случайном
+порядке записывают воду, еду и тренировки, смотрят прогресс, графики и /stats.
+Запросы к Telegram не отправляются: сессия бота заменена заглушкой. OpenWeatherMap,
+OpenFoodFacts и Yandex GPT заменены локальными серверами с заданной задержкой.
+Данные бота пишутся во временный каталог.
+
+Ошибкой считается исключение, с которым завершилась обработка обновления, или
+необработанное исключение фоновой задачи. Если ошибок больше --max-errors
+(по умолчанию 0), тест завершается с кодом 1.
+
+Запуск из корня репозитория:
+    python -m benchmarks.loadtest --users 200 --duration 30
+"""
+import os
+import re
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+import tempfile
+from collections import Counter, defaultdict
+from typing import Any, AsyncGenerator, Dict, List, Optional, Tuple, Union, get_args
+
+import numpy as np
+from aiohttp import web
+from aiogram import Bot
+from aiogram.client.session.base import BaseSession
+from aiogram.methods import TelegramMethod
+from aiogram.types import Message, Update
+
+# Продукты с калорийностью, которые «знает» заглушка OpenFoodFacts
+KNOWN_FOODS = {
+    "гречка": 110,
+    "овсянка": 88,
+    "курица": 190,
+    "банан": 96,
+    "яблоко": 52,
+    "творог": 121,
+    "рис": 130,
+    "омлет": 154,
+}
+
+# Сценарии и их доли после заполнения профиля
+SCENARIOS = {
+    "log_water": 0.30,
+    "log_food": 0.25,
+    "check_progress": 0.20,
+    "plot": 0.10,
+    "log_workout": 0.10,
+    "stats": 0.05,
+}
+
+_BATCH_LINE = re.compile(r"^\s*(\d+)\s*:", re.MULTILINE)
+
+
+class StubSession(BaseSession):
+    """
+    Сессия бота, которая не обращается к Telegram, а сразу возвращает правдоподобный ответ.
+
+    Атрибуты:
+        calls (Counter): Количество вызовов каждого метода Bot API.
+    """
+
+    def __init__(self, latency: float = 0.0):
+        """
+        :param latency: Имитация времени ответа Telegram в секундах.
+        """
+        super().__init__()
+        self.latency = latency
+        self.calls: Counter = Counter()
+        self._message_id = 0
+
+    async def make_request(self, bot: Bot, method: TelegramMethod[Any], timeout: Optional[int] = None) -> Any:
+        self.calls[type(method).__name__] += 1
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        returning = method.__returning__
+        if returning is Message or Message in get_args(returning):
+            self._message_id += 1
+            chat_id = getattr(method, "chat_id", None) or 0
+            return Message.model_validate(
+                {
+                    "message_id": self._message_id,
+                    "date": int(time.time()),
+                    "chat": {"id": chat_id, "type": "private"},
+                },
+                context={"bot": bot},
+            )
+        return True
+
+    async def stream_content(  # pylint: disable=arguments-differ
+        self, *args: Any, **kwargs: Any
+    ) -> AsyncGenerator[bytes, None]:
+        # Бот в тесте не скачивает файлы: содержимое пустое
+        for chunk in ():
+            yield chunk
+
+    async def close(self) -> None:
+        pass
+
+
+class Upstreams:
+    """
+    Локальные заглушки OpenWeatherMap, OpenFoodFacts и Yandex GPT с заданной задержкой.
+
+    Атрибуты:
+        requests (Counter): Количество запросов к каждому сервису.
+    """
+
+    def __init__(self, weather_latency: float, food_latency: float, llm_latency: float):
+        self.latency = {"openweathermap": weather_latency, "openfoodfacts": food_latency, "yandex_gpt": llm_latency}
+        self.requests: Counter = Counter()
+        self.app = web.Application()
+        self.app.router.add_get("/data/2.5/weather", self._weather)
+        self.app.router.add_get("/cgi/search.pl", self._food)
+        self.app.router.add_post("/foundationModels/v1/completion", self._llm)
+        self._runner: Optional[web.AppRunner] = None
+
+    async def _delay(self, service: str) -> None:
+        self.requests[service] += 1
+        await asyncio.sleep(self.latency[service])
+
+    async def _weather(self, request: web.Request) -> web.Response:
+        await self._delay("openweathermap")
+        return web.json_response({"main": {"temp": 20 + hash(request.query.get("q")) % 10}})
+
+    async def _food(self, request: web.Request) -> web.Response:
+        await self._delay("openfoodfacts")
+        name = request.query.get("search_terms", "").lower()
+        products = [
+            {"product_name": food, "nutriments": {"energy-kcal_100g": calories}}
+            for food, calories in KNOWN_FOODS.items()
+            if food in name
+        ]
+        return web.json_response({"products": products})
+
+    async def _llm(self, request: web.Request) -> web.Response:
+        await self._delay("yandex_gpt")
+        body = await request.json()
+        text = body["messages"][-1]["text"]
+        numbers = _BATCH_LINE.findall(text)
+        answer = "\n".join(f"{number}: 100" for number in numbers) if numbers else "100"
+        return web.json_response({"result": {"alternatives": [{"message": {"text": answer}}]}})
+
+    async def start(self) -> str:
+        """
+        Запускает заглушки на свободном порту.
+
+        :return: Базовый URL заглушек.
+        """
+        self._runner = web.AppRunner(self.app, access_log=None)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, "127.0.0.1", 0)
+        await site.start()
+        port = site._server.sockets[0].getsockname()[1]  # pylint: disable=protected-access
+        return f"http://127.0.0.1:{port}"
+
+    async def stop(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+
+
+class UpdateFactory:
+    """
+    Создает обновления Telegram от имени виртуальных пользователей.
+    """
+
+    def __init__(self, bot: Bot):
+        self.bot = bot
+        self._update_id = 0
+
+    def _next_id(self) -> int:
+        self._update_id += 1
+        return self._update_id
+
+    @staticmethod
+    def _user(user_id: int) -> Dict[str, Any]:
+        return {"id": user_id, "is_bot": False, "first_name": f"Load{user_id}"}
+
+    def message(self, user_id: int, text: str) -> Update:
+        update_id = self._next_id()
+        return Update.model_validate(
+            {
+                "update_id": update_id,
+                "message": {
+                    "message_id": update_id,
+                    "date": int(time.time()),
+                    "chat": {"id": user_id, "type": "private"},
+                    "from": self._user(user_id),
+                    "text": text,
+                },
+            },
+            context={"bot": self.bot},
+        )
+
+    def callback(self, user_id: int, data: str) -> Update:
+        update_id = self._next_id()
+        return Update.model_validate(
+            {
+                "update_id": update_id,
+                "callback_query": {
+                    "id": str(update_id),
+                    "chat_instance": "loadtest",
+                    "from": self._user(user_id),
+                    "data": data,
+                    "message": {
+                        "message_id": update_id,
+                        "date": int(time.time()),
+                        "chat": {"id": user_id, "type": "private"},
+                        "text": "keyboard",
+                    },
+                },
+            },
+            context={"bot": self.bot},
+        )
+
+
+# Шаг сценария: название для отчета и обновление (текст сообщения или данные кнопки)
+Step = Tuple[str, Union[str, Tuple[str, str]]]
+
+
+def profile_steps(rng: random.Random) -> List[Step]:
+    return [
+        ("set_profile", "/set_profile"),
+        ("set_profile:weight", str(rng.randint(50, 110))),
+        ("set_profile:height", str(rng.randint(150, 200))),
+        ("set_profile:age", str(rng.randint(18, 70))),
+        ("set_profile:activity", str(rng.randint(0, 120))),
+        ("set_profile:city", rng.choice(["Москва", "Казань", "Сочи", "Омск"])),
+    ]
+
+
+def scenario_steps(name: str, rng: random.Random, unique_food_ratio: float) -> List[Step]:
+    """
+    Возвращает шаги сценария.
+
+    :param name: Сценарий из SCENARIOS.
+    :param rng: Генератор случайных чисел виртуального пользователя.
+    :param unique_food_ratio: Доля продуктов, которых нет ни в кэше, ни в OpenFoodFacts.
+    :return: Шаги сценария.
+    """
+    if name == "log_water":
+        return [("log_water", "/log_water"), ("log_water:volume", str(rng.randint(100, 500)))]
+    if name == "log_food":
+        if rng.random() < unique_food_ratio:
+            food = f"блюдо {rng.randrange(10 ** 9)}"
+        else:
+            food = rng.choice(list(KNOWN_FOODS))
+        return [("log_food", "/log_food"), ("log_food:name", food), ("log_food:weight", str(rng.randint(50, 400)))]
+    if name == "log_workout":
+        return [
+            ("log_workout", "/log_workout"),
+            ("log_workout:type", rng.choice(["бег", "плавание", "йога"])),
+            ("log_workout:duration", str(rng.randint(10, 90))),
+        ]
+    if name == "check_progress":
+        return [("check_progress", "/check_progress")]
+    if name == "plot":
+        data = rng.choice(["plot_water", "plot_food"])
+        return [(data, ("callback", data))]
+    if name == "stats":
+        return [("stats", "/stats"), ("stats_week", ("callback", "stats_week"))]
+    raise ValueError(f"Неизвестный сценарий: {name}")
+
+
+class LoadTest:
+    """
+    Виртуальные пользователи, которые отправляют обновления в диспетчер и замеряют время их обработки.
+
+    Обновления одного пользователя отправляются по очереди (как в Telegram), пользователи
+    работают параллельно.
+    """
+
+    def __init__(self, dispatcher: Any, bot: Bot, args: argparse.Namespace):
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.args = args
+        self.factory = UpdateFactory(bot)
+        self.latencies: Dict[str, List[float]] = defaultdict(list)
+        self.errors: Counter = Counter()
+
+    async def _feed(self, user_id: int, step: Step) -> None:
+        name, payload = step
+        if isinstance(payload, tuple):
+            update = self.factory.callback(user_id, payload[1])
+        else:
+            update = self.factory.message(user_id, payload)
+        started = time.perf_counter()
+        try:
+            await self.dispatcher.feed_update(self.bot, update)
+        except Exception as e:  # pylint: disable=broad-except
+            self.errors[f"{name}: {type(e).__name__}"] += 1
+        self.latencies[name].append(time.perf_counter() - started)
+
+    async def _user(self, user_id: int, deadline: float) -> None:
+        rng = random.Random(self.args.seed * 1_000_003 + user_id)
+        names, weights = list(SCENARIOS), list(SCENARIOS.values())
+        steps = profile_steps(rng)
+        while time.perf_counter() < deadline:
+            for step in steps:
+                if time.perf_counter() >= deadline:
+                    return
+                await self._feed(user_id, step)
+                if self.args.think_time:
+                    await asyncio.sleep(rng.expovariate(1 / self.args.think_time))
+            steps = scenario_steps(rng.choices(names, weights)[0], rng, self.args.unique_food_ratio)
+
+    async def run(self) -> float:
+        """
+        Запускает виртуальных пользователей на duration секунд.
+
+        :return: Фактическая длительность теста в секундах.
+        """
+        loop = asyncio.get_running_loop()
+        loop.set_exception_handler(self._background_error)
+        started = time.perf_counter()
+        deadline = started + self.args.duration
+        base = 10 ** 6
+        try:
+            await asyncio.gather(*(self._user(base + index, deadline) for index in range(self.args.users)))
+        finally:
+            loop.set_exception_handler(None)
+        return time.perf_counter() - started
+
+    def _background_error(self, loop: asyncio.AbstractEventLoop, context: Dict[str, Any]) -> None:
+        """
+        Считает необработанные исключения фоновых задач, которые не доходят до feed_update.
+        """
+        exception = context.get("exception")
+        self.errors[f"background: {type(exception).__name__ if exception else context.get('message')}"] += 1
+        loop.default_exception_handler(context)
+
+
+def _percentiles(values: List[float]) -> Dict[str, float]:
+    array = np.array(values) * 1000
+    p50, p90, p99 = np.percentile(array, [50, 90, 99])
+    return {"count": len(values), "p50_ms": p50, "p90_ms": p90, "p99_ms": p99, "max_ms": array.max()}
+
+
+def build_report(test: LoadTest, elapsed: float, session: StubSession, upstreams: Upstreams) -> Dict[str, Any]:
+    """
+    Собирает результаты теста.
+
+    :return: Пропускная способность, перцентили времени обработки (всего и по шагам),
+             ошибки, вызовы Bot API и запросы к внешним сервисам.
+    """
+    all_latencies = [value for values in test.latencies.values() for value in values]
+    return {
+        "users": test.args.users,
+        "duration_s": elapsed,
+        "updates": len(all_latencies),
+        "throughput_per_s": len(all_latencies) / elapsed,
+        "latency": _percentiles(all_latencies),
+        "steps": {name: _percentiles(values) for name, values in sorted(test.latencies.items())},
+        "errors": dict(test.errors),
+        "telegram_calls": dict(session.calls),
+        "upstream_requests": dict(upstreams.requests),
+    }
+
+
+def print_report(report: Dict[str, Any]) -> None:
+    latency = report["latency"]
+    print(
+        f"Пользователей: {report['users']}, обновлений: {report['updates']} за {report['duration_s']:.1f} с — "
+        f"{report['throughput_per_s']:.1f} обн./с"
+    )
+    print(f"Время обработки: p50 {latency['p50_ms']:.1f} мс, p99 {latency['p99_ms']:.1f} мс, "
+          f"макс. {latency['max_ms']:.1f} мс")
+    print(f"{'шаг':<24}{'кол-во':>8}{'p50, мс':>10}{'p99, мс':>10}")
+    for name, step in report["steps"].items():
+        print(f"{name:<24}{step['count']:>8}{step['p50_ms']:>10.1f}{step['p99_ms']:>10.1f}")
+    print(f"Вызовы Bot API: {report['telegram_calls']}")
+    print(f"Запросы к внешним сервисам: {report['upstream_requests']}")
+    if report["errors"]:
+        print(f"Ошибки: {report['errors']}")
+
+
+def configure_environment(args: argparse.Namespace, upstream_url: str, workdir: str) -> None:
+    """
+    Направляет бота на заглушки и временный каталог. Вызывается до импорта модулей бота,
+    потому что настройки читаются из окружения при импорте.
+    """
+    os.environ.setdefault("BOT_TOKEN", "123456:LOADTEST")
+    os.environ.setdefault("ADMIN_ID", "1")
+    os.environ.update({
+        "OPENWEATHERMAP_URL": upstream_url,
+        "OPENFOODFACTS_URL": upstream_url,
+        "YANDEX_GPT_URL": upstream_url,
+        "STORAGE_BACKEND": args.backend,
+        "SQLITE_PATH": os.path.join(workdir, "users.sqlite3"),
+        "SHARDS_DIR": os.path.join(workdir, "users"),
+        "ARCHIVE_DIR": os.path.join(workdir, "archive"),
+        "FSM_DB_PATH": os.path.join(workdir, "fsm.sqlite3"),
+        "FOOD_CACHE_PATH": os.path.join(workdir, "food_cache.json"),
+        "FOOD_INDEX_PATH": os.path.join(workdir, "food_index.npz"),
+        "LOG_FILE": os.path.join(workdir, "bot.log"),
+        "TRACE_FILE": os.path.join(workdir, "trace.log"),
+        "LOG_CONSOLE_LEVEL": "ERROR",
+    })
+
+
+async def main(args: argparse.Namespace) -> Dict[str, Any]:
+    upstreams = Upstreams(args.weather_latency, args.food_latency, args.llm_latency)
+    upstream_url = await upstreams.start()
+    workdir = tempfile.mkdtemp(prefix="fitness_bot_loadtest_")
+    configure_environment(args, upstream_url, workdir)
+
+    # pylint: disable=import-outside-toplevel
+    from bot import create_dispatcher
+    from core.tools.users import UserStorage
+
+    UserStorage()
+    dispatcher = create_dispatcher()
+    session = StubSession(args.telegram_latency)
+    bot = Bot(token=os.environ["BOT_TOKEN"], session=session)
+    workflow_data = {"dispatcher": dispatcher, "bots": [bot], **dispatcher.workflow_data}
+    await dispatcher.emit_startup(bot=bot, **workflow_data)
+    try:
+        test = LoadTest(dispatcher, bot, args)
+        elapsed = await test.run()
+    finally:
+        await dispatcher.emit_shutdown(bot=bot, **workflow_data)
+        await upstreams.stop()
+    print(f"Данные бота: {workdir}")
+    return build_report(test, elapsed, session, upstreams)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Нагрузочный тест бота с заглушками Telegram и внешних сервисов")
+    parser.add_argument("--users", type=int, default=100, help="количество виртуальных пользователей")
+    parser.add_argument("--duration", type=float, default=30.0, help="длительность теста в секундах")
+    parser.add_argument("--think-time", type=float, default=0.0, help="средняя пауза пользователя между сообщениями, с")
+    parser.add_argument("--backend", choices=["sqlite", "sharded"], default="sqlite", help="бэкенд хранилища")
+    parser.add_argument("--telegram-latency", type=float, default=0.0, help="задержка ответа Bot API, с")
+    parser.add_argument("--weather-latency", type=float, default=0.05, help="задержка OpenWeatherMap, с")
+    parser.add_argument("--food-latency", type=float, default=0.2, help="задержка OpenFoodFacts, с")
+    parser.add_argument("--llm-latency", type=float, default=0.5, help="задержка Yandex GPT, с")
+    parser.add_argument("--unique-food-ratio", type=float, default=0.1,
+                        help="доля продуктов, которых нет в кэше и OpenFoodFacts")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="файл для сохранения результатов в JSON")
+    parser.add_argument("--min-throughput", type=float, default=0.0, help="минимально допустимая пропускная способность")
+    parser.add_argument("--max-errors", type=int, default=0,
+                        help="допустимое количество обновлений, обработка которых завершилась исключением")
+    args = parser.parse_args()
+
+    report = asyncio.run(main(args))
+    print_report(report)
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2, default=float)
+    failed = False
+    if report["throughput_per_s"] < args.min_throughput:
+        print(f"Пропускная способность ниже {args.min_throughput} обн./с")
+        failed = True
+    errors = sum(report["errors"].values())
+    if errors > args.max_errors:
+        print(f"Ошибок обработки {errors}, допустимо {args.max_errors}")
+        failed = True
+    if failed:
+        sys.exit(1)
@@ -4,66 +4,119 @@ from core.tools.settings import settings
 from core.handlers.basic import basic_router
 from core.handlers.profile import profile_router
 from core.handlers.logs import log_router
+from core.handlers.stats import stats_router
 from core.tools.users import UserStorage
 from core.tools.middlewares import LoggingMiddleware
 from core.keyboards.menu import set_main_menu
+from core.tools.http_client import start_http_clients, close_http_clients
+from core.tools.food_cache import food_cache
+from core.tools.food_index import load_food_index
+from core.tools.fsm_storage import create_fsm_storage
+from core.tools.render_pool import render_pool
+from core.tools.metrics import loop_monitor
+from core.tools.webhook import run_polling, run_webhook
+from core.tools.workers import run_workers
 from core.tools import app_logger
 
 logger = app_logger.get_logger(__name__)
 
 
-async def start_bot(bot: Bot) -> None:
+async def start_bot(bot: Bot, worker_index: int = 0) -> None:
     """
     Функция, которая отправляет сообщение администратору при запуске бота.
     Чат с ботом у Администратора должен уже существовать, иначе будет ошибка.
 
     :param bot: Объект бота, используемый для отправки сообщений.
+    :param worker_index: Номер процесса-воркера; сообщение отправляет только первый воркер.
     """
     logger.debug('Бот запущен', user_id=bot.id)
-    await bot.send_message(settings.admin_id, text='Бот запущен!')
+    if worker_index == 0:
+        await bot.send_message(settings.admin_id, text='Бот запущен!')
 
 
-async def stop_bot(bot: Bot) -> None:
+async def stop_bot(bot: Bot, worker_index: int = 0) -> None:
     """
     Функция, которая отправляет сообщение администратору при остановке бота.
 
     :param bot: Объект бота, используемый для отправки сообщений.
+    :param worker_index: Номер процесса-воркера; сообщение отправляет только первый воркер.
     """
     logger.debug('Бот остановлен', user_id=bot.id)
-    await bot.send_message(settings.admin_id, text='Бот остановлен!')
+    if worker_index == 0:
+        await bot.send_message(settings.admin_id, text='Бот остановлен!')
 
 
-async def main() -> None:
+def create_dispatcher() -> Dispatcher:
     """
-    Основная асинхронная функция для запуска бота.
+    Создает диспетчер с роутерами, мидлваре и функциями запуска и остановки.
 
-    Инициализирует хранилище пользователей, настраивает диспетчер и запускает бота.
-    """
-    # Инициализация хранилища пользователей
-    UserStorage()
+    Функция вызывается и в процессах-воркерах, поэтому должна оставаться на уровне модуля.
 
-    # Создание диспетчера для обработки сообщений
-    dp: Dispatcher = Dispatcher()
+    :return: Диспетчер бота.
+    """
+    # Создание диспетчера с хранилищем состояний, которое переживает перезапуск
+    storage = create_fsm_storage(settings.fsm_storage)
+    dp: Dispatcher = Dispatcher(storage=storage)
 
     # Подключение роутеров для обработки команд
     dp.include_router(profile_router)
     dp.include_router(log_router)
+    dp.include_router(stats_router)
     dp.include_router(basic_router)
 
-    # Подключение мидлваре для логирования сообщений
+    # Подключение мидлваре для логирования и трассировки сообщений и нажатий на кнопки
     dp.message.middleware(LoggingMiddleware())
-
-    # Создание объекта бота с использованием токена из настроек
-    bot = Bot(token=settings.bot_token)
+    dp.callback_query.middleware(LoggingMiddleware())
 
     # Регистрация функций, которые будут вызваны при запуске и остановке бота
+    dp.startup.register(loop_monitor.start)
+    dp.startup.register(start_http_clients)
+    dp.startup.register(render_pool.start)
+    dp.startup.register(load_food_index)
     dp.startup.register(set_main_menu)
     dp.startup.register(start_bot)
     dp.shutdown.register(stop_bot)
+    dp.shutdown.register(UserStorage.close)
+    dp.shutdown.register(close_http_clients)
+    dp.shutdown.register(food_cache.asave)
+    dp.shutdown.register(render_pool.close)
+    dp.shutdown.register(loop_monitor.stop)
+    return dp
+
+
+def create_bot() -> Bot:
+    """
+    Создает объект бота с использованием токена из настроек.
+
+    :return: Объект бота.
+    """
+    return Bot(token=settings.bot_token)
+
+
+async def main() -> None:
+    """
+    Основная асинхронная функция для запуска бота.
+
+    Инициализирует хранилище пользователей, настраивает диспетчер и запускает бота.
+    При WORKERS больше 1 запускает процессы-воркеры, а текущий процесс только
+    принимает вебхук и распределяет обновления между ними.
+    """
+    if settings.workers > 1:
+        await run_workers(create_dispatcher, create_bot, settings.workers)
+        return
+
+    # Инициализация хранилища пользователей
+    UserStorage()
+    dp = create_dispatcher()
+    bot = create_bot()
 
     try:
-        # Запуск бота в режиме опроса (polling)
-        await dp.start_polling(bot)
+        if settings.run_mode == "webhook":
+            # Прием обновлений через вебхук на встроенном веб-сервере
+            await run_webhook(dp, bot)
+        else:
+            # Запуск бота в режиме опроса (polling)
+            await run_polling(dp, bot)
     finally:
         # Закрытие сессии бота при завершении работы
         await bot.session.close()
@@ -7,6 +7,7 @@ from core.tools.users import UserStorage, User
 from core.tools.app_logger import get_logger
 from core.keyboards.inline import keybord_plots
 from core.tools.plots import plot_water, plot_food
+from core.tools.render_pool import RenderBusyError
 from core.tools.diet.diet_food import get_training
 
 # Создаем роутер для обработки базовых команд
@@ -29,7 +30,8 @@ async def get_start(message: Message) -> None:
         'или введите команду /set_profile. \r\n\r\nЕсли вы уже заполнили профиль, вы можете ' +
         'учитывать количество выпитой воды, количество калорий и треннировки ' +
         'с помощью команд: \r\n/log_water \r\n/log_food \r\n/log_workout \r\n' +
-        'Спомощью команды /check_progress вы можете посмотреть прогресс за текущий день.'
+        'Спомощью команды /check_progress вы можете посмотреть прогресс за текущий день, ' +
+        'а с помощью команды /stats - статистику за неделю или месяц.'
     )
 
 
@@ -40,27 +42,27 @@ async def check_progress(message: Message) -> None:
 
     :param message: Объект сообщения от пользователя.
     """
+    telegram_id = str(message.from_user.id)
+    today = str(datetime.now().date())
     try:
-        user: User = UserStorage.get_user(str(message.from_user.id))
+        # Нормы рассчитываются и сохраняются один раз в день
+        user: User = await UserStorage.aget_user_days_with_goals(telegram_id, [today])
     except KeyError:
         logger.error('Пользователь не найден', user_id=message.from_user.id)
         await message.answer(
             'Вы еще не заполнили профиль. Введите команду /set_profile'
             )
         return
-    today = str(datetime.now().date())
-    if user.burned_water.get(today) is None:
-        await user.add_day()
-        UserStorage.put_user(user)
-    calorie_goal = user.calc_calorie_goal()
-    water_goal = await user.calc_water_goal()
-    burned_water = sum(user.burned_water[today])
-    logged_water = sum(user.logged_water[today])
-    day_water = water_goal + burned_water
+    # Суммы дня поддерживаются при записи, поэтому почасовые ряды не пересчитываются
+    totals = user.day_totals(today)
+    calorie_goal = user.calorie_goal
+    burned_water = totals['burned_water']
+    logged_water = totals['logged_water']
+    day_water = user.water_goal + burned_water
     remaining_water = day_water - logged_water
     remaining_water = remaining_water if remaining_water > 0 else 0
-    logged_calories = sum(user.logged_calories[today])
-    burned_calories = sum(user.burned_calories[today])
+    logged_calories = totals['logged_calories']
+    burned_calories = totals['burned_calories']
     await message.answer(
         f'Прогресс:\r\n'
         f'Вода:\r\n'
@@ -87,14 +89,27 @@ async def plot_graphs(message: Message, bot: Bot) -> None:
 
     :param message: Объект сообщения от пользователя.
     """
-    if message.data == 'plot_water':
-        await message.answer('График потребления воды')
-        # Создаем график
-        graph = await plot_water(message.from_user.id)
+    try:
+        if message.data == 'plot_water':
+            await message.answer('График потребления воды')
+            # Создаем график
+            graph = await plot_water(message.from_user.id)
 
-        # Отправляем изображение
-        await bot.send_photo(chat_id=message.from_user.id, photo=graph)
-    elif message.data == 'plot_food':
-        await message.answer('График потребления калорий')
-        graph = await plot_food(message.from_user.id)
-        await bot.send_photo(chat_id=message.from_user.id, photo=graph)
+            # Отправляем изображение
+            await bot.send_photo(chat_id=message.from_user.id, photo=graph)
+        elif message.data == 'plot_food':
+            await message.answer('График потребления калорий')
+            graph = await plot_food(message.from_user.id)
+            await bot.send_photo(chat_id=message.from_user.id, photo=graph)
+    except KeyError:
+        logger.error('Пользователь не найден', user_id=message.from_user.id)
+        await bot.send_message(
+            chat_id=message.from_user.id,
+            text='Вы еще не заполнили профиль. Введите команду /set_profile'
+        )
+    except RenderBusyError:
+        logger.warning('Очередь отрисовки графиков заполнена', user_id=message.from_user.id)
+        await bot.send_message(
+            chat_id=message.from_user.id,
+            text='Сейчас строится много графиков, попробуйте через несколько секунд.'
+        )
@@ -6,7 +6,8 @@ from aiogram.filters import Command
 
 from core.states.log_states import LogFoodForm, LogWaterForm, LogWorkoutForm
 from core.tools.users import User, UserStorage
-from core.tools.llm_api import get_food_info_llm
+from core.tools.food_resolver import food_resolver
+from core.tools.plots import chart_cache
 from core.tools.app_logger import get_logger
 from core.tools.diet.diet_food import get_diet_food
 
@@ -39,17 +40,21 @@ async def log_water_volume(message: Message, state: FSMContext) -> None:
         logger.error('Передано не целое число.', user_id=message.from_user.id)
         await message.answer('Количество воды должно быть целым числом')
     else:
+        now = datetime.now()
+        today = str(now.date())
+
+        async def add_water(user: User) -> None:
+            # Нормы рассчитываются один раз в день и сохраняются вместе с записью
+            await user.ensure_goals()
+            user.record('logged_water', water, now)
+
         try:
-            user: User = UserStorage.get_user(str(message.from_user.id))
+            await UserStorage.update(str(message.from_user.id), add_water, days=[today])
+            chart_cache.invalidate(str(message.from_user.id))
         except KeyError:
             logger.error('Пользователь не найден', user_id=message.from_user.id)
             await message.answer('Вы еще не заполнили профиль. Введите команду /set_profile')
             return
-        now = datetime.now()
-        if user.logged_water.get(str(now.date())) is None:
-            await user.add_day()
-        user.logged_water[str(now.date())][now.hour] += water
-        UserStorage.put_user(user)
         await message.answer(f'Вы выпили {water} мл воды')
         await state.clear()
 
@@ -74,8 +79,9 @@ async def get_name_food(message: Message, state: FSMContext) -> None:
     :param state: Контекст состояния для управления состоянием пользователя.
     """
     product = message.text
-    calories = await get_food_info_llm(product)
-    calories = calories.get('calories')
+    resolution = await food_resolver.resolve(product)
+    calories = resolution.calories
+    logger.debug('Калорийность %s получена из %s', product, resolution.tier, user_id=message.from_user.id)
     await message.answer(f'{product} - {calories} ккал на 100г. Сколько грамм вы съели?')
     await state.set_state(LogFoodForm.weight)
     await state.set_data({'product': product, 'calories': calories})
@@ -96,13 +102,23 @@ async def get_weight_food(message: Message, state: FSMContext) -> None:
     except ValueError:
         logger.error('Вес продукта не целое число', user_id=message.from_user.id)
         await message.answer('Вес продукта должен быть целым числом.')
-    user: User = UserStorage.get_user(str(message.from_user.id))
+        return
     logged_calories = round(weight / 100 * calories)
     now = datetime.now()
-    if user.logged_calories.get(str(now.date())) is None:
-        await user.add_day()
-    user.logged_calories[str(now.date())][now.hour] += logged_calories
-    UserStorage.put_user(user)
+    today = str(now.date())
+
+    async def add_calories(user: User) -> None:
+        # Нормы рассчитываются один раз в день и сохраняются вместе с записью
+        await user.ensure_goals()
+        user.record('logged_calories', logged_calories, now)
+
+    try:
+        await UserStorage.update(str(message.from_user.id), add_calories, days=[today])
+        chart_cache.invalidate(str(message.from_user.id))
+    except KeyError:
+        logger.error('Пользователь не найден', user_id=message.from_user.id)
+        await message.answer('Вы еще не заполнили профиль. Введите команду /set_profile')
+        return
     logger.info('Записано калорий: %d', logged_calories, user_id=message.from_user.id)
     await message.answer(f'Записано: {logged_calories} ккал.')
     await state.clear()
@@ -152,18 +168,22 @@ async def get_duration_workout(message: Message, state: FSMContext) -> None:
         await message.answer('Длительность тренировки должна быть в минутах (целое число)')
         logger.error('Передано не целое число.', user_id=message.from_user.id)
     else:
+        now = datetime.now()
+        today = str(now.date())
+
+        async def add_workout(user: User) -> None:
+            # Нормы рассчитываются один раз в день и сохраняются вместе с записью
+            await user.ensure_goals()
+            user.record('burned_calories', duration * 16, now)
+            user.record('burned_water', duration * 10, now)
+
         try:
-            user: User = UserStorage.get_user(str(message.from_user.id))
+            await UserStorage.update(str(message.from_user.id), add_workout, days=[today])
+            chart_cache.invalidate(str(message.from_user.id))
         except KeyError:
             logger.error('Пользователь не найден', user_id=message.from_user.id)
             await message.answer('Вы еще не заполнили профиль. Введите команду /set_profile')
             return
-        now = datetime.now()
-        if user.burned_calories.get(str(now.date())) is None:
-            await user.add_day()
-        user.burned_calories[str(now.date())][now.hour] += duration * 16
-        user.burned_water[str(now.date())][now.hour] += duration * 10
-        UserStorage.put_user(user)
         logger.info('Тренировка записана', user_id=message.from_user.id)
         data = await state.get_data()
         type_workout = data.get('type_workout')
@@ -123,16 +123,29 @@ async def get_city(message: Message, state: FSMContext) -> None:
         f'Город: {data.get("city")}\r\n'
     )
 
-    # Создаем объект пользователя и сохраняем его в хранилище
-    user = User(
-        telegram_id=message.from_user.id,
-        weight=data.get("weight"),
-        height=data.get("height"),
-        age=data.get("age"),
-        activity=data.get("activity"),
-        city=data.get("city")
+    # Обновляем профиль пользователя, сохраняя историю, или создаем нового пользователя
+    def set_profile_fields(user: User) -> None:
+        user.weight = data.get("weight")
+        user.height = data.get("height")
+        user.age = data.get("age")
+        user.activity = data.get("activity")
+        user.city = data.get("city")
+        # Профиль изменился: нормы будут пересчитаны при следующем обращении
+        user.goals_day = None
+
+    await UserStorage.update(
+        str(message.from_user.id),
+        set_profile_fields,
+        default=lambda: User(
+            telegram_id=message.from_user.id,
+            weight=data.get("weight"),
+            height=data.get("height"),
+            age=data.get("age"),
+            activity=data.get("activity"),
+            city=data.get("city")
+        ),
+        days=[],
     )
-    UserStorage.put_user(user)
     logger.info(
         'Пользователь успешно заполнил профиль weight:%d height:%d age:%d activity:%d city:%s',
         data.get("weight"),
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta
+from aiogram import Router, Bot, F
+from aiogram.filters import Command
+from aiogram.types import Message, CallbackQuery
+from aiogram.types.input_file import BufferedInputFile
+
+from core.tools.users import UserStorage
+from core.tools.stats import PERIODS, build_report, format_report
+from core.tools.charts import render_stats_chart
+from core.tools.render_pool import render_pool, RenderBusyError
+from core.keyboards.inline import keybord_stats
+from core.tools.app_logger import get_logger
+
+# Создаем роутер для отчетов за период
+stats_router = Router()
+
+logger = get_logger(__name__)
+
+# Заголовки отчетов по периодам
+_TITLES = {
+    "week": "Статистика за неделю",
+    "month": "Статистика за месяц",
+}
+
+
+@stats_router.message(Command(commands=['stats']))
+async def stats(message: Message) -> None:
+    """
+    Обработчик команды /stats. Предлагает выбрать период отчета.
+
+    :param message: Объект сообщения от пользователя.
+    """
+    await message.answer('За какой период показать статистику?', reply_markup=keybord_stats)
+
+
+@stats_router.callback_query(F.data.in_({f'stats_{period}' for period in PERIODS}))
+async def send_stats(callback: CallbackQuery, bot: Bot) -> None:
+    """
+    Отправляет отчет за неделю или месяц: текст с итогами и график по дням и часам.
+
+    :param callback: Нажатие кнопки выбора периода.
+    :param bot: Объект бота.
+    """
+    await callback.answer()
+    period = callback.data.removeprefix('stats_')
+    days = PERIODS[period]
+    telegram_id = str(callback.from_user.id)
+    today = datetime.now().date()
+    start = today - timedelta(days=days - 1)
+    try:
+        user = await UserStorage.aget_user_days(telegram_id, days=[])
+        history = await UserStorage.get_history(telegram_id, str(start), str(today))
+    except KeyError:
+        logger.error('Пользователь не найден', user_id=callback.from_user.id)
+        await bot.send_message(callback.from_user.id, 'Вы еще не заполнили профиль. Введите команду /set_profile')
+        return
+
+    report = build_report(history, start, days, user.calc_base_water_goal(), user.calc_calorie_goal())
+    await bot.send_message(callback.from_user.id, format_report(report, _TITLES[period]))
+    if not report.active_days:
+        return
+
+    try:
+        image = await render_pool.render(
+            render_stats_chart,
+            report.labels,
+            report.daily_water,
+            report.daily_balance,
+            report.water_goal,
+            report.calorie_goal,
+            report.water_heatmap,
+            report.calorie_heatmap,
+        )
+    except RenderBusyError:
+        logger.warning('Очередь отрисовки графиков заполнена', user_id=callback.from_user.id)
+        await bot.send_message(
+            callback.from_user.id, 'Сейчас строится много графиков, попробуйте через несколько секунд.'
+        )
+        return
+    await bot.send_photo(callback.from_user.id, photo=BufferedInputFile(image, filename='stats.png'))
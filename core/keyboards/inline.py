@@ -17,3 +17,13 @@ keybord_plots: InlineKeyboardMarkup = InlineKeyboardMarkup(
         ]
     ]
 )
+
+# Клавиатура выбора периода отчета /stats
+keybord_stats: InlineKeyboardMarkup = InlineKeyboardMarkup(
+    inline_keyboard=[
+        [
+            InlineKeyboardButton(text="Неделя", callback_data="stats_week"),
+            InlineKeyboardButton(text="Месяц", callback_data="stats_month"),
+        ]
+    ]
+)
@@ -22,5 +22,7 @@ async def set_main_menu(bot: Bot) -> None:
                    description='Записать длительность тренировки'),
         BotCommand(command='/check_progress',
                    description='Посмотреть прогресс за день'),
+        BotCommand(command='/stats',
+                   description='Статистика за неделю или месяц'),
     ]
     await bot.set_my_commands(main_menu_commands)
@@ -1,9 +1,23 @@
+import os
+import queue
+import atexit
 import logging
-from typing import Any, Dict, Tuple
+import logging.handlers
+import multiprocessing
+from typing import Any, Dict, List, Optional, Tuple
+
+from core.tools.settings import settings
 
 # Формат логов, который будет использоваться для всех обработчиков
 _log_format = "%(asctime)s - %(levelname)s - %(name)s - %(filename)s.%(funcName)s(%(lineno)d) - %(message)s"
 
+# Логгер записей трассировки обработки обновлений (см. LoggingMiddleware)
+TRACE_LOGGER = "trace"
+
+# Слушатель очереди логов текущего процесса и pid процесса, в котором он запущен
+_listener: Optional[logging.handlers.QueueListener] = None
+_listener_pid: Optional[int] = None
+
 
 class CustomAdapter(logging.LoggerAdapter):
     """
@@ -21,14 +35,51 @@ class CustomAdapter(logging.LoggerAdapter):
         return f'id:{my_context} "{msg}"', kwargs
 
 
-def get_file_handler() -> logging.FileHandler:
+def _log_path(path: str) -> str:
+    """
+    Путь к файлу логов процесса. Дочерние процессы (воркеры при WORKERS больше 1)
+    пишут в свои файлы, потому что ротацию одного файла несколько процессов
+    выполнить согласованно не могут.
+
+    :param path: Путь к файлу из настроек.
     """
-    Создает и настраивает обработчик логов для записи в файл.
+    if multiprocessing.parent_process() is None:
+        return path
+    root, ext = os.path.splitext(path)
+    return f"{root}.{multiprocessing.current_process().name}{ext}"
+
+
+def _is_trace(record: logging.LogRecord) -> bool:
+    return record.name == TRACE_LOGGER
+
 
+def _is_not_trace(record: logging.LogRecord) -> bool:
+    return record.name != TRACE_LOGGER
+
+
+def get_file_handler(path: str) -> logging.Handler:
+    """
+    Создает и настраивает обработчик логов для записи в файл с ротацией:
+    по времени, если задан LOG_ROTATE_WHEN, иначе по размеру.
+
+    :param path: Путь к файлу логов.
     :return: Настроенный обработчик логов для файла.
     """
-    file_handler = logging.FileHandler("./logs/bot.log")
-    file_handler.setLevel(logging.INFO)
+    if settings.log_rotate_when:
+        file_handler = logging.handlers.TimedRotatingFileHandler(
+            _log_path(path),
+            when=settings.log_rotate_when,
+            backupCount=settings.log_backup_count,
+            encoding="utf-8",
+        )
+    else:
+        file_handler = logging.handlers.RotatingFileHandler(
+            _log_path(path),
+            maxBytes=settings.log_max_bytes,
+            backupCount=settings.log_backup_count,
+            encoding="utf-8",
+        )
+    file_handler.setLevel(settings.log_file_level)
     file_handler.setFormatter(logging.Formatter(_log_format))
     return file_handler
 
@@ -40,21 +91,83 @@ def get_stream_handler() -> logging.StreamHandler:
     :return: Настроенный обработчик логов для консоли.
     """
     stream_handler = logging.StreamHandler()
-    stream_handler.setLevel(logging.DEBUG)
+    stream_handler.setLevel(settings.log_console_level)
     stream_handler.setFormatter(logging.Formatter(_log_format))
     return stream_handler
 
 
+def setup_logging() -> None:
+    """
+    Настраивает логирование процесса через очередь.
+
+    Корневой логгер получает только QueueHandler, который кладет запись в очередь
+    и сразу возвращает управление. Запись в файл и консоль выполняет QueueListener
+    в фоновом потоке, поэтому задержки диска не останавливают цикл событий.
+    Обработчики создаются один раз на процесс; повторные вызовы ничего не делают.
+    """
+    global _listener, _listener_pid  # pylint: disable=global-statement
+    if _listener_pid == os.getpid():
+        return
+    log_queue: queue.SimpleQueue = queue.SimpleQueue()
+    handlers: List[logging.Handler] = [get_file_handler(settings.log_file), get_stream_handler()]
+    if settings.trace_file:
+        # Записи трассировки пишутся в отдельный файл одной строкой JSON без префикса
+        trace_handler = get_file_handler(settings.trace_file)
+        trace_handler.setLevel(logging.INFO)
+        trace_handler.setFormatter(logging.Formatter("%(message)s"))
+        trace_handler.addFilter(_is_trace)
+        for handler in handlers:
+            handler.addFilter(_is_not_trace)
+        handlers.append(trace_handler)
+    root = logging.getLogger()
+    # Обработчики, унаследованные от родительского процесса, заменяются своими
+    for handler in root.handlers[:]:
+        if isinstance(handler, logging.handlers.QueueHandler):
+            root.removeHandler(handler)
+    root.addHandler(logging.handlers.QueueHandler(log_queue))
+    _listener = logging.handlers.QueueListener(log_queue, *handlers, respect_handler_level=True)
+    _listener.start()
+    _listener_pid = os.getpid()
+    atexit.register(stop_logging)
+
+
+def stop_logging() -> None:
+    """
+    Записывает оставшиеся в очереди записи и останавливает фоновый поток логирования.
+    """
+    global _listener, _listener_pid  # pylint: disable=global-statement
+    if _listener is None or _listener_pid != os.getpid():
+        return
+    _listener.stop()
+    for handler in _listener.handlers:
+        handler.close()
+    _listener = None
+    _listener_pid = None
+
+
 def get_logger(name: str) -> CustomAdapter:
     """
-    Создает и настраивает логгер с указанным именем.
+    Создает логгер с указанным именем. Записи передаются корневому логгеру,
+    обработчики которого настраиваются один раз (setup_logging).
 
     :param name: Имя логгера.
     :return: Настроенный логгер с адаптером для добавления user_id.
     """
+    setup_logging()
     logger = logging.getLogger(name)
-    logger.setLevel(logging.INFO)
-    logger.addHandler(get_file_handler())
-    logger.addHandler(get_stream_handler())
+    logger.setLevel(settings.log_level)
     logger = CustomAdapter(logger, {'user_id': None})
     return logger
+
+
+def get_trace_logger() -> logging.Logger:
+    """
+    Возвращает логгер записей трассировки. Записи пишутся в файл TRACE_FILE,
+    а если он не задан — в общий лог.
+
+    :return: Логгер без адаптера: сообщение записи — готовая строка JSON.
+    """
+    setup_logging()
+    logger = logging.getLogger(TRACE_LOGGER)
+    logger.setLevel(logging.INFO)
+    return logger
@@ -0,0 +1,123 @@
+"""
+Отрисовка графиков без обращения к хранилищу и event loop.
+
+Функции модуля выполняются в процессах пула отрисовки (render_pool), поэтому
+принимают только простые данные и возвращают PNG в виде байт.
+"""
+import io
+from typing import Dict, Sequence
+
+import numpy as np
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+
+# Подписи и цвет графиков по видам
+CHARTS: Dict[str, Dict[str, str]] = {
+    "water": {
+        "label": "Потребление воды",
+        "goal_label": "Ваша норма воды",
+        "title": "Потребление воды",
+        "ylabel": "Выпитая вода(мл)",
+        "color": "C0",
+    },
+    "food": {
+        "label": "Потребление калорий",
+        "goal_label": "Дневная норма калорийности еды",
+        "title": "Потребление еды",
+        "ylabel": "Потребление еды (ккал)",
+        "color": "g",
+    },
+}
+
+
+def render_day_chart(kind: str, balance: Sequence[int], goal: float) -> bytes:
+    """
+    Рисует график накопленного потребления за день по часам.
+
+    Используется объектный API matplotlib (Figure без pyplot), поэтому фигура
+    не регистрируется глобально и освобождается вместе с объектом.
+
+    :param kind: Вид графика из CHARTS: water или food.
+    :param balance: Накопленное потребление за вычетом расхода по часам (24 значения).
+    :param goal: Дневная норма.
+    :return: Изображение графика в формате PNG.
+    """
+    chart = CHARTS[kind]
+    fig = Figure(figsize=(10, 5))
+    FigureCanvasAgg(fig)
+    ax = fig.subplots()
+    ax.step(range(1, 25), balance, label=chart["label"], linewidth=3, color=chart["color"])
+    ax.axhline(goal, color='r', linestyle='--', label=chart["goal_label"])
+    ax.legend()
+    fig.suptitle(chart["title"], fontsize=16, fontweight='bold')
+    ax.grid()
+    ax.set_xlim(1, 24)
+    ax.set_xlabel("Время")
+    ax.set_ylabel(chart["ylabel"])
+
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+def render_stats_chart(
+    labels: Sequence[str],
+    water: np.ndarray,
+    calories: np.ndarray,
+    water_goal: float,
+    calorie_goal: float,
+    water_heatmap: np.ndarray,
+    calorie_heatmap: np.ndarray,
+) -> bytes:
+    """
+    Рисует отчет за период: суммы по дням и тепловые карты по дням и часам.
+
+    :param labels: Подписи дней.
+    :param water: Выпитая вода за каждый день.
+    :param calories: Баланс калорий (потреблено минус сожжено) за каждый день.
+    :param water_goal: Дневная норма воды.
+    :param calorie_goal: Дневная норма калорий.
+    :param water_heatmap: Выпитая вода по дням и часам, форма (дни, 24).
+    :param calorie_heatmap: Потребленные калории по дням и часам, форма (дни, 24).
+    :return: Изображение отчета в формате PNG.
+    """
+    fig = Figure(figsize=(12, 9))
+    FigureCanvasAgg(fig)
+    axes = fig.subplots(2, 2)
+    positions = np.arange(len(labels))
+    step = max(1, len(labels) // 10)
+
+    for ax, values, goal, color, title in (
+        (axes[0][0], water, water_goal, "C0", "Вода по дням (мл)"),
+        (axes[0][1], calories, calorie_goal, "g", "Баланс калорий по дням (ккал)"),
+    ):
+        ax.bar(positions, values, color=color)
+        ax.axhline(goal, color='r', linestyle='--', label='Норма')
+        ax.set_title(title)
+        ax.set_xticks(positions[::step], labels[::step], rotation=45)
+        ax.legend()
+        ax.grid(axis='y')
+
+    for ax, heatmap, cmap, title in (
+        (axes[1][0], water_heatmap, "Blues", "Вода по часам"),
+        (axes[1][1], calorie_heatmap, "Greens", "Калории по часам"),
+    ):
+        image = ax.imshow(heatmap, aspect='auto', cmap=cmap, interpolation='nearest')
+        ax.set_title(title)
+        ax.set_xlabel("Час")
+        ax.set_xticks(range(0, 24, 3), range(0, 24, 3))
+        ax.set_yticks(positions[::step], labels[::step])
+        fig.colorbar(image, ax=ax)
+
+    fig.suptitle("Статистика", fontsize=16, fontweight='bold')
+    fig.tight_layout()
+    buffer = io.BytesIO()
+    fig.savefig(buffer, format="png")
+    return buffer.getvalue()
+
+
+def warm_up() -> None:
+    """
+    Прогревает процесс отрисовки: загружает шрифты и бэкенд Agg пробной отрисовкой.
+    """
+    render_day_chart("water", [0] * 24, 0)
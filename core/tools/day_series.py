@@ -0,0 +1,376 @@
+import zlib
+import base64
+import bisect
+from collections.abc import Mapping
+from typing import Any, Dict, Iterator, List, Optional, Sequence
+
+import numpy as np
+from pydantic_core import core_schema
+
+# Почасовые ряды пользователя в порядке их хранения в блоке
+METRICS = ("logged_water", "logged_calories", "burned_calories", "burned_water")
+
+HOURS = 24
+
+# Заголовок бинарного формата: сигнатура и версия
+_MAGIC = b"DSR1"
+
+# Порядковый номер даты 1970-01-01 (date.toordinal), начало отсчета datetime64
+_EPOCH_ORDINAL = 719163
+
+
+class DaySeries:
+    """
+    Компактное хранилище почасовых рядов пользователя.
+
+    Все дни хранятся в одном массиве int32 формы (дни, 4, 24), отсортированном по дате.
+    Массив доступен напрямую через атрибут array для векторных вычислений NumPy.
+
+    Для каждого дня хранятся суммы по рядам (totals). Они считаются один раз при создании
+    рядов и дальше обновляются при каждой записи (record), поэтому итоги дня читаются за O(1).
+    Блоки дней и ряды MetricView отдаются только для чтения, чтобы запись в обход
+    record не рассинхронизировала суммы.
+
+    Бинарный формат (to_bytes): сигнатура DSR1, количество дней (uint32),
+    порядковые номера дат (uint32 на день) и сам блок данных (int32, little-endian).
+    В JSON (model_dump) ряды попадают сжатыми zlib и закодированными в base64.
+    """
+    __slots__ = ("_dates", "_index", "_data", "_size", "_totals")
+
+    def __init__(self, dates: Sequence[str] = (), data: Optional[np.ndarray] = None):
+        """
+        :param dates: Отсортированный список дат в формате ГГГГ-ММ-ДД.
+        :param data: Массив формы (len(dates), 4, 24). Если не передан, заполняется нулями.
+        """
+        self._dates: List[str] = list(dates)
+        self._index: Dict[str, int] = {day: row for row, day in enumerate(self._dates)}
+        self._size = len(self._dates)
+        if data is None:
+            data = np.zeros((self._size, len(METRICS), HOURS), dtype=np.int32)
+        self._data = np.ascontiguousarray(data, dtype=np.int32)
+        if not self._data.flags.writeable:
+            self._data = self._data.copy()
+        self._totals = self._data.sum(axis=2, dtype=np.int64)
+
+    @property
+    def dates(self) -> List[str]:
+        """
+        Отсортированный список сохраненных дат.
+        """
+        return self._dates
+
+    @property
+    def array(self) -> np.ndarray:
+        """
+        Массив формы (дни, 4, 24) со всеми данными. Возвращается представление
+        только для чтения, а не копия.
+        """
+        return self._readonly(self._data[:self._size])
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, day: object) -> bool:
+        return day in self._index
+
+    def __eq__(self, other: object) -> bool:
+        if not isinstance(other, DaySeries):
+            return NotImplemented
+        return self._dates == other._dates and np.array_equal(self.array, other.array)
+
+    def __repr__(self) -> str:
+        return f"DaySeries(days={self._size})"
+
+    def __deepcopy__(self, memo: Dict[int, Any]) -> 'DaySeries':
+        return self.copy()
+
+    def copy(self) -> 'DaySeries':
+        """
+        Возвращает независимую копию рядов.
+        """
+        return DaySeries(self._dates, self.array.copy())
+
+    @staticmethod
+    def _readonly(block: np.ndarray) -> np.ndarray:
+        view = block.view()
+        view.flags.writeable = False
+        return view
+
+    def day(self, day: str) -> Optional[np.ndarray]:
+        """
+        Возвращает блок (4, 24) для указанной даты.
+
+        :param day: Дата в формате ГГГГ-ММ-ДД.
+        :return: Представление блока дня только для чтения или None, если дня нет.
+        """
+        row = self._index.get(day)
+        if row is None:
+            return None
+        return self._readonly(self._data[row])
+
+    def totals(self, day: str) -> Optional[np.ndarray]:
+        """
+        Возвращает суммы дня по рядам METRICS без пересчета.
+
+        :param day: Дата в формате ГГГГ-ММ-ДД.
+        :return: Представление только для чтения из 4 сумм или None, если дня нет.
+        """
+        row = self._index.get(day)
+        if row is None:
+            return None
+        return self._readonly(self._totals[row])
+
+    def record(self, day: str, name: str, hour: int, amount: int) -> None:
+        """
+        Прибавляет значение к часу дня и к сумме дня. Если дня нет, он добавляется.
+
+        :param day: Дата в формате ГГГГ-ММ-ДД.
+        :param name: Название ряда из METRICS.
+        :param hour: Час от 0 до 23.
+        :param amount: Прибавляемое значение.
+        """
+        row = self._index.get(day)
+        if row is None:
+            row = self._insert(day)
+        column = METRICS.index(name)
+        self._data[row, column, hour] += amount
+        self._totals[row, column] += amount
+
+    def _set_row(self, day: str, column: int, hours: Sequence[int]) -> None:
+        row = self._index.get(day)
+        if row is None:
+            row = self._insert(day)
+        self._data[row, column] = hours
+        self._totals[row, column] = self._data[row, column].sum(dtype=np.int64)
+
+    def add_day(self, day: str) -> np.ndarray:
+        """
+        Добавляет день с нулевыми значениями. Если день уже есть, обнуляет его.
+
+        :param day: Дата в формате ГГГГ-ММ-ДД.
+        :return: Представление блока дня только для чтения.
+        """
+        row = self._index.get(day)
+        if row is not None:
+            self._data[row] = 0
+            self._totals[row] = 0
+        else:
+            row = self._insert(day)
+        return self._readonly(self._data[row])
+
+    def _insert(self, day: str) -> int:
+        """
+        Вставляет новый нулевой день с сохранением сортировки.
+
+        :param day: Дата в формате ГГГГ-ММ-ДД, которой еще нет в рядах.
+        :return: Номер строки дня.
+        """
+        if self._size == len(self._data):
+            capacity = max(4, 2 * self._size)
+            grown = np.zeros((capacity, len(METRICS), HOURS), dtype=np.int32)
+            grown[:self._size] = self._data[:self._size]
+            self._data = grown
+            grown_totals = np.zeros((capacity, len(METRICS)), dtype=np.int64)
+            grown_totals[:self._size] = self._totals[:self._size]
+            self._totals = grown_totals
+        row = bisect.bisect(self._dates, day)
+        if row < self._size:
+            # День старше последнего сохраненного: сдвигаем более поздние дни
+            self._data[row + 1:self._size + 1] = self._data[row:self._size]
+            self._totals[row + 1:self._size + 1] = self._totals[row:self._size]
+            for later in self._dates[row:]:
+                self._index[later] += 1
+        self._data[row] = 0
+        self._totals[row] = 0
+        self._dates.insert(row, day)
+        self._index[day] = row
+        self._size += 1
+        return row
+
+    def split_before(self, day: str) -> 'DaySeries':
+        """
+        Удаляет из рядов все дни раньше указанной даты и возвращает их отдельно.
+
+        :param day: Первая дата, которая остается в рядах.
+        :return: Ряды с удаленными днями.
+        """
+        row = bisect.bisect_left(self._dates, day)
+        if not row:
+            return DaySeries()
+        cold = DaySeries(self._dates[:row], self._data[:row].copy())
+        self._data = self._data[row:self._size].copy()
+        self._totals = self._totals[row:self._size].copy()
+        self._dates = self._dates[row:]
+        self._index = {later: index for index, later in enumerate(self._dates)}
+        self._size = len(self._dates)
+        return cold
+
+    def between(self, start: str, end: str) -> 'DaySeries':
+        """
+        Возвращает копию рядов за период.
+
+        :param start: Первая дата периода включительно.
+        :param end: Последняя дата периода включительно.
+        """
+        first = bisect.bisect_left(self._dates, start)
+        last = bisect.bisect_right(self._dates, end)
+        return DaySeries(self._dates[first:last], self._data[first:last].copy())
+
+    def select(self, days: Sequence[str]) -> 'DaySeries':
+        """
+        Возвращает копию рядов только с указанными днями. Отсутствующие дни пропускаются.
+
+        :param days: Даты в формате ГГГГ-ММ-ДД.
+        """
+        rows = sorted(self._index[day] for day in set(days) if day in self._index)
+        return DaySeries([self._dates[row] for row in rows], self._data[rows])
+
+    def by_month(self) -> Dict[str, 'DaySeries']:
+        """
+        Разбивает ряды по месяцам.
+
+        :return: Словарь месяц (ГГГГ-ММ) → ряды за этот месяц.
+        """
+        months: Dict[str, 'DaySeries'] = {}
+        for month in sorted({day[:7] for day in self._dates}):
+            months[month] = self.between(f"{month}-01", f"{month}-31")
+        return months
+
+    @classmethod
+    def combine(cls, parts: Sequence['DaySeries']) -> 'DaySeries':
+        """
+        Объединяет несколько рядов. Если день встречается несколько раз, берется последний.
+
+        :param parts: Ряды для объединения.
+        """
+        dates = [day for part in parts for day in part.dates]
+        if not dates:
+            return cls()
+        data = np.concatenate([part.array for part in parts])
+        last = {day: row for row, day in enumerate(dates)}
+        ordered = sorted(last)
+        return cls(ordered, data[[last[day] for day in ordered]])
+
+    def metric(self, name: str) -> 'MetricView':
+        """
+        Возвращает представление одного ряда в виде словаря дата → 24 значения.
+
+        :param name: Название ряда из METRICS.
+        """
+        return MetricView(self, METRICS.index(name))
+
+    def to_bytes(self) -> bytes:
+        """
+        Кодирует ряды в бинарный формат.
+        """
+        ordinals = (
+            np.array(self._dates, dtype="datetime64[D]").astype(np.int64) + _EPOCH_ORDINAL
+        ).astype("<u4")
+        return b"".join((
+            _MAGIC,
+            np.uint32(self._size).astype("<u4").tobytes(),
+            ordinals.tobytes(),
+            self.array.astype("<i4", copy=False).tobytes(),
+        ))
+
+    @classmethod
+    def from_bytes(cls, raw: bytes, days: Optional[Sequence[str]] = None) -> 'DaySeries':
+        """
+        Декодирует ряды из бинарного формата.
+
+        :param raw: Данные в формате to_bytes.
+        :param days: Если передан, декодируются только эти дни, остальные блоки не копируются.
+        """
+        if raw[:4] != _MAGIC:
+            raise ValueError("Неизвестный формат рядов")
+        size = int(np.frombuffer(raw, dtype="<u4", count=1, offset=4)[0])
+        ordinals = np.frombuffer(raw, dtype="<u4", count=size, offset=8)
+        data = np.frombuffer(raw, dtype="<i4", offset=8 + 4 * size).reshape(size, len(METRICS), HOURS)
+        dates = (
+            (ordinals.astype(np.int64) - _EPOCH_ORDINAL).astype("datetime64[D]").astype(str).tolist()
+        )
+        if days is not None:
+            wanted = set(days)
+            rows = [row for row, day in enumerate(dates) if day in wanted]
+            return cls([dates[row] for row in rows], data[rows])
+        return cls(dates, data)
+
+    @classmethod
+    def from_legacy(cls, series: Dict[str, Dict[str, List[int]]]) -> 'DaySeries':
+        """
+        Создает ряды из старого формата: словарей дата → список из 24 значений для каждого ряда.
+
+        :param series: Словарь название ряда → словарь дат.
+        """
+        dates = sorted({day for name in METRICS for day in series.get(name) or {}})
+        rows = {day: row for row, day in enumerate(dates)}
+        data = np.zeros((len(dates), len(METRICS), HOURS), dtype=np.int32)
+        for column, name in enumerate(METRICS):
+            for day, hours in (series.get(name) or {}).items():
+                data[rows[day], column] = hours
+        return cls(dates, data)
+
+    def to_legacy(self) -> Dict[str, Dict[str, List[int]]]:
+        """
+        Возвращает ряды в старом формате словарей.
+        """
+        return {
+            name: {day: self._data[row, column].tolist() for row, day in enumerate(self._dates)}
+            for column, name in enumerate(METRICS)
+        }
+
+    @classmethod
+    def _validate(cls, value: Any) -> 'DaySeries':
+        if isinstance(value, DaySeries):
+            return value
+        if isinstance(value, str):
+            value = base64.b64decode(value)
+        if isinstance(value, (bytes, bytearray, memoryview)):
+            raw = bytes(value)
+            if raw[:4] != _MAGIC:
+                raw = zlib.decompress(raw)
+            return cls.from_bytes(raw)
+        raise ValueError("Ожидались ряды DaySeries, base64-строка или байты")
+
+    def _serialize(self) -> str:
+        # Ряды в основном состоят из нулей, поэтому перед base64 они сжимаются
+        return base64.b64encode(zlib.compress(self.to_bytes(), 1)).decode("ascii")
+
+    @classmethod
+    def __get_pydantic_core_schema__(cls, source: Any, handler: Any) -> core_schema.CoreSchema:
+        return core_schema.no_info_plain_validator_function(
+            cls._validate,
+            serialization=core_schema.plain_serializer_function_ser_schema(cls._serialize),
+        )
+
+
+class MetricView(Mapping):
+    """
+    Представление одного ряда DaySeries в виде словаря дата → массив из 24 значений.
+
+    Возвращаемые массивы являются представлениями блока только для чтения.
+    Почасовые значения записываются через DaySeries.record, а ряд дня целиком —
+    присваиванием view[day] = hours.
+    """
+
+    def __init__(self, series: DaySeries, column: int):
+        self._series = series
+        self._column = column
+
+    def __getitem__(self, day: str) -> np.ndarray:
+        block = self._series.day(day)
+        if block is None:
+            raise KeyError(day)
+        return block[self._column]
+
+    def __setitem__(self, day: str, hours: Sequence[int]) -> None:
+        self._series._set_row(day, self._column, hours)  # pylint: disable=protected-access
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._series.dates)
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def __contains__(self, day: object) -> bool:
+        return day in self._series
@@ -0,0 +1,207 @@
+import os
+import re
+import json
+import asyncio
+import difflib
+import tempfile
+import threading
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+from core.tools.settings import settings
+from core.tools.metrics import register_cache
+from core.tools.app_logger import get_logger
+
+logger = get_logger(__name__)
+
+_NON_WORD = re.compile(r"[^\w]+")
+
+
+def normalize_food_name(name: str) -> str:
+    """
+    Приводит название продукта к ключу кэша: нижний регистр, ё → е,
+    без знаков препинания и лишних пробелов, слова отсортированы.
+
+    Например, «Гречка  отварная» и «отварная гречка!» дают один ключ.
+
+    :param name: Название продукта в свободной форме.
+    :return: Нормализованный ключ.
+    """
+    words = _NON_WORD.sub(" ", name.lower().replace("ё", "е")).split()
+    return " ".join(sorted(words))
+
+
+class FoodCache:
+    """
+    Персистентный кэш калорийности продуктов перед запросами к LLM.
+
+    Ключ — нормализованное название продукта (normalize_food_name). Записи вытесняются
+    по давности использования (LRU), кэш сохраняется в файл JSON каждые save_every
+    новых записей и при остановке бота; из event loop файл пишется в пуле потоков. Если задан fuzzy_cutoff, при промахе
+    ищется похожее название (difflib) с коэффициентом сходства не ниже порога.
+
+    Атрибуты:
+        hits (int): Точные попадания.
+        fuzzy_hits (int): Попадания по похожему названию.
+        misses (int): Промахи, после которых нужен запрос к LLM.
+    """
+
+    def __init__(
+        self,
+        path: str = "./data/food_cache.json",
+        max_entries: int = 10000,
+        fuzzy_cutoff: float = 0.0,
+        save_every: int = 50,
+    ):
+        """
+        :param path: Путь к файлу кэша.
+        :param max_entries: Максимальное количество записей.
+        :param fuzzy_cutoff: Порог сходства для поиска похожих названий (0 — поиск отключен).
+        :param save_every: Через сколько новых записей кэш сохраняется в файл.
+        """
+        self.path = path
+        self.max_entries = max_entries
+        self.fuzzy_cutoff = fuzzy_cutoff
+        self.save_every = save_every
+        self.hits = 0
+        self.fuzzy_hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, int] = OrderedDict()
+        self._dirty = 0
+        # Номер последнего снимка записей и номер снимка, уже записанного в файл
+        self._version = 0
+        self._saved_version = 0
+        self._lock = threading.Lock()
+        self._load()
+
+    @property
+    def llm_calls_avoided(self) -> int:
+        """
+        Количество запросов к LLM, которых удалось избежать.
+        """
+        return self.hits + self.fuzzy_hits
+
+    def _load(self) -> None:
+        """
+        Загружает записи из файла. Если файл поврежден или не читается, кэш начинается пустым.
+        """
+        if not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                self._entries = OrderedDict(json.load(f))
+        except (OSError, ValueError, TypeError) as e:
+            logger.error('Кэш калорийности %s не загружен, начинаем с пустого: %s', self.path, e)
+            self._entries = OrderedDict()
+            return
+        logger.info('Кэш калорийности загружен: %d продуктов', len(self._entries))
+
+    def get(self, name: str) -> Optional[int]:
+        """
+        Возвращает калорийность продукта из кэша.
+
+        :param name: Название продукта.
+        :return: Калорийность на 100 г или None, если продукта нет в кэше.
+        """
+        key = normalize_food_name(name)
+        calories = self._entries.get(key)
+        if calories is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return calories
+        if self.fuzzy_cutoff > 0:
+            matches = difflib.get_close_matches(key, self._entries.keys(), n=1, cutoff=self.fuzzy_cutoff)
+            if matches:
+                self._entries.move_to_end(matches[0])
+                self.fuzzy_hits += 1
+                return self._entries[matches[0]]
+        self.misses += 1
+        return None
+
+    def put(self, name: str, calories: int) -> None:
+        """
+        Добавляет калорийность продукта в кэш.
+
+        :param name: Название продукта.
+        :param calories: Калорийность на 100 г.
+        """
+        key = normalize_food_name(name)
+        if not key:
+            return
+        self._entries[key] = calories
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        self._dirty += 1
+        if self._dirty >= self.save_every:
+            try:
+                loop = asyncio.get_running_loop()
+            except RuntimeError:
+                self.save()
+            else:
+                loop.run_in_executor(None, self._write, *self._snapshot())
+
+    def _snapshot(self) -> Tuple[int, List[Tuple[str, int]]]:
+        """
+        Копирует записи для сохранения. Выполняется в потоке, который изменяет кэш.
+
+        :return: Номер снимка и записи.
+        """
+        self._dirty = 0
+        self._version += 1
+        return self._version, list(self._entries.items())
+
+    def _write(self, version: int, entries: List[Tuple[str, int]]) -> None:
+        """
+        Атомарно записывает снимок в файл. Снимок старше уже записанного пропускается.
+
+        Временный файл создается со своим именем, поэтому несколько рабочих процессов
+        могут сохранять кэш одновременно.
+
+        :param version: Номер снимка.
+        :param entries: Записи кэша.
+        """
+        with self._lock:
+            if version <= self._saved_version:
+                return
+            tmp_path = None
+            try:
+                fd, tmp_path = tempfile.mkstemp(
+                    prefix=f"{os.path.basename(self.path)}.",
+                    suffix=".tmp",
+                    dir=os.path.dirname(self.path) or ".",
+                )
+                with os.fdopen(fd, "w", encoding="utf-8") as f:
+                    json.dump(entries, f, ensure_ascii=False)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.error('Ошибка сохранения кэша калорийности %s: %s', self.path, e)
+                if tmp_path is not None and os.path.exists(tmp_path):
+                    os.remove(tmp_path)
+                return
+            self._saved_version = version
+        logger.debug(
+            'Кэш калорийности сохранен: %d продуктов, запросов к LLM не понадобилось: %d',
+            len(entries),
+            self.llm_calls_avoided,
+        )
+
+    def save(self) -> None:
+        """
+        Атомарно сохраняет кэш в файл.
+        """
+        self._write(*self._snapshot())
+
+    async def asave(self) -> None:
+        """
+        Сохраняет кэш в файл в пуле потоков. Регистрируется в shutdown диспетчера.
+        """
+        await asyncio.to_thread(self._write, *self._snapshot())
+
+
+food_cache = FoodCache(
+    settings.food_cache_path,
+    max_entries=settings.food_cache_size,
+    fuzzy_cutoff=settings.food_cache_fuzzy_cutoff,
+)
+register_cache("food", lambda: (food_cache.llm_calls_avoided, food_cache.misses))
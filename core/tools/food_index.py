@@ -0,0 +1,400 @@
+"""
+Локальный индекс калорийности продуктов, построенный из выгрузки OpenFoodFacts.
+
+Индекс хранит нормализованное название продукта → ккал на 100 г и триграммный
+инвертированный индекс для поиска похожих названий. Поиск выполняется в процессе,
+без обращения к сети.
+
+Построение индекса из выгрузки CSV (https://world.openfoodfacts.org/data) или JSONL:
+    python -m core.tools.food_index --source en.openfoodfacts.org.products.csv.gz --target ./data/food_index.npz
+"""
+import os
+import csv
+import math
+import asyncio
+import gzip
+import json
+import argparse
+import statistics
+from typing import Dict, Iterable, Iterator, List, Optional, Set, Tuple
+
+import numpy as np
+
+from core.tools.settings import settings
+from core.tools.food_cache import normalize_food_name
+from core.tools.app_logger import get_logger
+
+logger = get_logger(__name__)
+
+# Поля с названием продукта в порядке предпочтения
+_NAME_FIELDS = ("product_name_ru", "product_name")
+# Калорийность выше, чем у чистого жира, считается ошибкой в данных
+_MAX_KCAL = 900
+_KJ_PER_KCAL = 4.184
+
+
+def _trigrams(key: str) -> Set[str]:
+    """
+    Возвращает множество триграмм нормализованного названия.
+
+    :param key: Нормализованное название продукта.
+    :return: Триграммы с учетом границ строки.
+    """
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def _open_dump(path: str):
+    if path.endswith(".gz"):
+        return gzip.open(path, "rt", encoding="utf-8", newline="")
+    return open(path, "r", encoding="utf-8", newline="")
+
+
+def _kcal(nutriments: Dict) -> Optional[float]:
+    """
+    Извлекает калорийность на 100 г, при необходимости пересчитывая ее из кДж.
+
+    :param nutriments: Пищевая ценность продукта.
+    :return: Калорийность или None, если она не указана или некорректна.
+    """
+    for field, divider in (("energy-kcal_100g", 1.0), ("energy_100g", _KJ_PER_KCAL)):
+        value = nutriments.get(field)
+        if value in (None, ""):
+            continue
+        try:
+            kcal = float(value) / divider
+        except (TypeError, ValueError):
+            continue
+        if 0 <= kcal <= _MAX_KCAL:
+            return kcal
+    return None
+
+
+def _read_dump(path: str) -> Iterator[Tuple[str, float]]:
+    """
+    Читает выгрузку OpenFoodFacts и возвращает пары название → калорийность.
+
+    Поддерживаются CSV (разделитель — табуляция или запятая) и JSONL, в том числе сжатые gzip.
+
+    :param path: Путь к выгрузке.
+    """
+    is_jsonl = path.endswith((".jsonl", ".jsonl.gz", ".json", ".json.gz"))
+    with _open_dump(path) as f:
+        if is_jsonl:
+            rows: Iterable[Dict] = (json.loads(line) for line in f if line.strip())
+        else:
+            csv.field_size_limit(1 << 24)
+            header = f.readline()
+            f.seek(0)
+            rows = csv.DictReader(f, delimiter="\t" if "\t" in header else ",")
+        for row in rows:
+            name = next((row[field] for field in _NAME_FIELDS if row.get(field)), None)
+            if not name:
+                continue
+            kcal = _kcal(row.get("nutriments") or row)
+            if kcal is not None:
+                yield name.strip(), kcal
+
+
+def _pack_strings(strings: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Упаковывает строки в один массив байт UTF-8 и массив смещений.
+    """
+    encoded = [s.encode("utf-8") for s in strings]
+    offsets = np.zeros(len(encoded) + 1, dtype=np.int64)
+    np.cumsum([len(s) for s in encoded], out=offsets[1:])
+    return np.frombuffer(b"".join(encoded), dtype=np.uint8), offsets
+
+
+def _unpack_strings(blob: np.ndarray, offsets: np.ndarray) -> List[str]:
+    raw = blob.tobytes()
+    bounds = offsets.tolist()
+    return [raw[bounds[i]:bounds[i + 1]].decode("utf-8") for i in range(len(bounds) - 1)]
+
+
+class FoodIndex:
+    """
+    Индекс калорийности продуктов в памяти процесса.
+
+    Сначала ищется точное совпадение нормализованного названия, затем похожее
+    название по коэффициенту Дайса для множеств триграмм.
+
+    Атрибуты:
+        names (List[str]): Названия продуктов в том виде, в котором они были в выгрузке.
+        keys (List[str]): Нормализованные названия продуктов.
+        calories (np.ndarray): Калорийность на 100 г (int16).
+    """
+
+    def __init__(
+        self,
+        names: List[str],
+        keys: List[str],
+        calories: np.ndarray,
+        grams: List[str],
+        postings_offsets: np.ndarray,
+        postings: np.ndarray,
+        gram_counts: np.ndarray,
+        cutoff: float = 0.6,
+        max_candidates: int = 5000,
+    ):
+        """
+        :param names: Названия продуктов.
+        :param keys: Нормализованные названия продуктов.
+        :param calories: Калорийность на 100 г.
+        :param grams: Триграммы инвертированного индекса.
+        :param postings_offsets: Границы списков продуктов для каждой триграммы в postings.
+        :param postings: Номера продуктов, содержащих триграмму.
+        :param gram_counts: Количество триграмм в названии каждого продукта.
+        :param cutoff: Минимальное сходство для похожего названия (0..1).
+        :param max_candidates: Сколько кандидатов проверяется двоичным поиском; при большем
+                               количестве общие триграммы считаются по всем спискам.
+        """
+        self.names = names
+        self.keys = keys
+        self.calories = calories
+        self.cutoff = cutoff
+        self.max_candidates = max_candidates
+        self._postings_offsets = postings_offsets
+        self._postings = postings
+        self._gram_counts = gram_counts
+        self._ids = {key: i for i, key in enumerate(keys)}
+        self._grams = {gram: i for i, gram in enumerate(grams)}
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    @classmethod
+    def build(cls, products: Iterable[Tuple[str, float]], cutoff: float = 0.6) -> 'FoodIndex':
+        """
+        Строит индекс из пар название → калорийность.
+
+        Одинаковые после нормализации названия объединяются, калорийностью считается медиана.
+
+        :param products: Пары название → калорийность на 100 г.
+        :param cutoff: Минимальное сходство для похожего названия.
+        :return: Индекс.
+        """
+        merged: Dict[str, Tuple[str, List[float]]] = {}
+        for name, kcal in products:
+            key = normalize_food_name(name)
+            if not key:
+                continue
+            entry = merged.get(key)
+            if entry is None:
+                merged[key] = (name, [kcal])
+            else:
+                entry[1].append(kcal)
+
+        keys = sorted(merged)
+        names = [merged[key][0] for key in keys]
+        calories = np.array([round(statistics.median(merged[key][1])) for key in keys], dtype=np.int16)
+
+        inverted: Dict[str, List[int]] = {}
+        gram_counts = np.zeros(len(keys), dtype=np.uint16)
+        for i, key in enumerate(keys):
+            grams = _trigrams(key)
+            gram_counts[i] = min(len(grams), np.iinfo(np.uint16).max)
+            for gram in grams:
+                inverted.setdefault(gram, []).append(i)
+        grams = sorted(inverted)
+        postings_offsets = np.zeros(len(grams) + 1, dtype=np.int64)
+        np.cumsum([len(inverted[gram]) for gram in grams], out=postings_offsets[1:])
+        postings = np.fromiter(
+            (i for gram in grams for i in inverted[gram]), dtype=np.int32, count=int(postings_offsets[-1])
+        )
+        return cls(names, keys, calories, grams, postings_offsets, postings, gram_counts, cutoff)
+
+    def save(self, path: str) -> None:
+        """
+        Атомарно сохраняет индекс в сжатый файл NumPy (.npz).
+
+        :param path: Путь к файлу индекса.
+        """
+        names_blob, names_offsets = _pack_strings(self.names)
+        keys_blob, keys_offsets = _pack_strings(self.keys)
+        grams = sorted(self._grams, key=self._grams.get)
+        grams_blob, grams_offsets = _pack_strings(grams)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "wb") as f:
+            np.savez_compressed(
+                f,
+                names_blob=names_blob,
+                names_offsets=names_offsets,
+                keys_blob=keys_blob,
+                keys_offsets=keys_offsets,
+                calories=self.calories,
+                grams_blob=grams_blob,
+                grams_offsets=grams_offsets,
+                postings_offsets=self._postings_offsets,
+                postings=self._postings,
+                gram_counts=self._gram_counts,
+            )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, cutoff: float = 0.6) -> 'FoodIndex':
+        """
+        Загружает индекс из файла.
+
+        :param path: Путь к файлу индекса.
+        :param cutoff: Минимальное сходство для похожего названия.
+        :return: Индекс.
+        """
+        with np.load(path, allow_pickle=False) as data:
+            return cls(
+                _unpack_strings(data["names_blob"], data["names_offsets"]),
+                _unpack_strings(data["keys_blob"], data["keys_offsets"]),
+                data["calories"],
+                _unpack_strings(data["grams_blob"], data["grams_offsets"]),
+                data["postings_offsets"],
+                data["postings"],
+                data["gram_counts"],
+                cutoff,
+            )
+
+    def lookup(self, food_name: str, fuzzy: bool = True) -> Optional[Dict[str, str | int]]:
+        """
+        Ищет калорийность продукта в индексе.
+
+        :param food_name: Название продукта в свободной форме.
+        :param fuzzy: Искать ли похожее название, если точного совпадения нет.
+        :return: Словарь с названием найденного продукта и калориями на 100 грамм
+                 или None, если похожего продукта нет.
+        """
+        key = normalize_food_name(food_name)
+        if not key:
+            return None
+        i = self._ids.get(key)
+        if i is None:
+            if not fuzzy:
+                return None
+            i = self._closest(key)
+            if i is None:
+                return None
+        return {'name': self.names[i], 'calories': int(self.calories[i])}
+
+    def _closest(self, key: str) -> Optional[int]:
+        """
+        Находит продукт с наиболее похожим названием по триграммам.
+
+        Списки частых триграмм на полной выгрузке содержат сотни тысяч продуктов, поэтому
+        кандидаты берутся из самых редких списков (фильтрация по префиксу): продукт,
+        которого нет ни в одном из них, не наберет нужного для порога числа общих триграмм.
+        Общие триграммы кандидатов досчитываются двоичным поиском по всем спискам.
+        Если кандидатов больше max_candidates (все триграммы запроса частые), общие
+        триграммы считаются np.bincount по всем спискам.
+
+        :param key: Нормализованное название продукта.
+        :return: Номер продукта или None, если сходство ниже порога.
+        """
+        grams = _trigrams(key)
+        lists = []
+        for gram in grams:
+            j = self._grams.get(gram)
+            if j is not None:
+                lists.append(self._postings[self._postings_offsets[j]:self._postings_offsets[j + 1]])
+        # Сходство 2·o / (len(grams) + o) не ниже cutoff требует не меньше need общих триграмм
+        need = max(1, math.ceil(self.cutoff * len(grams) / (2 - self.cutoff)))
+        if len(lists) < need:
+            return None
+        lists.sort(key=len)
+        prefix = lists[:len(lists) - need + 1]
+        if sum(len(posting) for posting in prefix) > self.max_candidates:
+            common = np.bincount(np.concatenate(lists), minlength=len(self.keys))
+            return self._best(None, common, len(grams))
+        ids = np.unique(np.concatenate(prefix))
+        common = np.zeros(len(ids), dtype=np.int64)
+        for posting in lists:
+            found = np.minimum(np.searchsorted(posting, ids), len(posting) - 1)
+            common += posting[found] == ids
+        return self._best(ids, common, len(grams))
+
+    def _best(self, ids: Optional[np.ndarray], common: np.ndarray, grams: int) -> Optional[int]:
+        """
+        Выбирает кандидата с наибольшим коэффициентом Дайса.
+
+        :param ids: Номера кандидатов по возрастанию или None, если common дан для всех продуктов.
+        :param common: Количество общих с запросом триграмм у каждого кандидата.
+        :param grams: Количество триграмм запроса.
+        :return: Номер продукта или None, если сходство ниже порога.
+        """
+        gram_counts = self._gram_counts if ids is None else self._gram_counts[ids]
+        scores = 2 * common / (grams + gram_counts)
+        best = int(scores.argmax())
+        if scores[best] < self.cutoff:
+            return None
+        return best if ids is None else int(ids[best])
+
+
+_food_index: Optional[FoodIndex] = None
+_food_index_loaded = False
+# Загрузка индекса, которую ожидают все обращения до ее завершения
+_food_index_loading: Optional[asyncio.Future] = None
+
+
+def _load_food_index() -> Optional[FoodIndex]:
+    """
+    Загружает индекс из файла FOOD_INDEX_PATH. Выполняется в пуле потоков.
+
+    :return: Индекс или None, если файл индекса не построен.
+    """
+    if not os.path.exists(settings.food_index_path):
+        logger.info('Индекс калорийности %s не найден', settings.food_index_path)
+        return None
+    try:
+        index = FoodIndex.load(settings.food_index_path, settings.food_index_cutoff)
+    except (OSError, ValueError, KeyError) as e:
+        logger.error('Ошибка загрузки индекса калорийности %s: %s', settings.food_index_path, e)
+        return None
+    logger.info('Индекс калорийности загружен: %d продуктов', len(index))
+    return index
+
+
+async def get_food_index() -> Optional[FoodIndex]:
+    """
+    Возвращает локальный индекс калорийности, загружая его при первом обращении.
+
+    Загрузка большого индекса занимает около секунды, поэтому она выполняется
+    в пуле потоков и не останавливает обработку других обновлений; одновременные
+    обращения ожидают одну загрузку.
+
+    :return: Индекс или None, если файл индекса не построен.
+    """
+    global _food_index, _food_index_loaded, _food_index_loading  # pylint: disable=global-statement
+    if _food_index_loaded:
+        return _food_index
+    if _food_index_loading is None:
+        _food_index_loading = asyncio.ensure_future(asyncio.to_thread(_load_food_index))
+    index = await asyncio.shield(_food_index_loading)
+    _food_index, _food_index_loaded, _food_index_loading = index, True, None
+    return index
+
+
+async def load_food_index() -> None:
+    """
+    Загружает индекс заранее, чтобы первый поиск калорийности его не ждал.
+    Регистрируется в startup диспетчера.
+    """
+    await get_food_index()
+
+
+def build_food_index(source: str, target: str) -> int:
+    """
+    Строит индекс калорийности из выгрузки OpenFoodFacts и сохраняет его в файл.
+
+    :param source: Путь к выгрузке CSV или JSONL (можно сжатой gzip).
+    :param target: Путь к файлу индекса.
+    :return: Количество продуктов в индексе.
+    """
+    index = FoodIndex.build(_read_dump(source))
+    index.save(target)
+    logger.info('Индекс калорийности построен: %d продуктов из %s в %s', len(index), source, target)
+    return len(index)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Построение индекса калорийности из выгрузки OpenFoodFacts")
+    parser.add_argument("--source", required=True)
+    parser.add_argument("--target", default="./data/food_index.npz")
+    args = parser.parse_args()
+    build_food_index(args.source, args.target)
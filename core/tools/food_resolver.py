@@ -0,0 +1,188 @@
+import time
+import asyncio
+from collections import Counter, defaultdict
+from dataclasses import dataclass, field
+from typing import Awaitable, Dict, Optional, Tuple
+
+from core.tools.settings import settings
+from core.tools.food_cache import food_cache
+from core.tools.food_index import get_food_index
+from core.tools.openfoodfacts import get_food_info
+from core.tools.llm_api import get_food_info_llm
+from core.tools import metrics
+from core.tools.app_logger import get_logger
+
+logger = get_logger(__name__)
+
+# Калорийность, если ни один источник не ответил вовремя
+DEFAULT_CALORIES = 50
+
+
+@dataclass
+class FoodResolution:
+    """
+    Результат поиска калорийности продукта.
+
+    Атрибуты:
+        calories (int): Калорийность на 100 г.
+        tier (str): Источник ответа: cache, index, openfoodfacts, llm или default.
+        latencies (Dict[str, float]): Время ответа опрошенных источников в секундах.
+    """
+    calories: int
+    tier: str
+    latencies: Dict[str, float] = field(default_factory=dict)
+
+
+class FoodResolver:
+    """
+    Ищет калорийность продукта по источникам от быстрых к медленным:
+    кэш калорийности → локальный индекс → OpenFoodFacts → LLM.
+
+    Удаленные источники опрашиваются с хеджированием: сначала OpenFoodFacts, а если он
+    не ответил за hedge_delay секунд (или не нашел продукт), параллельно запускается LLM.
+    Берется первый полученный ответ. Если за deadline секунд ответа нет, возвращается
+    калорийность по умолчанию.
+
+    Атрибуты:
+        answered (Counter): Количество ответов каждого источника.
+        latency_sum (Dict[str, float]): Суммарное время ответов каждого источника.
+        latency_count (Counter): Количество замеров времени каждого источника.
+    """
+
+    def __init__(self, deadline: float = 8.0, hedge_delay: float = 0.5):
+        """
+        :param deadline: Максимальное время поиска в удаленных источниках в секундах.
+        :param hedge_delay: Через сколько секунд без ответа OpenFoodFacts запускается запрос к LLM.
+        """
+        self.deadline = deadline
+        self.hedge_delay = hedge_delay
+        self.answered: Counter = Counter()
+        self.latency_sum: Dict[str, float] = defaultdict(float)
+        self.latency_count: Counter = Counter()
+
+    def _record(self, tier: str, started: float, latencies: Dict[str, float]) -> None:
+        elapsed = time.perf_counter() - started
+        latencies[tier] = elapsed
+        self.latency_sum[tier] += elapsed
+        self.latency_count[tier] += 1
+
+    def _answer(self, calories: int, tier: str, latencies: Dict[str, float]) -> FoodResolution:
+        self.answered[tier] += 1
+        return FoodResolution(calories, tier, latencies)
+
+    async def resolve(self, food_name: str) -> FoodResolution:
+        """
+        Находит калорийность продукта.
+
+        :param food_name: Название продукта.
+        :return: Калорийность, ответивший источник и время ответа источников.
+        """
+        latencies: Dict[str, float] = {}
+
+        started = time.perf_counter()
+        calories = food_cache.get(food_name)
+        self._record("cache", started, latencies)
+        if calories is not None:
+            return self._answer(calories, "cache", latencies)
+
+        index = await get_food_index()
+        if index is not None:
+            started = time.perf_counter()
+            found = index.lookup(food_name, fuzzy=False)
+            if found is None:
+                # Поиск похожего названия по большому индексу занимает миллисекунды: выполняем его в пуле потоков
+                found = await asyncio.to_thread(index.lookup, food_name)
+            self._record("index", started, latencies)
+            if found is not None:
+                return self._answer(found['calories'], "index", latencies)
+
+        return await self._resolve_remote(food_name, latencies)
+
+    async def _timed(
+        self,
+        tier: str,
+        request: Awaitable[Optional[int]],
+        latencies: Dict[str, float],
+    ) -> Tuple[str, Optional[int]]:
+        """
+        Выполняет запрос к источнику и замеряет время ответа. Ошибка запроса считается промахом.
+
+        :param tier: Название источника.
+        :param request: Корутина запроса, возвращающая калорийность или None.
+        :param latencies: Время ответа источников текущего поиска.
+        :return: Название источника и калорийность или None.
+        """
+        started = time.perf_counter()
+        try:
+            calories = await request
+        except Exception as e:  # pylint: disable=broad-except
+            logger.error('Ошибка источника калорийности %s: %s', tier, e)
+            calories = None
+        self._record(tier, started, latencies)
+        return tier, calories
+
+    @staticmethod
+    async def _from_openfoodfacts(food_name: str) -> Optional[int]:
+        info = await get_food_info(food_name)
+        if info is None:
+            return None
+        food_cache.put(food_name, info['calories'])
+        return info['calories']
+
+    @staticmethod
+    async def _from_llm(food_name: str) -> Optional[int]:
+        # Кэш калорийности уже проверен в resolve
+        info = await get_food_info_llm(food_name, use_cache=False)
+        return info.get('calories')
+
+    async def _resolve_remote(self, food_name: str, latencies: Dict[str, float]) -> FoodResolution:
+        """
+        Опрашивает OpenFoodFacts и LLM с хеджированием в пределах deadline.
+
+        :param food_name: Название продукта.
+        :param latencies: Время ответа источников текущего поиска.
+        :return: Результат поиска.
+        """
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + self.deadline
+        hedge_at = loop.time() + self.hedge_delay
+        pending = {asyncio.create_task(self._timed("openfoodfacts", self._from_openfoodfacts(food_name), latencies))}
+        llm_started = False
+        try:
+            while True:
+                now = loop.time()
+                if not llm_started and (now >= hedge_at or not pending):
+                    llm_started = True
+                    pending.add(asyncio.create_task(self._timed("llm", self._from_llm(food_name), latencies)))
+                if not pending or now >= deadline:
+                    break
+                wait_until = deadline if llm_started else min(deadline, hedge_at)
+                done, pending = await asyncio.wait(
+                    pending, timeout=wait_until - now, return_when=asyncio.FIRST_COMPLETED
+                )
+                for task in done:
+                    tier, calories = task.result()
+                    if calories is not None:
+                        return self._answer(calories, tier, latencies)
+        finally:
+            for task in pending:
+                task.cancel()
+
+        logger.warning('Калорийность продукта %s не найдена за %.1f с', food_name, self.deadline)
+        return self._answer(DEFAULT_CALORIES, "default", latencies)
+
+
+food_resolver = FoodResolver(settings.food_resolve_deadline, settings.food_hedge_delay)
+
+resolver_answers = metrics.Counter(
+    "bot_food_resolver_answers_total", "Ответы поиска калорийности по источникам", ("tier",)
+)
+resolver_answers.set_function(lambda: {(tier,): count for tier, count in food_resolver.answered.items()})
+resolver_latency = metrics.Counter(
+    "bot_food_resolver_latency_seconds_total", "Суммарное время ответов источников калорийности", ("tier",)
+)
+resolver_latency.set_function(lambda: {(tier,): total for tier, total in food_resolver.latency_sum.items()})
+resolver_requests = metrics.Counter(
+    "bot_food_resolver_requests_total", "Количество замеров времени источников калорийности", ("tier",)
+)
+resolver_requests.set_function(lambda: {(tier,): count for tier, count in food_resolver.latency_count.items()})
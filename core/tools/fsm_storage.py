@@ -0,0 +1,207 @@
+"""
+Хранилище состояний FSM, переживающее перезапуск бота.
+
+Состояния и данные форм (ProfileForm, LogFoodForm и др.) записываются в SQLite
+и кэшируются в памяти. Незавершенные формы, которые не менялись дольше ttl,
+считаются брошенными и удаляются.
+"""
+import json
+import time
+import sqlite3
+import asyncio
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Optional
+
+from aiogram.fsm.state import State
+from aiogram.fsm.storage.base import BaseStorage, StateType, StorageKey
+from aiogram.fsm.storage.memory import MemoryStorage
+
+from core.tools.settings import settings
+from core.tools.storage.batching import KeyedLock
+from core.tools.app_logger import get_logger
+
+logger = get_logger(__name__)
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS fsm (
+    key TEXT PRIMARY KEY,
+    state TEXT,
+    data TEXT NOT NULL,
+    updated_at REAL NOT NULL
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS fsm_updated_at ON fsm (updated_at);
+"""
+
+# Через сколько записей из базы удаляются брошенные состояния
+_PURGE_EVERY = 1000
+
+
+@dataclass
+class _Record:
+    state: Optional[str] = None
+    data: Dict[str, Any] = field(default_factory=dict)
+    updated_at: float = 0.0
+
+
+class SqliteFSMStorage(BaseStorage):
+    """
+    Хранилище FSM в SQLite с кэшем последних ключей в памяти.
+
+    Изменения сразу записываются в базу (в пуле потоков) строго по очереди для каждого
+    ключа, чтение обслуживается из кэша, а при промахе — из базы. База открывается в режиме WAL, поэтому ее могут использовать
+    несколько процессов. Кэш в памяти у каждого процесса свой: при запуске нескольких
+    воркеров (WORKERS) обновления пользователя всегда попадают в один процесс, и его
+    кэш остается согласованным с базой.
+
+    Атрибуты:
+        hits (int): Чтения, обслуженные из кэша.
+        misses (int): Чтения, потребовавшие обращения к базе.
+        expired (int): Брошенные состояния, сброшенные по ttl.
+    """
+
+    def __init__(self, path: str = "./data/fsm.sqlite3", ttl: float = 86400, max_entries: int = 10000):
+        """
+        Открывает базу и создает таблицу, если ее нет.
+
+        :param path: Путь к файлу базы SQLite.
+        :param ttl: Через сколько секунд без изменений состояние считается брошенным (0 — никогда).
+        :param max_entries: Максимальное количество ключей в кэше.
+        """
+        self.path = path
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self.expired = 0
+        self._cache: OrderedDict[str, _Record] = OrderedDict()
+        self._writes = 0
+        self._lock = threading.Lock()
+        self._write_locks = KeyedLock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self.purge()
+
+    @staticmethod
+    def _key(key: StorageKey) -> str:
+        return ":".join(
+            str(part)
+            for part in (
+                key.bot_id,
+                key.chat_id,
+                key.user_id,
+                key.thread_id,
+                key.business_connection_id,
+                key.destiny,
+            )
+        )
+
+    def _is_expired(self, record: _Record) -> bool:
+        return bool(self.ttl) and time.time() - record.updated_at > self.ttl
+
+    def _remember(self, key: str, record: _Record) -> None:
+        self._cache[key] = record
+        self._cache.move_to_end(key)
+        while len(self._cache) > self.max_entries:
+            self._cache.popitem(last=False)
+
+    def _select(self, key: str) -> _Record:
+        with self._lock:
+            row = self._conn.execute("SELECT state, data, updated_at FROM fsm WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return _Record()
+        return _Record(row[0], json.loads(row[1]), row[2])
+
+    def _write(self, key: str, record: _Record) -> None:
+        with self._lock:
+            if record.state is None and not record.data:
+                self._conn.execute("DELETE FROM fsm WHERE key = ?", (key,))
+            else:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO fsm (key, state, data, updated_at) VALUES (?, ?, ?, ?)",
+                    (key, record.state, json.dumps(record.data, ensure_ascii=False), record.updated_at),
+                )
+
+    def purge(self) -> int:
+        """
+        Удаляет из базы брошенные состояния.
+
+        :return: Количество удаленных записей.
+        """
+        if not self.ttl:
+            return 0
+        with self._lock:
+            deleted = self._conn.execute("DELETE FROM fsm WHERE updated_at < ?", (time.time() - self.ttl,)).rowcount
+        if deleted:
+            logger.info('Удалено брошенных состояний FSM: %d', deleted)
+        return deleted
+
+    async def _get(self, key: StorageKey) -> _Record:
+        """
+        Возвращает запись ключа из кэша или базы. Брошенная запись сбрасывается.
+
+        :param key: Ключ FSM.
+        :return: Запись; пустая, если состояния нет.
+        """
+        name = self._key(key)
+        record = self._cache.get(name)
+        if record is None:
+            self.misses += 1
+            record = await asyncio.to_thread(self._select, name)
+            # Пока шло чтение из базы, запись могла появиться в кэше
+            record = self._cache.get(name, record)
+        else:
+            self.hits += 1
+        if (record.state is not None or record.data) and self._is_expired(record):
+            self.expired += 1
+            record = _Record()
+            await self._put(name, record)
+        self._remember(name, record)
+        return record
+
+    async def _put(self, name: str, record: _Record) -> None:
+        record.updated_at = time.time()
+        self._remember(name, record)
+        # Записи одного ключа не должны обгонять друг друга в пуле потоков
+        async with self._write_locks.acquire(name):
+            await asyncio.to_thread(self._write, name, record)
+        self._writes += 1
+        if self._writes % _PURGE_EVERY == 0:
+            await asyncio.to_thread(self.purge)
+
+    async def set_state(self, key: StorageKey, state: StateType = None) -> None:
+        record = await self._get(key)
+        state = state.state if isinstance(state, State) else state
+        await self._put(self._key(key), _Record(state, record.data))
+
+    async def get_state(self, key: StorageKey) -> Optional[str]:
+        return (await self._get(key)).state
+
+    async def set_data(self, key: StorageKey, data: Dict[str, Any]) -> None:
+        record = await self._get(key)
+        await self._put(self._key(key), _Record(record.state, dict(data)))
+
+    async def get_data(self, key: StorageKey) -> Dict[str, Any]:
+        return dict((await self._get(key)).data)
+
+    async def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+def create_fsm_storage(kind: str) -> BaseStorage:
+    """
+    Создает хранилище FSM по названию.
+
+    :param kind: Название хранилища: memory или sqlite.
+    :return: Хранилище FSM.
+    :raises ValueError: Если название неизвестно.
+    """
+    if kind == "memory":
+        return MemoryStorage()
+    if kind == "sqlite":
+        return SqliteFSMStorage(settings.fsm_db_path, settings.fsm_state_ttl)
+    raise ValueError(f'Неизвестное хранилище FSM: {kind}')
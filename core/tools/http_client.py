@@ -0,0 +1,152 @@
+import time
+from dataclasses import dataclass
+from typing import Dict
+
+import httpx
+
+from core.tools.settings import settings
+from core.tools.metrics import Counter, Histogram
+from core.tools.app_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+@dataclass
+class Integration:
+    """
+    Настройки HTTP-клиента для одного внешнего сервиса.
+
+    Атрибуты:
+        base_url (str): Базовый URL сервиса.
+        timeout (httpx.Timeout): Таймауты запросов к сервису.
+        max_connections (int): Максимальное количество соединений с хостом сервиса.
+    """
+    base_url: str
+    timeout: httpx.Timeout
+    max_connections: int
+
+
+# Внешние сервисы: у каждого свой хост, поэтому лимиты клиента действуют как лимиты на хост
+INTEGRATIONS: Dict[str, Integration] = {
+    "openweathermap": Integration(
+        base_url=settings.openweathermap_url,
+        timeout=httpx.Timeout(5.0, connect=3.0),
+        max_connections=20,
+    ),
+    "openfoodfacts": Integration(
+        base_url=settings.openfoodfacts_url,
+        timeout=httpx.Timeout(30.0, connect=5.0),
+        max_connections=10,
+    ),
+    "yandex_gpt": Integration(
+        base_url=settings.yandex_gpt_url,
+        timeout=httpx.Timeout(30.0, connect=5.0),
+        max_connections=10,
+    ),
+}
+
+_clients: Dict[str, httpx.AsyncClient] = {}
+
+request_seconds = Histogram(
+    "bot_external_request_seconds", "Время запросов к внешним сервисам до получения заголовков ответа", ("service",)
+)
+request_errors = Counter(
+    "bot_external_request_errors_total", "Ошибки запросов к внешним сервисам", ("service", "reason")
+)
+
+
+class MeteredTransport(httpx.AsyncBaseTransport):
+    """
+    Транспорт httpx, который замеряет время запросов к сервису и считает ошибки:
+    исключения транспорта (таймауты, разрывы соединения) и ответы 5xx и 429.
+    """
+
+    def __init__(self, service: str, transport: httpx.AsyncBaseTransport):
+        """
+        :param service: Название сервиса (значение метки service).
+        :param transport: Транспорт, который выполняет запросы.
+        """
+        self.service = service
+        self._transport = transport
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        started = time.perf_counter()
+        try:
+            response = await self._transport.handle_async_request(request)
+        except httpx.TimeoutException:
+            request_errors.inc(service=self.service, reason="timeout")
+            raise
+        except httpx.TransportError:
+            request_errors.inc(service=self.service, reason="transport")
+            raise
+        finally:
+            request_seconds.observe(time.perf_counter() - started, service=self.service)
+        if response.status_code >= 500 or response.status_code == 429:
+            request_errors.inc(service=self.service, reason=str(response.status_code))
+        return response
+
+    async def aclose(self) -> None:
+        await self._transport.aclose()
+
+
+def _http2_available() -> bool:
+    """
+    Проверяет, установлен ли пакет h2, необходимый httpx для HTTP/2.
+
+    В образе бота он ставится вместе с httpx[http2] из requirements.txt; без него
+    (например, в окружении разработчика) клиенты работают по HTTP/1.1.
+    """
+    try:
+        import h2  # noqa: F401  pylint: disable=import-outside-toplevel,unused-import
+    except ImportError:
+        return False
+    return True
+
+
+def _create_client(name: str, integration: Integration) -> httpx.AsyncClient:
+    # Лимиты пула соединений задаются транспорту: при переданном транспорте клиент их не использует
+    transport = httpx.AsyncHTTPTransport(
+        limits=httpx.Limits(
+            max_connections=integration.max_connections,
+            max_keepalive_connections=integration.max_connections,
+            keepalive_expiry=60.0,
+        ),
+        http2=_http2_available(),
+    )
+    return httpx.AsyncClient(
+        base_url=integration.base_url,
+        timeout=integration.timeout,
+        transport=MeteredTransport(name, transport),
+    )
+
+
+def get_http_client(name: str) -> httpx.AsyncClient:
+    """
+    Возвращает общий HTTP-клиент внешнего сервиса. Если клиенты еще не созданы
+    (например, при запуске вне бота), клиент создается при первом обращении.
+
+    :param name: Название сервиса из INTEGRATIONS.
+    :return: HTTP-клиент с пулом соединений.
+    """
+    client = _clients.get(name)
+    if client is None or client.is_closed:
+        client = _clients[name] = _create_client(name, INTEGRATIONS[name])
+    return client
+
+
+async def start_http_clients() -> None:
+    """
+    Создает HTTP-клиенты всех внешних сервисов. Регистрируется в startup диспетчера.
+    """
+    for name in INTEGRATIONS:
+        get_http_client(name)
+    logger.info('HTTP-клиенты созданы, HTTP/2: %s', _http2_available())
+
+
+async def close_http_clients() -> None:
+    """
+    Закрывает HTTP-клиенты и их соединения. Регистрируется в shutdown диспетчера.
+    """
+    for client in _clients.values():
+        await client.aclose()
+    _clients.clear()
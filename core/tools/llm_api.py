@@ -1,53 +1,146 @@
+import re
 import json
-from typing import Dict
-import httpx
+from typing import Dict, List, Optional
 
 from core.tools.settings import settings
+from core.tools.http_client import get_http_client
+from core.tools.food_cache import food_cache, normalize_food_name
+from core.tools.llm_batcher import MicroBatcher
+from core.tools.metrics import Counter
+from core.tools.tracing import span
 from core.tools.app_logger import get_logger
 
 # Инициализация логгера для текущего модуля
 logger = get_logger(__name__)
 
+# Шаблон промпта читается один раз при импорте модуля
+with open("./core/tools/prompts/prompt.json", "r", encoding='utf-8') as f:
+    _PROMPT_TEMPLATE = json.load(f)
+with open("./core/tools/prompts/prompt_batch.json", "r", encoding='utf-8') as f:
+    _BATCH_PROMPT_TEMPLATE = json.load(f)
 
-async def get_food_info_llm(food_name: str) -> Dict[str, int]:
+# Строка ответа на пакетный запрос: «номер: калорийность»
+_BATCH_ANSWER = re.compile(r"^\s*(\d+)\s*[:.)\-]\s*(\d+)\s*$", re.MULTILINE)
+
+llm_requests = Counter("bot_llm_requests_total", "Запросы к Yandex GPT", ("kind",))
+llm_fallbacks = Counter(
+    "bot_llm_fallbacks_total", "Одиночные запросы к Yandex GPT после неразобранного ответа на пачку"
+)
+
+
+def _build_prompt(food_name: str, template: Dict = _PROMPT_TEMPLATE) -> Dict:
     """
-    Получает информацию о калорийности продукта с использованием Yandex GPT API.
+    Собирает тело запроса к Yandex GPT из шаблона промпта.
 
-    :param food_name: Название продукта, для которого нужно получить информацию.
-    :return: Словарь с ключом 'calories' и значением калорийности продукта.
-             В случае ошибки возвращает калорийность по умолчанию (50).
+    :param food_name: Название продукта (или список продуктов для пакетного запроса).
+    :param template: Шаблон промпта.
+    :return: Тело запроса.
     """
-    # URL для запроса к Yandex GPT API
-    url = "https://llm.api.cloud.yandex.net/foundationModels/v1/completion"
+    data = dict(template)
+    data['messages'] = [dict(message) for message in template['messages']]
+
+    # Указание модели и передача названия продукта в промпт
+    data['modelUri'] = f"gpt://{settings.folder_id}/yandexgpt"
+    data['messages'][1]['text'] = food_name
+    return data
+
 
-    # Заголовки запроса
-    headers = {
+def _headers() -> Dict[str, str]:
+    return {
         "Content-Type": "application/json",
         "Authorization": f"Bearer {settings.iam_token}"
     }
 
-    # Чтение промпта из JSON-файла
-    with open("./core/tools/prompts/prompt.json", "r", encoding='utf-8') as f:
-        prompt = f.read()
 
-    # Загрузка промпта в формате JSON
-    data = json.loads(prompt)
+async def get_food_info_llm(food_name: str, use_cache: bool = True) -> Dict[str, int]:
+    """
+    Получает информацию о калорийности продукта с использованием Yandex GPT API.
 
-    # Указание модели и передача названия продукта в промпт
-    data['modelUri'] = f"gpt://{settings.folder_id}/yandexgpt"
-    data['messages'][1]['text'] = food_name
+    Сначала продукт ищется в кэше калорийности (food_cache), запрос к LLM
+    выполняется только при промахе. Одновременные запросы собираются в пачки
+    (llm_batcher) и отправляются в LLM одним промптом.
+
+    :param food_name: Название продукта, для которого нужно получить информацию.
+    :param use_cache: Искать ли продукт в кэше; False, если вызывающий код уже искал его там.
+    :return: Словарь с ключом 'calories' и значением калорийности продукта.
+             В случае ошибки возвращает калорийность по умолчанию (50).
+    """
+    if use_cache:
+        calories = food_cache.get(food_name)
+        if calories is not None:
+            return {"calories": calories}
+    with span("llm"):
+        return await llm_batcher.submit(normalize_food_name(food_name) or food_name, food_name)
+
+
+async def _request_food_info_llm(food_name: str) -> Dict[str, int]:
+    """
+    Запрашивает калорийность продукта у Yandex GPT и сохраняет успешный ответ в кэш.
 
-    # Асинхронный запрос к Yandex GPT API
-    async with httpx.AsyncClient() as client:
-        response = await client.post(url, json=data, headers=headers)
+    :param food_name: Название продукта.
+    :return: Словарь с ключом 'calories'. В случае ошибки калорийность по умолчанию (50).
+    """
+    data = _build_prompt(food_name)
+
+    # Асинхронный запрос к Yandex GPT API через общий HTTP-клиент
+    client = get_http_client("yandex_gpt")
+    response = await client.post("/foundationModels/v1/completion", json=data, headers=_headers())
+    llm_requests.inc(kind="single")
 
     try:
         # Извлечение калорийности из ответа API
         calories = int(response.json()['result']['alternatives'][0]['message']['text'])
-    except KeyError:
+    except (KeyError, ValueError):
         # Логирование ошибки, если не удалось извлечь калорийность
         logger.error(response.text)
         calories = 50  # Значение по умолчанию в случае ошибки
+    else:
+        food_cache.put(food_name, calories)
 
     # Возврат результата в виде словаря
     return {"calories": calories}
+
+
+async def _request_food_info_llm_batch(food_names: List[str]) -> List[Optional[Dict[str, int]]]:
+    """
+    Запрашивает калорийность нескольких продуктов у Yandex GPT одним промптом.
+
+    Ответ разбирается построчно, поэтому ошибка в одной строке затрагивает только
+    один продукт: для него возвращается None, и llm_batcher запросит его отдельно.
+
+    :param food_names: Названия продуктов.
+    :return: Словари с ключом 'calories' в порядке продуктов или None, если ответ для продукта не разобран.
+    """
+    items = "\n".join(f"{number}: {name}" for number, name in enumerate(food_names, start=1))
+    data = _build_prompt(items, _BATCH_PROMPT_TEMPLATE)
+
+    client = get_http_client("yandex_gpt")
+    response = await client.post("/foundationModels/v1/completion", json=data, headers=_headers())
+    llm_requests.inc(kind="batch")
+
+    try:
+        text = response.json()['result']['alternatives'][0]['message']['text']
+    except (KeyError, ValueError, IndexError):
+        logger.error(response.text)
+        return [None] * len(food_names)
+
+    answers: List[Optional[Dict[str, int]]] = [None] * len(food_names)
+    for number, calories in _BATCH_ANSWER.findall(text):
+        index = int(number) - 1
+        if 0 <= index < len(food_names) and answers[index] is None:
+            answers[index] = {"calories": int(calories)}
+            food_cache.put(food_names[index], int(calories))
+    missing = answers.count(None)
+    if missing:
+        logger.warning('В ответе LLM не разобрано %d из %d продуктов', missing, len(food_names))
+    return answers
+
+
+# Пачки запросов к LLM: одинаковые продукты объединяются по нормализованному названию
+llm_batcher: MicroBatcher[Dict[str, int]] = MicroBatcher(
+    _request_food_info_llm_batch,
+    _request_food_info_llm,
+    window=settings.llm_batch_window,
+    max_batch=settings.llm_batch_size,
+)
+llm_fallbacks.set_function(lambda: llm_batcher.fallbacks)
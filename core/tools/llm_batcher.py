@@ -0,0 +1,136 @@
+import asyncio
+from typing import Awaitable, Callable, Dict, Generic, List, Optional, Tuple, TypeVar
+
+from core.tools.app_logger import get_logger
+
+logger = get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class MicroBatcher(Generic[T]):
+    """
+    Собирает одновременные запросы за короткое окно и отправляет их одной пачкой.
+
+    Одинаковые запросы (с одинаковым ключом) внутри окна объединяются. Пачка
+    отправляется, когда истекло окно или набралось max_batch разных запросов.
+    Если ответ для отдельного элемента не удалось получить из пачки, для него
+    выполняется одиночный запрос, остальные элементы пачки это не затрагивает.
+
+    Атрибуты:
+        batches (int): Количество отправленных пачек.
+        fallbacks (int): Количество одиночных запросов после неудачи пачки.
+    """
+
+    def __init__(
+        self,
+        send_batch: Callable[[List[str]], Awaitable[List[Optional[T]]]],
+        send_one: Callable[[str], Awaitable[T]],
+        window: float = 0.05,
+        max_batch: int = 20,
+        max_concurrent: int = 4,
+    ):
+        """
+        :param send_batch: Корутина запроса пачки. Возвращает ответы в порядке элементов,
+                           None для элементов, ответ на которые получить не удалось.
+        :param send_one: Корутина одиночного запроса.
+        :param window: Окно накопления запросов в секундах.
+        :param max_batch: Максимальное количество элементов в пачке.
+        :param max_concurrent: Максимальное количество одновременных запросов.
+        """
+        self._send_batch = send_batch
+        self._send_one = send_one
+        self.window = window
+        self.max_batch = max_batch
+        self._semaphore = asyncio.Semaphore(max_concurrent)
+        self._pending: Dict[str, Tuple[str, List[asyncio.Future]]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks: set = set()
+        self.batches = 0
+        self.fallbacks = 0
+
+    async def submit(self, key: str, item: str) -> T:
+        """
+        Ставит запрос в текущую пачку и дожидается ответа на него.
+
+        :param key: Ключ для объединения одинаковых запросов.
+        :param item: Запрос.
+        :return: Ответ на запрос.
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        if key in self._pending:
+            self._pending[key][1].append(future)
+        else:
+            self._pending[key] = (item, [future])
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self) -> None:
+        """
+        Забирает накопленную пачку и запускает ее отправку.
+        """
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        batch, self._pending = self._pending, {}
+        if batch:
+            task = asyncio.create_task(self._send(list(batch.values())))
+            self._tasks.add(task)
+            task.add_done_callback(self._tasks.discard)
+
+    async def _send(self, batch: List[Tuple[str, List[asyncio.Future]]]) -> None:
+        """
+        Отправляет пачку и раздает ответы ожидающим запросам.
+
+        :param batch: Пары запрос → список ожидающих его future.
+        """
+        items = [item for item, _ in batch]
+        async with self._semaphore:
+            if len(items) == 1:
+                # Одиночный запрос дешевле и надежнее пакетного промпта
+                results: List[Optional[T]] = [None]
+            else:
+                self.batches += 1
+                try:
+                    results = await self._send_batch(items)
+                except Exception as e:  # pylint: disable=broad-except
+                    logger.error('Ошибка пакетного запроса из %d элементов: %s', len(items), e)
+                    results = [None] * len(items)
+        await asyncio.gather(*(
+            self._resolve(item, futures, result, fallback=len(items) > 1)
+            for (item, futures), result in zip(batch, results)
+        ))
+
+    async def _resolve(
+        self,
+        item: str,
+        futures: List[asyncio.Future],
+        result: Optional[T],
+        fallback: bool,
+    ) -> None:
+        """
+        Передает ответ ожидающим запросам, при необходимости выполняя одиночный запрос.
+
+        :param item: Запрос.
+        :param futures: Future ожидающих этот запрос.
+        :param result: Ответ из пачки или None.
+        :param fallback: Был ли элемент отправлен в пачке.
+        """
+        if result is None:
+            if fallback:
+                self.fallbacks += 1
+            try:
+                async with self._semaphore:
+                    result = await self._send_one(item)
+            except Exception as e:  # pylint: disable=broad-except
+                for future in futures:
+                    if not future.done():
+                        future.set_exception(e)
+                return
+        for future in futures:
+            if not future.done():
+                future.set_result(result)
@@ -0,0 +1,361 @@
+"""
+Метрики бота в текстовом формате Prometheus.
+
+Метрики объявляются в модулях, к которым относятся, и регистрируются в общем
+реестре (REGISTRY). Маршрут /metrics веб-приложения отдает текущие значения.
+Значения, которые уже считаются объектами бота (попадания в кэши, глубина очередей),
+не дублируются, а читаются функциями в момент запроса (set_function).
+
+При WORKERS больше 1 воркеры периодически передают снимки своих метрик (collect)
+основному процессу, и его /metrics отдает их с меткой worker (set_worker_snapshot).
+"""
+import math
+import asyncio
+import bisect
+from typing import Any, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from aiohttp import web
+
+from core.tools.app_logger import get_logger
+
+logger = get_logger(__name__)
+
+# Границы корзин гистограмм времени по умолчанию, в секундах
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+# Снимок метрики: имя, описание, тип и значения
+Family = Tuple[str, str, str, List[Sample]]
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value))
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Registry:
+    """
+    Реестр метрик процесса.
+    """
+
+    def __init__(self):
+        self._metrics: Dict[str, 'Metric'] = {}
+        # Последние снимки метрик процессов-воркеров: номер воркера → метрики
+        self._workers: Dict[str, List[Family]] = {}
+
+    def register(self, metric: 'Metric') -> None:
+        """
+        Добавляет метрику в реестр.
+
+        :param metric: Метрика.
+        :raises ValueError: Если метрика с таким именем уже зарегистрирована.
+        """
+        if metric.name in self._metrics:
+            raise ValueError(f'Метрика {metric.name} уже зарегистрирована')
+        self._metrics[metric.name] = metric
+
+    def collect(self) -> List[Family]:
+        """
+        Снимает текущие значения всех метрик процесса.
+
+        :return: Метрики в виде, который можно передать в другой процесс (pickle).
+        """
+        return [(metric.name, metric.help, metric.type, list(metric.samples())) for metric in self._metrics.values()]
+
+    def set_worker_snapshot(self, worker: Any, families: List[Family]) -> None:
+        """
+        Запоминает снимок метрик процесса-воркера, заменяя предыдущий.
+
+        :param worker: Номер воркера (значение метки worker).
+        :param families: Результат collect в процессе воркера.
+        """
+        self._workers[str(worker)] = families
+
+    def render(self) -> str:
+        """
+        Формирует текущие значения всех метрик процесса и последние снимки метрик воркеров.
+
+        :return: Текст в формате Prometheus (text/plain; version=0.0.4).
+        """
+        families: Dict[str, Family] = {family[0]: family for family in self.collect()}
+        for worker, snapshot in sorted(self._workers.items()):
+            for family_name, help_text, kind, samples in snapshot:
+                family = families.setdefault(family_name, (family_name, help_text, kind, []))
+                family[3].extend(
+                    (name, labels if "worker" in labels else {**labels, "worker": worker}, value)
+                    for name, labels, value in samples
+                )
+        lines: List[str] = []
+        for family_name, help_text, kind, samples in families.values():
+            lines.append(f"# HELP {family_name} {help_text}")
+            lines.append(f"# TYPE {family_name} {kind}")
+            for name, labels, value in samples:
+                if labels:
+                    pairs = ",".join(f'{key}="{_escape(str(val))}"' for key, val in labels.items())
+                    lines.append(f"{name}{{{pairs}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+
+class Metric:
+    """
+    Базовый класс метрики с метками.
+
+    Значения хранятся по кортежам значений меток. Вместо хранимых значений можно
+    задать функцию (set_function), которая вызывается при каждом запросе /metrics.
+    """
+    type = "untyped"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,  # pylint: disable=redefined-builtin
+        labels: Sequence[str] = (),
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        """
+        :param name: Имя метрики.
+        :param help: Описание метрики.
+        :param labels: Имена меток.
+        :param registry: Реестр, в котором регистрируется метрика; None — не регистрировать.
+        """
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        # Метрика без меток видна со значением 0 еще до первого изменения
+        self._values: Dict[LabelValues, float] = {} if self.labels else {(): 0}
+        self._function: Optional[Callable[[], Any]] = None
+        if registry is not None:
+            registry.register(self)
+
+    def _key(self, labels: Dict[str, Any]) -> LabelValues:
+        return tuple(str(labels[label]) for label in self.labels)
+
+    def set_function(self, function: Callable[[], Any]) -> None:
+        """
+        Задает функцию, возвращающую значение метрики при запросе.
+
+        :param function: Функция без аргументов. Для метрики без меток возвращает число,
+                         для метрики с метками — словарь {кортеж значений меток: число}.
+        """
+        self._function = function
+
+    def _current(self) -> Dict[LabelValues, float]:
+        values = dict(self._values)
+        if self._function is not None:
+            try:
+                result = self._function()
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error('Ошибка чтения метрики %s: %s', self.name, e)
+                return values
+            if isinstance(result, dict):
+                values.update({tuple(str(part) for part in key): value for key, value in result.items()})
+            else:
+                values[()] = result
+        return values
+
+    def samples(self) -> Iterable[Sample]:
+        """
+        Возвращает значения метрики.
+
+        :return: Тройки (имя, метки, значение).
+        """
+        for key, value in self._current().items():
+            yield self.name, dict(zip(self.labels, key)), value
+
+
+class Counter(Metric):
+    """
+    Счетчик, который только растет.
+    """
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels: Any) -> None:
+        """
+        Увеличивает счетчик.
+
+        :param amount: Величина увеличения.
+        :param labels: Значения меток.
+        """
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """
+    Значение, которое может расти и уменьшаться.
+    """
+    type = "gauge"
+
+    def set(self, value: float, **labels: Any) -> None:
+        """
+        Устанавливает значение.
+
+        :param value: Новое значение.
+        :param labels: Значения меток.
+        """
+        self._values[self._key(labels)] = value
+
+
+class Histogram(Metric):
+    """
+    Распределение значений по корзинам.
+    """
+    type = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        help: str,  # pylint: disable=redefined-builtin
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+        registry: Optional[Registry] = REGISTRY,
+    ):
+        """
+        :param name: Имя метрики.
+        :param help: Описание метрики.
+        :param labels: Имена меток.
+        :param buckets: Верхние границы корзин по возрастанию (без +Inf).
+        :param registry: Реестр, в котором регистрируется метрика.
+        """
+        super().__init__(name, help, labels, registry)
+        self.buckets = tuple(buckets)
+        # Значения меток → (количество по корзинам, [сумма, количество])
+        self._histograms: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        """
+        Добавляет наблюдение.
+
+        :param value: Значение.
+        :param labels: Значения меток.
+        """
+        key = self._key(labels)
+        histogram = self._histograms.get(key)
+        if histogram is None:
+            histogram = self._histograms[key] = ([0] * (len(self.buckets) + 1), [0.0, 0.0])
+        counts, totals = histogram
+        counts[bisect.bisect_left(self.buckets, value)] += 1
+        totals[0] += value
+        totals[1] += 1
+
+    def samples(self) -> Iterable[Sample]:
+        for key, (counts, totals) in self._histograms.items():
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, totals[0]
+            yield f"{self.name}_count", labels, totals[1]
+
+
+# Кэши бота: название → функция, возвращающая количество попаданий и промахов
+_caches: Dict[str, Callable[[], Tuple[int, int]]] = {}
+
+cache_requests = Counter("bot_cache_requests_total", "Обращения к кэшам бота", ("cache", "result"))
+cache_hit_ratio = Gauge("bot_cache_hit_ratio", "Доля попаданий в кэши бота", ("cache",))
+
+
+def register_cache(name: str, stats: Callable[[], Tuple[int, int]]) -> None:
+    """
+    Добавляет кэш в метрики bot_cache_requests_total и bot_cache_hit_ratio.
+
+    :param name: Название кэша (значение метки cache).
+    :param stats: Функция, возвращающая количество попаданий и промахов.
+    """
+    _caches[name] = stats
+
+
+def _cache_requests() -> Dict[LabelValues, float]:
+    values = {}
+    for name, stats in _caches.items():
+        hits, misses = stats()
+        values[(name, "hit")] = hits
+        values[(name, "miss")] = misses
+    return values
+
+
+def _cache_hit_ratio() -> Dict[LabelValues, float]:
+    values = {}
+    for name, stats in _caches.items():
+        hits, misses = stats()
+        values[(name,)] = hits / (hits + misses) if hits + misses else 0.0
+    return values
+
+
+cache_requests.set_function(_cache_requests)
+cache_hit_ratio.set_function(_cache_hit_ratio)
+
+loop_lag = Gauge("bot_event_loop_lag_seconds", "Последняя задержка цикла событий")
+loop_lag_histogram = Histogram(
+    "bot_event_loop_lag_distribution_seconds",
+    "Распределение задержек цикла событий",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+
+
+class LoopMonitor:
+    """
+    Измеряет задержку цикла событий: насколько позже заданного интервала
+    просыпается фоновая задача. Большая задержка означает, что цикл занят
+    синхронной работой и обновления ждут обработки.
+    """
+
+    def __init__(self, interval: float = 0.5):
+        """
+        :param interval: Интервал замеров в секундах.
+        """
+        self.interval = interval
+        self._task: Optional[asyncio.Task] = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            started = loop.time()
+            await asyncio.sleep(self.interval)
+            lag = max(0.0, loop.time() - started - self.interval)
+            loop_lag.set(lag)
+            loop_lag_histogram.observe(lag)
+
+    async def start(self) -> None:
+        """
+        Запускает замеры. Регистрируется в startup диспетчера.
+        """
+        if self._task is None:
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        """
+        Останавливает замеры. Регистрируется в shutdown диспетчера.
+        """
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+
+loop_monitor = LoopMonitor()
+
+
+async def metrics_handler(request: web.Request) -> web.Response:
+    """
+    Отдает метрики процесса в формате Prometheus.
+
+    :param request: Запрос.
+    :return: Ответ с текстом метрик.
+    """
+    return web.Response(
+        body=REGISTRY.render().encode(),
+        headers={"Content-Type": "text/plain; version=0.0.4; charset=utf-8"},
+    )
@@ -1,34 +1,90 @@
-from typing import Callable, Dict, Any, Awaitable
+import json
+import time
+from datetime import datetime, timezone
+from typing import Callable, Dict, Any, Awaitable, Optional
 from aiogram import BaseMiddleware
-from aiogram.types import Message
-from core.tools.app_logger import get_logger
+from aiogram.dispatcher.event.handler import HandlerObject
+from aiogram.types import CallbackQuery, Message, TelegramObject
+from core.tools.app_logger import get_logger, get_trace_logger
+from core.tools.tracing import trace
+from core.tools.metrics import Counter, Histogram
 
 # Инициализация логгера для текущего модуля
 logger = get_logger(__name__)
+trace_logger = get_trace_logger()
+
+updates_total = Counter("bot_updates_total", "Обработанные сообщения и нажатия на кнопки", ("update_type", "status"))
+handler_seconds = Histogram("bot_handler_seconds", "Время работы обработчиков", ("handler",))
+
+
+def _handler_name(handler: Optional[HandlerObject]) -> Optional[str]:
+    """
+    Возвращает полное имя функции-обработчика.
+
+    :param handler: Обработчик, выбранный диспетчером.
+    :return: Имя вида модуль.функция или None, если обработчик неизвестен.
+    """
+    if handler is None:
+        return None
+    callback = handler.callback
+    return f"{callback.__module__}.{getattr(callback, '__qualname__', repr(callback))}"
 
 
 class LoggingMiddleware(BaseMiddleware):
     """
-    Middleware для логирования входящих сообщений.
-    Логирует текст сообщения и ID пользователя.
+    Middleware для логирования и трассировки входящих сообщений и нажатий на кнопки.
+
+    Логирует текст сообщения (или данные кнопки) и ID пользователя, а после обработки
+    записывает в лог трассировки JSON с именем обработчика, состоянием FSM, общим
+    временем обработки и временем в хранилище, HTTP, LLM и отрисовке (см. tracing),
+    а также обновляет метрики bot_updates_total и bot_handler_seconds.
+    Регистрируется как внутренний middleware для message и callback_query.
     """
     # pylint: disable=too-few-public-methods
     async def __call__(
         self,
-        handler: Callable[[Message, Dict[str, Any]], Awaitable[Any]],
-        event: Message,
+        handler: Callable[[TelegramObject, Dict[str, Any]], Awaitable[Any]],
+        event: TelegramObject,
         data: Dict[str, Any]
     ) -> Any:
         """
-        Обрабатывает входящее сообщение, логируя его текст и ID пользователя.
+        Обрабатывает входящее событие, логируя его и замеряя время обработки.
 
         :param handler: Обработчик, который будет вызван после middleware.
-        :param event: Входящее сообщение.
+        :param event: Входящее сообщение или нажатие на кнопку.
         :param data: Дополнительные данные, переданные в обработчик.
         :return: Результат выполнения обработчика.
         """
-        # Логируем текст сообщения и ID пользователя
-        logger.info(event.text, user_id=event.from_user.id)
+        # Логируем текст сообщения (данные кнопки) и ID пользователя
+        if isinstance(event, CallbackQuery):
+            update_type, text = "callback_query", event.data
+        else:
+            update_type, text = "message", event.text if isinstance(event, Message) else None
+        user_id = event.from_user.id if getattr(event, "from_user", None) else None
+        logger.info(text, user_id=user_id)
 
-        # Передаем управление обработчику
-        return await handler(event, data)
+        # Передаем управление обработчику, замеряя время
+        status = "ok"
+        start = time.perf_counter()
+        with trace() as spans:
+            try:
+                return await handler(event, data)
+            except Exception:
+                status = "error"
+                raise
+            finally:
+                elapsed = time.perf_counter() - start
+                handler_name = _handler_name(data.get("handler"))
+                updates_total.inc(update_type=update_type, status=status)
+                handler_seconds.observe(elapsed, handler=handler_name)
+                record = {
+                    "time": datetime.now(timezone.utc).isoformat(timespec="milliseconds"),
+                    "update_type": update_type,
+                    "user_id": user_id,
+                    "handler": handler_name,
+                    "state": data.get("raw_state"),
+                    "status": status,
+                    "total_ms": round(elapsed * 1000, 2),
+                }
+                record.update({f"{kind}_ms": round(seconds * 1000, 2) for kind, seconds in spans.items()})
+                trace_logger.info(json.dumps(record, ensure_ascii=False))
@@ -1,13 +1,139 @@
-import httpx
+import time
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Tuple
+
+from core.tools.settings import settings
+from core.tools.http_client import get_http_client
+from core.tools.tracing import span
+from core.tools.metrics import register_cache
 from core.tools.app_logger import get_logger
 
 logger = get_logger(__name__)
 
 
+class WeatherCache:
+    """
+    Кэш погоды по городам с ограниченным временем жизни записей.
+
+    Успешные ответы хранятся ttl секунд, ответы о неизвестном городе — negative_ttl секунд.
+    Одновременные запросы одного и того же города объединяются в один запрос к API.
+
+    Атрибуты:
+        hits (int): Количество запросов, обслуженных из кэша или общим запросом.
+        misses (int): Количество запросов, для которых пришлось обратиться к API.
+    """
+
+    def __init__(self, ttl: float = 600, negative_ttl: float = 3600):
+        """
+        :param ttl: Время жизни успешного ответа в секундах.
+        :param negative_ttl: Время жизни ответа о неизвестном городе в секундах.
+        """
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries: Dict[str, Tuple[float, Any]] = {}
+        self._inflight: Dict[str, asyncio.Task] = {}
+
+    @property
+    def hit_ratio(self) -> float:
+        """
+        Доля запросов, обслуженных без обращения к API.
+        """
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.0
+
+    async def get(self, city: str, fetch: Callable[[], Awaitable[Tuple[int, Any]]]) -> Any:
+        """
+        Возвращает погоду для города из кэша или запрашивает ее.
+
+        Запрос к API выполняется отдельной задачей, которую ждут все запросы города,
+        поэтому отмена одного из них не отменяет запрос для остальных.
+
+        :param city: Название города.
+        :param fetch: Корутина запроса к API, возвращающая код ответа и данные.
+        :return: Данные о погоде или текст ошибки.
+        """
+        key = city.strip().lower()
+        entry = self._entries.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                self.hits += 1
+                return entry[1]
+            del self._entries[key]
+        task = self._inflight.get(key)
+        if task is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._fetch(key, fetch))
+            # Исключение получат ожидающие запросы; помечаем его полученным, если их не осталось
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._inflight[key] = task
+        return await asyncio.shield(task)
+
+    async def _fetch(self, key: str, fetch: Callable[[], Awaitable[Tuple[int, Any]]]) -> Any:
+        """
+        Запрашивает погоду и сохраняет ответ в кэш.
+
+        :param key: Ключ города.
+        :param fetch: Корутина запроса к API.
+        :return: Данные о погоде или текст ошибки.
+        """
+        try:
+            status, result = await fetch()
+        finally:
+            del self._inflight[key]
+        now = time.monotonic()
+        # Запрос к API дороже обхода кэша, поэтому заодно удаляем устаревшие записи
+        for stale in [city for city, (expires, _) in self._entries.items() if expires <= now]:
+            del self._entries[stale]
+        if status == 200:
+            self._entries[key] = (now + self.ttl, result)
+        elif status == 404:
+            self._entries[key] = (now + self.negative_ttl, result)
+        logger.debug('Кэш погоды: доля попаданий %.2f', self.hit_ratio)
+        return result
+
+
+weather_cache = WeatherCache(settings.weather_cache_ttl, settings.weather_negative_ttl)
+register_cache("weather", lambda: (weather_cache.hits, weather_cache.misses))
+
+
+async def _fetch_weather(city: str, api_key: str) -> Tuple[int, Any]:
+    """
+    Запрашивает текущую погоду для города в API OpenWeatherMap.
+
+    :param city: Название города.
+    :param api_key: API-ключ для доступа к OpenWeatherMap.
+    :return: Код ответа и данные в формате JSON (или текст ошибки).
+    """
+    logger.debug("Получение текущей температуры для города %s", city)
+    params = {
+        "q": city,
+        "appid": api_key,
+        "units": "metric",
+    }
+
+    client = get_http_client("openweathermap")
+    with span("http"):
+        response = await client.get("/data/2.5/weather", params=params)
+    if response.status_code == 200:
+        return response.status_code, response.json()
+    logger.error(
+        "Ошибка при получении текущей температуры для города %s, status code - %d",
+        city,
+        response.status_code
+    )
+    return response.status_code, response.text
+
+
 async def get_weather(city, api_key):
     """
     Асинхронное получение текущей температуры для указанного города через API OpenWeatherMap.
 
+    Ответы кэшируются по городу (см. WeatherCache).
+
     Параметры:
         city (str): Название города для запроса.
         api_key (str): API-ключ для доступа к OpenWeatherMap.
@@ -16,24 +142,4 @@ async def get_weather(city, api_key):
         dict: Ответ API в формате JSON, если запрос успешен.
         str: Текст ошибки, если запрос не удался.
     """
-    logger.debug("Получение текущей температуры для города %s", city)
-    base_url = "https://api.openweathermap.org/data/2.5/weather"
-    params = {
-        "q": city,
-        "appid": api_key,
-        "units": "metric",
-    }
-
-    async with httpx.AsyncClient() as client:
-        response = await client.get(base_url, params=params)
-        if response.status_code == 200:
-            data = response.json()
-        else:
-            logger.error(
-                "Ошибка при получении текущей температуры для города %s, status code - %d",
-                city,
-                response.status_code
-            )
-            return response.text
-
-        return data
+    return await weather_cache.get(city, lambda: _fetch_weather(city, api_key))
@@ -1,83 +1,213 @@
+import hashlib
+import asyncio
+from collections import OrderedDict
 from datetime import datetime
+from typing import Dict, Set
+
 import numpy as np
-import matplotlib.pyplot as plt
-from aiogram.types.input_file import FSInputFile
+from aiogram.types.input_file import BufferedInputFile
+
+from core.tools.settings import settings
 from core.tools.users import UserStorage
+from core.tools.day_series import HOURS
+from core.tools.charts import render_day_chart
+from core.tools.render_pool import render_pool
+from core.tools.metrics import register_cache
 
 
-async def plot_water(telegram_id: int) -> FSInputFile:
+class ChartCache:
+    """
+    Кэш отрисованных графиков в памяти.
+
+    Ключ — хэш вида графика, ряда данных и нормы, поэтому повторный запрос графика
+    с неизменными данными не отрисовывает его заново. Записи вытесняются по давности
+    использования (LRU). После записи новых данных пользователя его графики удаляются
+    из кэша (invalidate). Одновременные запросы одного графика объединяются.
+
+    Атрибуты:
+        hits (int): Графики, взятые из кэша.
+        misses (int): Графики, которые пришлось отрисовать.
+    """
+
+    def __init__(self, max_entries: int = 256):
+        """
+        :param max_entries: Максимальное количество графиков в кэше.
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._inflight: Dict[str, asyncio.Task] = {}
+        # Графики каждого пользователя и пользователи каждого графика (один график
+        # может быть у нескольких пользователей с одинаковыми данными)
+        self._user_keys: Dict[str, Set[str]] = {}
+        self._key_users: Dict[str, Set[str]] = {}
+
+    @staticmethod
+    def key(kind: str, balance: np.ndarray, goal: float) -> str:
+        """
+        Вычисляет ключ графика по его содержимому.
+
+        :param kind: Вид графика.
+        :param balance: Ряд данных графика.
+        :param goal: Дневная норма.
+        :return: Хэш содержимого графика.
+        """
+        digest = hashlib.blake2b(digest_size=16)
+        digest.update(kind.encode())
+        digest.update(np.ascontiguousarray(balance, dtype=np.int64).tobytes())
+        digest.update(repr(float(goal)).encode())
+        return digest.hexdigest()
+
+    async def get(self, telegram_id: str, kind: str, balance: np.ndarray, goal: float) -> bytes:
+        """
+        Возвращает график из кэша или отрисовывает его в пуле процессов.
+
+        :param telegram_id: Идентификатор пользователя, для которого строится график.
+        :param kind: Вид графика: water или food.
+        :param balance: Ряд данных графика.
+        :param goal: Дневная норма.
+        :return: Изображение графика в формате PNG.
+        :raises RenderBusyError: Если очередь отрисовки заполнена.
+        """
+        key = self.key(kind, balance, goal)
+        image = self._entries.get(key)
+        if image is not None:
+            self._entries.move_to_end(key)
+            self.hits += 1
+            self._remember(telegram_id, key)
+            return image
+        task = self._inflight.get(key)
+        if task is not None:
+            self.hits += 1
+        else:
+            self.misses += 1
+            task = asyncio.ensure_future(self._render(key, kind, balance, goal))
+            # Исключение получат ожидающие запросы; помечаем его полученным, если их не осталось
+            task.add_done_callback(lambda done: done.cancelled() or done.exception())
+            self._inflight[key] = task
+        # Отрисовку ждут все запросы графика, поэтому отмена одного из них ее не отменяет
+        image = await asyncio.shield(task)
+        self._remember(telegram_id, key)
+        return image
+
+    async def _render(self, key: str, kind: str, balance: np.ndarray, goal: float) -> bytes:
+        """
+        Отрисовывает график в пуле процессов и сохраняет его в кэш.
+
+        :param key: Ключ графика.
+        :param kind: Вид графика.
+        :param balance: Ряд данных графика.
+        :param goal: Дневная норма.
+        :return: Изображение графика в формате PNG.
+        """
+        try:
+            image = await render_pool.render(render_day_chart, kind, balance, goal)
+        finally:
+            del self._inflight[key]
+        self._entries[key] = image
+        while len(self._entries) > self.max_entries:
+            evicted, _ = self._entries.popitem(last=False)
+            self._forget(evicted)
+        return image
+
+    def invalidate(self, telegram_id: str) -> None:
+        """
+        Удаляет из кэша графики пользователя. Вызывается после записи его данных.
+
+        :param telegram_id: Идентификатор пользователя.
+        """
+        for key in self._user_keys.pop(telegram_id, ()):
+            self._entries.pop(key, None)
+            self._forget(key)
+
+    def _remember(self, telegram_id: str, key: str) -> None:
+        """
+        Связывает график в кэше с пользователем, чтобы удалить его при invalidate.
+
+        :param telegram_id: Идентификатор пользователя.
+        :param key: Ключ графика.
+        """
+        if key in self._entries:
+            self._user_keys.setdefault(telegram_id, set()).add(key)
+            self._key_users.setdefault(key, set()).add(telegram_id)
+
+    def _forget(self, key: str) -> None:
+        """
+        Удаляет график из индексов пользователей после вытеснения или удаления из кэша.
+
+        :param key: Ключ графика.
+        """
+        for telegram_id in self._key_users.pop(key, ()):
+            keys = self._user_keys.get(telegram_id)
+            if keys is not None:
+                keys.discard(key)
+                if not keys:
+                    del self._user_keys[telegram_id]
+
+
+chart_cache = ChartCache(settings.chart_cache_size)
+register_cache("chart", lambda: (chart_cache.hits, chart_cache.misses))
+
+# Часовой ряд дня без записей: график строится по нулям
+_EMPTY_DAY = np.zeros(HOURS, dtype=np.int32)
+
+
+async def plot_water(telegram_id: int) -> BufferedInputFile:
     """
     Создает график потребления воды для пользователя.
 
+    Данные собираются в event loop, а сам график рисуется в пуле процессов (render_pool)
+    прямо в память и кэшируется (chart_cache).
+
     :param telegram_id: Идентификатор пользователя в Telegram.
-    :return: Объект FSInputFile с изображением графика.
+    :return: Объект BufferedInputFile с изображением графика.
+    :raises KeyError: Если пользователь не найден.
+    :raises RenderBusyError: Если очередь отрисовки заполнена.
     """
     # Получаем данные пользователя
-    user = UserStorage.get_user(str(telegram_id))
-    data = user.model_dump()
+    user = await UserStorage.aget_user_days_with_goals(str(telegram_id))
 
     # Получаем текущую дату
     today = str(datetime.now().date())
 
-    # Преобразуем данные о потреблении и сжигании воды в массивы numpy
-    log = np.array(list(data['logged_water'][today]))
-    burn = np.array(list(data['burned_water'][today]))
-
-    # Рассчитываем цель по воде
-    water_goal = await user.calc_water_goal()
-
-    # Создаем график
-    fig = plt.figure(figsize=(10, 5))
-    plt.step(range(1, 25), (log - burn).cumsum(), label='Потребление воды', linewidth=3)
-    plt.axhline(water_goal, color='r', linestyle='--', label='Ваша норма воды')
-    plt.legend()
-    plt.suptitle('Потребление воды', fontsize=16, fontweight='bold')
-    plt.grid()
-    plt.xlim(1, 24)
-    plt.xlabel("Время")
-    plt.ylabel("Выпитая вода(мл)")
+    # Ряды потребления и сжигания воды за сегодня (массивы numpy); дня может еще не быть
+    log = user.logged_water.get(today, _EMPTY_DAY)
+    burn = user.burned_water.get(today, _EMPTY_DAY)
 
-    # Сохраняем график в файл
-    fig.savefig('./tmp/water.png')
+    # Норма воды на сегодня (рассчитывается и сохраняется при загрузке раз в день)
+    water_goal = user.water_goal
 
-    # Возвращаем файл с графиком
-    return FSInputFile('./tmp/water.png')
+    # Берем график из кэша или рисуем его в пуле процессов
+    image = await chart_cache.get(str(telegram_id), "water", (log - burn).cumsum(), water_goal)
+    return BufferedInputFile(image, filename='water.png')
 
 
-async def plot_food(telegram_id: int) -> FSInputFile:
+async def plot_food(telegram_id: int) -> BufferedInputFile:
     """
     Создает график потребления калорий для пользователя.
 
+    Данные собираются в event loop, а сам график рисуется в пуле процессов (render_pool)
+    прямо в память и кэшируется (chart_cache).
+
     :param telegram_id: Идентификатор пользователя в Telegram.
-    :return: Объект FSInputFile с изображением графика.
+    :return: Объект BufferedInputFile с изображением графика.
+    :raises KeyError: Если пользователь не найден.
+    :raises RenderBusyError: Если очередь отрисовки заполнена.
     """
     # Получаем данные пользователя
-    user = UserStorage.get_user(str(telegram_id))
-    data = user.model_dump()
+    user = await UserStorage.aget_user_days_with_goals(str(telegram_id))
 
     # Получаем текущую дату
     today = str(datetime.now().date())
 
-    # Преобразуем данные о потреблении и сжигании калорий в массивы numpy
-    log = np.array(list(data['logged_calories'][today]))
-    burn = np.array(list(data['burned_calories'][today]))
-
-    # Рассчитываем цель по калориям
-    calories_goal = await user.calc_water_goal()
-
-    # Создаем график
-    fig = plt.figure(figsize=(10, 5))
-    plt.step(range(1, 25), (log - burn).cumsum(), label='Потребление калорий', linewidth=3, color='g')
-    plt.axhline(calories_goal, color='r', linestyle='--', label='Дневная норма калорийности еды')
-    plt.legend()
-    plt.suptitle('Потребление еды', fontsize=16, fontweight='bold')
-    plt.grid()
-    plt.xlim(1, 24)
-    plt.xlabel("Время")
-    plt.ylabel("Потребление еды (ккал)")
-
-    # Сохраняем график в файл
-    fig.savefig('./tmp/food.png')
-
-    # Возвращаем файл с графиком
-    return FSInputFile('./tmp/food.png')
+    # Ряды потребления и сжигания калорий за сегодня (массивы numpy); дня может еще не быть
+    log = user.logged_calories.get(today, _EMPTY_DAY)
+    burn = user.burned_calories.get(today, _EMPTY_DAY)
+
+    # Норма калорий на сегодня
+    calories_goal = user.calorie_goal
+
+    # Берем график из кэша или рисуем его в пуле процессов
+    image = await chart_cache.get(str(telegram_id), "food", (log - burn).cumsum(), calories_goal)
+    return BufferedInputFile(image, filename='food.png')
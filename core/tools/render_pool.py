@@ -0,0 +1,120 @@
+import time
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Optional
+
+from core.tools.settings import settings
+from core.tools.tracing import span
+from core.tools.metrics import Counter, Gauge, Histogram
+from core.tools.app_logger import get_logger
+
+logger = get_logger(__name__)
+
+render_depth = Gauge("bot_render_queue_depth", "Графики в очереди и в отрисовке")
+render_rejected = Counter("bot_render_rejected_total", "Графики, отклоненные из-за переполнения очереди отрисовки")
+render_seconds = Histogram("bot_render_seconds", "Время отрисовки графика, включая ожидание в очереди")
+
+
+class RenderBusyError(Exception):
+    """
+    Очередь отрисовки заполнена, новый график не принят.
+    """
+
+
+def _init_worker() -> None:
+    """
+    Инициализатор процесса пула: импортирует matplotlib (бэкенд Agg) и прогревает его.
+    """
+    from core.tools.charts import warm_up  # pylint: disable=import-outside-toplevel
+    warm_up()
+
+
+def _ping() -> None:
+    """
+    Пустая задача, чтобы пул запустил процессы при старте бота, а не при первом графике.
+    """
+
+
+class RenderPool:
+    """
+    Пул процессов для отрисовки графиков вне event loop.
+
+    Процессы запускаются заранее (start) и сразу импортируют matplotlib. Количество
+    графиков, ожидающих отрисовки или рисующихся, ограничено max_queue: при переполнении
+    render выбрасывает RenderBusyError, и бот сразу отвечает пользователю, а не копит очередь.
+
+    Атрибуты:
+        depth (int): Количество графиков в очереди и в отрисовке.
+        rejected (int): Количество графиков, отклоненных из-за переполнения очереди.
+    """
+
+    def __init__(self, workers: int = 2, max_queue: int = 8):
+        """
+        :param workers: Количество процессов отрисовки.
+        :param max_queue: Максимальное количество графиков в очереди и в отрисовке.
+        """
+        self.workers = workers
+        self.max_queue = max_queue
+        self.depth = 0
+        self.rejected = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+
+    def _create_executor(self) -> ProcessPoolExecutor:
+        # spawn: процессы не наследуют потоки и состояние event loop родителя
+        return ProcessPoolExecutor(
+            max_workers=self.workers,
+            mp_context=multiprocessing.get_context("spawn"),
+            initializer=_init_worker,
+        )
+
+    async def start(self) -> None:
+        """
+        Запускает процессы пула и дожидается их инициализации. Регистрируется в startup диспетчера.
+        """
+        if self._executor is None:
+            self._executor = self._create_executor()
+        loop = asyncio.get_running_loop()
+        await asyncio.gather(*(loop.run_in_executor(self._executor, _ping) for _ in range(self.workers)))
+        logger.info('Пул отрисовки запущен: %d процессов', self.workers)
+
+    async def render(self, func: Callable[..., bytes], *args: Any) -> bytes:
+        """
+        Выполняет функцию отрисовки в процессе пула.
+
+        :param func: Функция отрисовки уровня модуля (должна сериализоваться pickle).
+        :param args: Аргументы функции.
+        :return: Результат функции.
+        :raises RenderBusyError: Если очередь отрисовки заполнена.
+        """
+        if self.depth >= self.max_queue:
+            self.rejected += 1
+            raise RenderBusyError(f'В очереди отрисовки {self.depth} графиков')
+        if self._executor is None:
+            self._executor = self._create_executor()
+        self.depth += 1
+        started = time.perf_counter()
+        try:
+            with span("render"):
+                return await asyncio.get_running_loop().run_in_executor(self._executor, func, *args)
+        except BrokenProcessPool:
+            logger.error('Процесс отрисовки завершился аварийно, пул будет пересоздан')
+            self._executor = self._create_executor()
+            raise
+        finally:
+            self.depth -= 1
+            render_seconds.observe(time.perf_counter() - started)
+
+    def close(self) -> None:
+        """
+        Останавливает процессы пула. Регистрируется в shutdown диспетчера.
+        """
+        if self._executor is not None:
+            self._executor.shutdown(wait=True, cancel_futures=True)
+            self._executor = None
+
+
+render_pool = RenderPool(settings.render_workers, settings.render_queue_limit)
+render_depth.set_function(lambda: render_pool.depth)
+render_rejected.set_function(lambda: render_pool.rejected)
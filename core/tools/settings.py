@@ -18,12 +18,104 @@ class Settings:
         bot_token (str): Токен для доступа к Telegram Bot API.
         admin_id (int): ID администратора бота.
         openweathermap_api_key (str): API-ключ для доступа к сервису OpenWeatherMap.
+        folder_id (str): ID каталога Yandex Cloud.
+        iam_token (str): IAM-токен Yandex Cloud.
+        storage_backend (str): Бэкенд хранилища пользователей: json, journal, sqlite или sharded.
+        journal_compact_every (int): Количество записей в журнале, после которого он сворачивается в снимок.
+        sqlite_path (str): Путь к базе SQLite для бэкенда sqlite.
+        shards_dir (str): Корневой каталог файлов пользователей для бэкенда sharded.
+        fsm_storage (str): Хранилище состояний диалогов (FSM): memory или sqlite.
+        fsm_db_path (str): Путь к базе SQLite для хранилища FSM sqlite.
+        fsm_state_ttl (int): Через сколько секунд без изменений незавершенный диалог сбрасывается (0 — никогда).
+        storage_flush_delay (float): Окно в секундах, за которое изменения пользователей собираются в одну запись.
+        history_hot_days (int): Сколько последних дней хранится вместе с профилем; 0 отключает архивацию.
+        archive_dir (str): Каталог холодного архива старых дней.
+        weather_cache_ttl (float): Время жизни погоды в кэше в секундах.
+        weather_negative_ttl (float): Время жизни в кэше ответа о неизвестном городе в секундах.
+        openweathermap_url (str): Базовый URL API OpenWeatherMap.
+        openfoodfacts_url (str): Базовый URL API OpenFoodFacts.
+        yandex_gpt_url (str): Базовый URL API Yandex GPT.
+        food_cache_path (str): Путь к файлу кэша калорийности продуктов.
+        food_cache_size (int): Максимальное количество продуктов в кэше калорийности.
+        food_cache_fuzzy_cutoff (float): Порог сходства для поиска похожих продуктов в кэше (0 — отключен).
+        llm_batch_window (float): Окно в секундах, за которое запросы калорийности к LLM собираются в одну пачку.
+        llm_batch_size (int): Максимальное количество продуктов в одном запросе к LLM.
+        food_index_path (str): Путь к локальному индексу калорийности, построенному из выгрузки OpenFoodFacts.
+        food_index_cutoff (float): Минимальное сходство названий при поиске в локальном индексе.
+        food_resolve_deadline (float): Максимальное время поиска калорийности в OpenFoodFacts и LLM в секундах.
+        food_hedge_delay (float): Через сколько секунд без ответа OpenFoodFacts параллельно запрашивается LLM.
+        render_workers (int): Количество процессов отрисовки графиков.
+        render_queue_limit (int): Максимальное количество графиков в очереди отрисовки.
+        chart_cache_size (int): Максимальное количество отрисованных графиков в кэше.
+        run_mode (str): Режим получения обновлений: polling (для разработки) или webhook.
+        webhook_url (str): Публичный адрес бота, на который Telegram отправляет обновления.
+        webhook_path (str): Путь вебхука на веб-сервере бота.
+        webhook_secret (str): Секретный токен, которым Telegram подписывает запросы вебхука.
+        webhook_workers (int): Количество одновременно обрабатываемых обновлений в режиме webhook.
+        webhook_queue_size (int): Максимальное количество обновлений в очереди в режиме webhook.
+        web_host (str): Адрес веб-сервера бота.
+        web_port (int): Порт веб-сервера бота.
+        workers (int): Количество процессов-воркеров; больше 1 — прием вебхука с распределением пользователей по процессам.
+        worker_metrics_interval (float): Как часто воркеры передают метрики основному процессу, в секундах.
+        log_level (str): Уровень логирования модулей бота.
+        log_file_level (str): Минимальный уровень записей в файле логов.
+        log_console_level (str): Минимальный уровень записей в консоли.
+        log_file (str): Путь к файлу логов.
+        log_max_bytes (int): Размер файла логов, после которого он ротируется.
+        log_backup_count (int): Количество хранимых старых файлов логов.
+        log_rotate_when (str): Ротация по времени (например, midnight); если пусто — по размеру.
+        trace_file (str): Файл записей трассировки обработчиков (JSON); если пусто — общий лог.
     """
     bot_token: str
     admin_id: int
     openweathermap_api_key: str
     folder_id: str
     iam_token: str
+    storage_backend: str = "json"
+    journal_compact_every: int = 1000
+    sqlite_path: str = "./data/users.sqlite3"
+    shards_dir: str = "./data/users"
+    fsm_storage: str = "sqlite"
+    fsm_db_path: str = "./data/fsm.sqlite3"
+    fsm_state_ttl: int = 86400
+    storage_flush_delay: float = 0.005
+    history_hot_days: int = 35
+    archive_dir: str = "./data/archive"
+    weather_cache_ttl: float = 600
+    weather_negative_ttl: float = 3600
+    openweathermap_url: str = "https://api.openweathermap.org"
+    openfoodfacts_url: str = "https://world.openfoodfacts.org"
+    yandex_gpt_url: str = "https://llm.api.cloud.yandex.net"
+    food_cache_path: str = "./data/food_cache.json"
+    food_cache_size: int = 10000
+    food_cache_fuzzy_cutoff: float = 0.0
+    llm_batch_window: float = 0.05
+    llm_batch_size: int = 20
+    food_index_path: str = "./data/food_index.npz"
+    food_index_cutoff: float = 0.6
+    food_resolve_deadline: float = 8.0
+    food_hedge_delay: float = 0.5
+    render_workers: int = 2
+    render_queue_limit: int = 8
+    chart_cache_size: int = 256
+    run_mode: str = "polling"
+    webhook_url: str = ""
+    webhook_path: str = "/webhook"
+    webhook_secret: str = ""
+    webhook_workers: int = 16
+    webhook_queue_size: int = 1000
+    web_host: str = "0.0.0.0"
+    web_port: int = 8000
+    workers: int = 1
+    worker_metrics_interval: float = 5.0
+    log_level: str = "INFO"
+    log_file_level: str = "INFO"
+    log_console_level: str = "DEBUG"
+    log_file: str = "./logs/bot.log"
+    log_max_bytes: int = 10 * 1024 * 1024
+    log_backup_count: int = 5
+    log_rotate_when: str = ""
+    trace_file: str = "./logs/trace.log"
 
 
 # Создаем экземпляр класса Settings, используя переменные окружения
@@ -33,4 +125,49 @@ settings = Settings(
     openweathermap_api_key=os.getenv("OPENWEATHERMAP_API_KEY"),
     folder_id=os.getenv("FOLDER_ID"),
     iam_token=os.getenv("IAM_TOKEN"),
+    storage_backend=os.getenv("STORAGE_BACKEND", "json"),
+    journal_compact_every=int(os.getenv("JOURNAL_COMPACT_EVERY", "1000")),
+    sqlite_path=os.getenv("SQLITE_PATH", "./data/users.sqlite3"),
+    shards_dir=os.getenv("SHARDS_DIR", "./data/users"),
+    fsm_storage=os.getenv("FSM_STORAGE", "sqlite"),
+    fsm_db_path=os.getenv("FSM_DB_PATH", "./data/fsm.sqlite3"),
+    fsm_state_ttl=int(os.getenv("FSM_STATE_TTL", "86400")),
+    storage_flush_delay=float(os.getenv("STORAGE_FLUSH_DELAY", "0.005")),
+    history_hot_days=int(os.getenv("HISTORY_HOT_DAYS", "35")),
+    archive_dir=os.getenv("ARCHIVE_DIR", "./data/archive"),
+    weather_cache_ttl=float(os.getenv("WEATHER_CACHE_TTL", "600")),
+    weather_negative_ttl=float(os.getenv("WEATHER_NEGATIVE_TTL", "3600")),
+    openweathermap_url=os.getenv("OPENWEATHERMAP_URL", "https://api.openweathermap.org"),
+    openfoodfacts_url=os.getenv("OPENFOODFACTS_URL", "https://world.openfoodfacts.org"),
+    yandex_gpt_url=os.getenv("YANDEX_GPT_URL", "https://llm.api.cloud.yandex.net"),
+    food_cache_path=os.getenv("FOOD_CACHE_PATH", "./data/food_cache.json"),
+    food_cache_size=int(os.getenv("FOOD_CACHE_SIZE", "10000")),
+    food_cache_fuzzy_cutoff=float(os.getenv("FOOD_CACHE_FUZZY_CUTOFF", "0")),
+    llm_batch_window=float(os.getenv("LLM_BATCH_WINDOW", "0.05")),
+    llm_batch_size=int(os.getenv("LLM_BATCH_SIZE", "20")),
+    food_index_path=os.getenv("FOOD_INDEX_PATH", "./data/food_index.npz"),
+    food_index_cutoff=float(os.getenv("FOOD_INDEX_CUTOFF", "0.6")),
+    food_resolve_deadline=float(os.getenv("FOOD_RESOLVE_DEADLINE", "8")),
+    food_hedge_delay=float(os.getenv("FOOD_HEDGE_DELAY", "0.5")),
+    render_workers=int(os.getenv("RENDER_WORKERS", "2")),
+    render_queue_limit=int(os.getenv("RENDER_QUEUE_LIMIT", "8")),
+    chart_cache_size=int(os.getenv("CHART_CACHE_SIZE", "256")),
+    run_mode=os.getenv("RUN_MODE", "polling"),
+    webhook_url=os.getenv("WEBHOOK_URL", ""),
+    webhook_path=os.getenv("WEBHOOK_PATH", "/webhook"),
+    webhook_secret=os.getenv("WEBHOOK_SECRET", ""),
+    webhook_workers=int(os.getenv("WEBHOOK_WORKERS", "16")),
+    webhook_queue_size=int(os.getenv("WEBHOOK_QUEUE_SIZE", "1000")),
+    web_host=os.getenv("WEB_HOST", "0.0.0.0"),
+    web_port=int(os.getenv("WEB_PORT", "8000")),
+    workers=int(os.getenv("WORKERS", "1")),
+    worker_metrics_interval=float(os.getenv("WORKER_METRICS_INTERVAL", "5")),
+    log_level=os.getenv("LOG_LEVEL", "INFO").upper(),
+    log_file_level=os.getenv("LOG_FILE_LEVEL", "INFO").upper(),
+    log_console_level=os.getenv("LOG_CONSOLE_LEVEL", "DEBUG").upper(),
+    log_file=os.getenv("LOG_FILE", "./logs/bot.log"),
+    log_max_bytes=int(os.getenv("LOG_MAX_BYTES", str(10 * 1024 * 1024))),
+    log_backup_count=int(os.getenv("LOG_BACKUP_COUNT", "5")),
+    log_rotate_when=os.getenv("LOG_ROTATE_WHEN", ""),
+    trace_file=os.getenv("TRACE_FILE", "./logs/trace.log"),
 )
@@ -0,0 +1,180 @@
+"""
+Отчеты о потреблении за несколько дней.
+
+Все показатели считаются векторными операциями NumPy над блоком DaySeries
+формы (дни, 4, 24), без циклов Python по дням и часам.
+"""
+from dataclasses import dataclass
+from datetime import date
+from typing import Dict, List, Tuple
+
+import numpy as np
+
+from core.tools.day_series import METRICS, HOURS, DaySeries
+
+# Длительность периодов отчета в днях
+PERIODS: Dict[str, int] = {
+    "week": 7,
+    "month": 30,
+}
+
+_WATER = METRICS.index("logged_water")
+_CALORIES = METRICS.index("logged_calories")
+_BURNED_CALORIES = METRICS.index("burned_calories")
+_BURNED_WATER = METRICS.index("burned_water")
+
+
+@dataclass
+class StatsReport:
+    """
+    Отчет о потреблении за период.
+
+    Атрибуты:
+        dates (np.ndarray): Даты периода (datetime64[D]), включая дни без записей.
+        totals (np.ndarray): Суммы за каждый день по рядам METRICS, форма (дни, 4).
+        averages (np.ndarray): Средние суммы за день по рядам METRICS среди дней с записями.
+        active_days (int): Количество дней с записями.
+        water_goal (int): Дневная норма воды без поправки на погоду.
+        calorie_goal (int): Дневная норма калорий.
+        water_hits (np.ndarray): Дни, в которые норма воды выполнена.
+        calorie_hits (np.ndarray): Дни с записями, в которые баланс калорий не превысил норму.
+        water_streak (Tuple[int, int]): Текущая и лучшая серия дней с выполненной нормой воды.
+        calorie_streak (Tuple[int, int]): Текущая и лучшая серия дней в пределах нормы калорий.
+        water_heatmap (np.ndarray): Выпитая вода по дням и часам, форма (дни, 24).
+        calorie_heatmap (np.ndarray): Потребленные калории по дням и часам, форма (дни, 24).
+    """
+    dates: np.ndarray
+    totals: np.ndarray
+    averages: np.ndarray
+    active_days: int
+    water_goal: int
+    calorie_goal: int
+    water_hits: np.ndarray
+    calorie_hits: np.ndarray
+    water_streak: Tuple[int, int]
+    calorie_streak: Tuple[int, int]
+    water_heatmap: np.ndarray
+    calorie_heatmap: np.ndarray
+
+    @property
+    def daily_water(self) -> np.ndarray:
+        """
+        Выпитая вода за каждый день периода.
+        """
+        return self.totals[:, _WATER]
+
+    @property
+    def daily_balance(self) -> np.ndarray:
+        """
+        Баланс калорий (потреблено минус сожжено) за каждый день периода.
+        """
+        return self.totals[:, _CALORIES] - self.totals[:, _BURNED_CALORIES]
+
+    @property
+    def labels(self) -> List[str]:
+        """
+        Подписи дней периода в формате ДД.ММ.
+        """
+        return [f"{day[8:10]}.{day[5:7]}" for day in self.dates.astype(str)]
+
+
+def _streaks(hits: np.ndarray) -> Tuple[int, int]:
+    """
+    Находит текущую и самую длинную серию подряд идущих выполненных дней.
+
+    Текущая серия заканчивается последним днем периода, а если он еще не выполнен
+    (день не закончился) — предыдущим днем.
+
+    :param hits: Признаки выполнения по дням.
+    :return: Текущая и лучшая серия.
+    """
+    if not hits.size:
+        return 0, 0
+    padded = np.concatenate(([False], hits, [False]))
+    edges = np.flatnonzero(padded[1:] != padded[:-1])
+    starts, ends = edges[::2], edges[1::2]
+    if not starts.size:
+        return 0, 0
+    best = int((ends - starts).max())
+    last = len(hits) if hits[-1] else len(hits) - 1
+    current = int(ends[-1] - starts[-1]) if ends[-1] == last else 0
+    return current, best
+
+
+def build_report(series: DaySeries, start: date, days: int, water_goal: int, calorie_goal: int) -> StatsReport:
+    """
+    Строит отчет за период.
+
+    :param series: Ряды пользователя, покрывающие период (лишние дни игнорируются).
+    :param start: Первый день периода.
+    :param days: Длительность периода в днях.
+    :param water_goal: Дневная норма воды.
+    :param calorie_goal: Дневная норма калорий.
+    :return: Отчет.
+    """
+    dates = np.datetime64(start, "D") + np.arange(days)
+    grid = np.zeros((days, len(METRICS), HOURS), dtype=np.int32)
+    if len(series):
+        rows = (np.array(series.dates, dtype="datetime64[D]") - dates[0]).astype(np.int64)
+        inside = (rows >= 0) & (rows < days)
+        grid[rows[inside]] = series.array[inside]
+
+    totals = grid.sum(axis=2, dtype=np.int64)
+    active = totals.any(axis=1)
+    active_days = int(active.sum())
+    averages = totals[active].mean(axis=0) if active_days else np.zeros(len(METRICS))
+
+    water_hits = totals[:, _WATER] >= water_goal + totals[:, _BURNED_WATER]
+    calorie_hits = active & (totals[:, _CALORIES] - totals[:, _BURNED_CALORIES] <= calorie_goal)
+
+    return StatsReport(
+        dates=dates,
+        totals=totals,
+        averages=averages,
+        active_days=active_days,
+        water_goal=water_goal,
+        calorie_goal=calorie_goal,
+        water_hits=water_hits,
+        calorie_hits=calorie_hits,
+        water_streak=_streaks(water_hits),
+        calorie_streak=_streaks(calorie_hits),
+        water_heatmap=grid[:, _WATER],
+        calorie_heatmap=grid[:, _CALORIES],
+    )
+
+
+def format_report(report: StatsReport, title: str) -> str:
+    """
+    Формирует текст отчета. Суммы по дням выводятся только для отчета не длиннее недели,
+    для более длинных периодов они показываются на графике.
+
+    :param report: Отчет.
+    :param title: Заголовок отчета.
+    :return: Текст сообщения.
+    """
+    labels = report.labels
+    days = len(labels)
+    average = report.averages.round().astype(np.int64)
+    lines = [
+        f'{title} ({labels[0]}–{labels[-1]}):',
+        f'Дней с записями: {report.active_days} из {days}',
+        '',
+        'Вода:',
+        f'- В среднем: {average[_WATER]} мл в день, норма {report.water_goal} мл',
+        f'- Норма выполнена: {int(report.water_hits.sum())} из {days} дней',
+        f'- Серия: {report.water_streak[0]} дн., лучшая {report.water_streak[1]} дн.',
+        '',
+        'Калории:',
+        f'- В среднем: {average[_CALORIES]} ккал в день, норма {report.calorie_goal} ккал',
+        f'- Сожжено в среднем: {average[_BURNED_CALORIES]} ккал в день',
+        f'- В пределах нормы: {int(report.calorie_hits.sum())} из {days} дней',
+        f'- Серия: {report.calorie_streak[0]} дн., лучшая {report.calorie_streak[1]} дн.',
+    ]
+    if days <= PERIODS["week"]:
+        lines += ['', 'По дням:']
+        for label, totals in zip(labels, report.totals.tolist()):
+            lines.append(
+                f'{label}: вода {totals[_WATER]} мл, еда {totals[_CALORIES]} ккал, '
+                f'сожжено {totals[_BURNED_CALORIES]} ккал'
+            )
+    return '\r\n'.join(lines)
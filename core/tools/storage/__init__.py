@@ -0,0 +1,34 @@
+from core.tools.storage.base import StorageBackend
+from core.tools.storage.json_file import JsonFileBackend
+from core.tools.storage.journal import JournalBackend
+from core.tools.storage.sqlite import SqliteBackend
+from core.tools.storage.sharded import ShardedBackend
+from core.tools.settings import settings
+
+
+def create_backend(name: str) -> StorageBackend:
+    """
+    Создает бэкенд хранилища пользователей по его названию.
+
+    :param name: Название бэкенда: json, journal, sqlite или sharded.
+    :return: Экземпляр бэкенда.
+    """
+    if name == "json":
+        return JsonFileBackend()
+    if name == "journal":
+        return JournalBackend(compact_every=settings.journal_compact_every)
+    if name == "sqlite":
+        return SqliteBackend(settings.sqlite_path)
+    if name == "sharded":
+        return ShardedBackend(settings.shards_dir)
+    raise ValueError(f"Неизвестный бэкенд хранилища: {name}")
+
+
+__all__ = [
+    "StorageBackend",
+    "JsonFileBackend",
+    "JournalBackend",
+    "SqliteBackend",
+    "ShardedBackend",
+    "create_backend",
+]
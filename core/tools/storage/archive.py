@@ -0,0 +1,87 @@
+import os
+import zlib
+import hashlib
+import threading
+from typing import List
+
+from core.tools.day_series import DaySeries
+
+
+class ArchiveStore:
+    """
+    Холодный архив старых дней пользователей.
+
+    Дни хранятся сжатыми блоками по месяцам: <каталог>/ab/cd/<telegram_id>/<ГГГГ-ММ>.dsz,
+    каждый блок — ряды DaySeries в бинарном формате, сжатые zlib.
+    Архив читается только по запросу истории и не участвует в обычной загрузке пользователя.
+    """
+
+    def __init__(self, directory: str = "./data/archive"):
+        """
+        :param directory: Корневой каталог архива.
+        """
+        self.directory = directory
+        self._lock = threading.Lock()
+
+    def _user_dir(self, telegram_id: str) -> str:
+        digest = hashlib.md5(telegram_id.encode("ascii")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest[2:4], telegram_id)
+
+    def _month_path(self, telegram_id: str, month: str) -> str:
+        return os.path.join(self._user_dir(telegram_id), f"{month}.dsz")
+
+    def months(self, telegram_id: str) -> List[str]:
+        """
+        Возвращает отсортированный список месяцев (ГГГГ-ММ), которые есть в архиве пользователя.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        """
+        try:
+            names = os.listdir(self._user_dir(telegram_id))
+        except FileNotFoundError:
+            return []
+        return sorted(name[:-4] for name in names if name.endswith(".dsz"))
+
+    def get_month(self, telegram_id: str, month: str) -> DaySeries:
+        """
+        Загружает архивный блок за месяц.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :param month: Месяц в формате ГГГГ-ММ.
+        :return: Ряды за месяц или пустые ряды, если блока нет.
+        """
+        try:
+            with open(self._month_path(telegram_id, month), "rb") as f:
+                return DaySeries.from_bytes(zlib.decompress(f.read()))
+        except FileNotFoundError:
+            return DaySeries()
+
+    def put(self, telegram_id: str, days: DaySeries) -> None:
+        """
+        Добавляет дни в архив, объединяя их с уже сохраненными блоками тех же месяцев.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :param days: Ряды, которые нужно переместить в архив.
+        """
+        with self._lock:
+            for month, series in days.by_month().items():
+                path = self._month_path(telegram_id, month)
+                merged = DaySeries.combine([self.get_month(telegram_id, month), series])
+                os.makedirs(os.path.dirname(path), exist_ok=True)
+                # Имя временного файла уникально, чтобы рабочие процессы не мешали друг другу
+                tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+                with open(tmp_path, "wb") as f:
+                    f.write(zlib.compress(merged.to_bytes()))
+                os.replace(tmp_path, path)
+
+    def get_range(self, telegram_id: str, start: str, end: str) -> DaySeries:
+        """
+        Загружает архивные дни за период. Читаются только блоки нужных месяцев.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :param start: Первая дата периода включительно.
+        :param end: Последняя дата периода включительно.
+        """
+        months = [month for month in self.months(telegram_id) if start[:7] <= month <= end[:7]]
+        parts = [self.get_month(telegram_id, month) for month in months]
+        return DaySeries.combine(parts).between(start, end)
@@ -0,0 +1,129 @@
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    from core.tools.users import User
+    from core.tools.day_series import DaySeries
+
+
+class StorageBackend(ABC):
+    """
+    Базовый класс бэкенда хранилища пользователей.
+
+    Бэкенд отвечает только за чтение и запись сериализованных данных пользователя,
+    валидация данных выполняется в UserStorage.
+
+    Методы:
+        load: Загружает данные пользователя по его ID.
+        save: Сохраняет данные пользователя.
+        save_many: Сохраняет данные нескольких пользователей.
+        load_days: Загружает профиль пользователя и только указанные дни.
+        save_days: Сохраняет профиль пользователя и только загруженные в него дни.
+        save_days_many: Сохраняет профили и загруженные дни нескольких пользователей.
+        archive_days: Передает в архив и удаляет дни пользователя раньше указанной даты.
+        close: Освобождает ресурсы бэкенда.
+    """
+
+    @abstractmethod
+    def load(self, telegram_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Загружает данные пользователя.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :return: Словарь с данными пользователя или None, если пользователь не найден.
+        """
+
+    @abstractmethod
+    def save(self, user: 'User') -> None:
+        """
+        Сохраняет данные пользователя.
+
+        :param user: Объект пользователя, данные которого нужно сохранить.
+        """
+
+    def save_many(self, users: Iterable['User']) -> None:
+        """
+        Сохраняет данные нескольких пользователей. По умолчанию сохраняет их по одному.
+
+        :param users: Пользователи, данные которых нужно сохранить.
+        """
+        for user in users:
+            self.save(user)
+
+    def load_days(self, telegram_id: str, days: Sequence[str]) -> Optional[Dict[str, Any]]:
+        """
+        Загружает профиль пользователя и указанные дни. По умолчанию загружает
+        пользователя целиком, лишние дни отбрасывает UserStorage.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :param days: Даты в формате ГГГГ-ММ-ДД.
+        :return: Словарь с данными пользователя или None, если пользователь не найден.
+        """
+        return self.load(telegram_id)
+
+    def save_days(self, user: 'User') -> None:
+        """
+        Сохраняет профиль пользователя и дни, которые есть в объекте, не трогая остальные.
+        По умолчанию объединяет их с полной записью пользователя и сохраняет ее.
+
+        :param user: Объект пользователя с частью дней.
+        """
+        self.save(self._merge_days(self.load(str(user.telegram_id)), user))
+
+    def save_days_many(self, users: Iterable['User']) -> None:
+        """
+        Сохраняет профили и загруженные дни нескольких пользователей.
+        По умолчанию сохраняет их по одному.
+
+        :param users: Пользователи с частью дней.
+        """
+        for user in users:
+            self.save_days(user)
+
+    def archive_days(self, telegram_id: str, before: str, put: Callable[['DaySeries'], None]) -> int:
+        """
+        Передает в put дни пользователя раньше before и затем удаляет их из записи.
+        По умолчанию загружает и сохраняет пользователя целиком.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :param before: Первая дата, которая остается в записи.
+        :param put: Функция, сохраняющая дни в архив.
+        :return: Количество перенесенных дней.
+        """
+        # pylint: disable=import-outside-toplevel
+        from core.tools.users import User
+
+        stored = self.load(telegram_id)
+        if stored is None:
+            return 0
+        user = User.model_validate(stored)
+        if not user.days.dates or user.days.dates[0] >= before:
+            return 0
+        hot = user.days.copy()
+        cold = hot.split_before(before)
+        put(cold)
+        self.save(user.model_copy(update={'days': hot}))
+        return len(cold)
+
+    @staticmethod
+    def _merge_days(stored: Optional[Dict[str, Any]], user: 'User') -> 'User':
+        """
+        Объединяет дни частично загруженного пользователя с его полной записью.
+
+        :param stored: Сохраненные данные пользователя или None, если его еще нет.
+        :param user: Объект пользователя с частью дней.
+        :return: Пользователь со всеми днями.
+        """
+        # pylint: disable=import-outside-toplevel
+        from core.tools.users import User
+        from core.tools.day_series import DaySeries
+
+        if stored is None:
+            return user
+        full = User.model_validate(stored)
+        return user.model_copy(update={'days': DaySeries.combine([full.days, user.days])})
+
+    def close(self) -> None:
+        """
+        Освобождает ресурсы бэкенда. По умолчанию ничего не делает.
+        """
@@ -0,0 +1,135 @@
+import time
+import asyncio
+from contextlib import asynccontextmanager
+from typing import AsyncIterator, Callable, Dict, List, Optional, TYPE_CHECKING
+
+from core.tools.metrics import Counter, Histogram
+
+if TYPE_CHECKING:
+    from core.tools.users import User
+
+flush_seconds = Histogram("bot_storage_flush_seconds", "Время записи пачки изменений в хранилище")
+flush_users = Histogram(
+    "bot_storage_flush_users", "Количество пользователей в пачке записи", buckets=(1, 2, 5, 10, 20, 50, 100, 200, 500)
+)
+flush_errors = Counter("bot_storage_flush_errors_total", "Ошибки записи пачки изменений в хранилище")
+
+
+class KeyedLock:
+    """
+    Набор asyncio-блокировок по ключу. Блокировка удаляется, когда ее больше никто не ждет.
+    """
+
+    def __init__(self):
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._waiters: Dict[str, int] = {}
+
+    @asynccontextmanager
+    async def acquire(self, key: str) -> AsyncIterator[None]:
+        """
+        Захватывает блокировку для ключа.
+
+        :param key: Ключ блокировки.
+        """
+        lock = self._locks.setdefault(key, asyncio.Lock())
+        self._waiters[key] = self._waiters.get(key, 0) + 1
+        try:
+            async with lock:
+                yield
+        finally:
+            self._waiters[key] -= 1
+            if not self._waiters[key]:
+                del self._waiters[key]
+                del self._locks[key]
+
+
+class FlushBatcher:
+    """
+    Собирает изменения пользователей за короткое окно и записывает их одной пачкой.
+
+    Пока пачка не записана, версии пользователей доступны через layers,
+    поэтому следующее изменение того же пользователя не теряет предыдущее.
+    Пачки записываются строго по очереди.
+    """
+
+    def __init__(
+        self,
+        flush: Callable[[List['User']], None],
+        delay: float = 0.005,
+        merge: Optional[Callable[['User', 'User'], 'User']] = None,
+    ):
+        """
+        :param flush: Синхронная функция записи пачки, выполняется в пуле потоков.
+        :param delay: Окно накопления изменений в секундах.
+        :param merge: Функция, объединяющая версию в очереди с новой версией того же пользователя.
+                      По умолчанию новая версия заменяет старую.
+        """
+        self._flush = flush
+        self.delay = delay
+        self._merge = merge
+        self._pending: Dict[str, 'User'] = {}
+        self._flushing: Dict[str, 'User'] = {}
+        self._future: Optional[asyncio.Future] = None
+        self._task: Optional[asyncio.Task] = None
+        self._write_lock = asyncio.Lock()
+
+    def layers(self, telegram_id: str) -> List['User']:
+        """
+        Возвращает еще не записанные версии пользователя от старой к новой:
+        записываемую сейчас и ожидающую в очереди.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :return: Список версий, пустой, если незаписанных изменений нет.
+        """
+        # Очередь читается раньше записываемой пачки: при переносе пачки в запись
+        # она сначала попадает в _flushing и только потом удаляется из _pending
+        pending = self._pending.get(telegram_id)
+        flushing = self._flushing.get(telegram_id)
+        return [user for user in (flushing, pending) if user is not None]
+
+    def submit(self, user: 'User') -> asyncio.Future:
+        """
+        Ставит пользователя в очередь на запись.
+
+        :param user: Объект пользователя.
+        :return: Future, который завершится после записи пачки с этим пользователем.
+        """
+        key = str(user.telegram_id)
+        if self._merge is not None and key in self._pending:
+            user = self._merge(self._pending[key], user)
+        self._pending[key] = user
+        if self._future is None:
+            self._future = asyncio.get_running_loop().create_future()
+            self._task = asyncio.create_task(self._run())
+        return self._future
+
+    async def drain(self) -> None:
+        """
+        Дожидается записи всех поставленных в очередь изменений.
+        """
+        if self._future is not None:
+            await asyncio.shield(self._future)
+        async with self._write_lock:
+            pass
+
+    async def _run(self) -> None:
+        """
+        Дожидается окончания окна и записывает накопленную пачку.
+        """
+        await asyncio.sleep(self.delay)
+        async with self._write_lock:
+            future, batch = self._future, self._pending
+            self._flushing = batch
+            self._future, self._pending = None, {}
+            started = time.perf_counter()
+            try:
+                await asyncio.to_thread(self._flush, list(batch.values()))
+            except Exception as e:  # pylint: disable=broad-except
+                flush_errors.inc()
+                future.set_exception(e)
+            else:
+                future.set_result(None)
+            finally:
+                self._flushing = {}
+                flush_seconds.observe(time.perf_counter() - started)
+                flush_users.observe(len(batch))
@@ -0,0 +1,271 @@
+import os
+import json
+import glob
+import threading
+from typing import Any, Dict, List, Optional, Sequence, TYPE_CHECKING
+
+from pydantic import TypeAdapter
+
+from core.tools.day_series import DaySeries
+from core.tools.storage.base import StorageBackend
+from core.tools.app_logger import get_logger
+
+if TYPE_CHECKING:
+    from core.tools.users import User
+
+logger = get_logger(__name__)
+
+_DAYS = TypeAdapter(DaySeries)
+
+
+class JournalBackend(StorageBackend):
+    """
+    Бэкенд, который держит всех пользователей в памяти и записывает каждое изменение
+    в журнал (append-only). Журнал периодически сворачивается в снимок в фоновом потоке.
+    Частичная запись (save_days) добавляет в журнал только профиль и измененные дни.
+    Такие дни не разбираются при записи: они копятся рядом с записью пользователя
+    и объединяются с ней при чтении пользователя или при сворачивании.
+
+    Файлы в каталоге данных:
+        users.snapshot.json: Снимок всех пользователей и номер журнала, с которого его нужно дополнять.
+        users.journal.<N>: Журналы изменений, одна JSON-запись на строку.
+
+    При запуске состояние восстанавливается из последнего снимка, поверх которого
+    проигрываются все журналы с номером не меньше номера снимка. Если снимка нет,
+    в качестве начального состояния используется старый файл users.json.
+    """
+
+    def __init__(
+        self,
+        directory: str = "./data",
+        compact_every: int = 1000,
+        fsync: bool = False,
+    ):
+        """
+        Инициализирует бэкенд и восстанавливает состояние с диска.
+
+        :param directory: Каталог, в котором хранятся снимок и журналы.
+        :param compact_every: Количество записей в журнале, после которого запускается сворачивание.
+        :param fsync: Вызывать ли fsync после каждой записи в журнал.
+        """
+        self.directory = directory
+        self.compact_every = compact_every
+        self.fsync = fsync
+        self._users: Dict[str, Dict[str, Any]] = {}
+        # Сериализованные дни частичных записей, еще не объединенные с записью пользователя
+        self._days: Dict[str, List[str]] = {}
+        self._lock = threading.Lock()
+        self._compactor: Optional[threading.Thread] = None
+        self._entries = 0
+        self._seq = self._recover()
+        self._journal = open(self._journal_path(self._seq), "a", encoding="utf-8")
+
+    @property
+    def _snapshot_path(self) -> str:
+        return os.path.join(self.directory, "users.snapshot.json")
+
+    def _journal_path(self, seq: int) -> str:
+        return os.path.join(self.directory, f"users.journal.{seq:08d}")
+
+    def _journal_seqs(self) -> List[int]:
+        """
+        Возвращает отсортированный список номеров существующих журналов.
+        """
+        seqs = []
+        for path in glob.glob(os.path.join(self.directory, "users.journal.*")):
+            suffix = path.rsplit(".", 1)[-1]
+            if suffix.isdigit():
+                seqs.append(int(suffix))
+        return sorted(seqs)
+
+    def _recover(self) -> int:
+        """
+        Восстанавливает состояние из снимка и журналов.
+
+        :return: Номер журнала, в который нужно продолжать запись.
+        """
+        seq = 0
+        legacy_path = os.path.join(self.directory, "users.json")
+        if os.path.exists(self._snapshot_path):
+            with open(self._snapshot_path, "r", encoding="utf-8") as f:
+                snapshot = json.load(f)
+            seq = snapshot["seq"]
+            self._users = snapshot["users"]
+        elif os.path.exists(legacy_path):
+            with open(legacy_path, "r", encoding="utf-8") as f:
+                self._users = json.load(f)
+            logger.info('Загружено %d пользователей из %s', len(self._users), legacy_path)
+
+        journals = [journal for journal in self._journal_seqs() if journal >= seq]
+        for journal in journals:
+            self._entries = self._replay(self._journal_path(journal))
+        if journals:
+            seq = journals[-1]
+        else:
+            self._entries = 0
+        logger.info('Хранилище восстановлено: %d пользователей, журнал %d', len(self._users), seq)
+        return seq
+
+    def _replay(self, path: str) -> int:
+        """
+        Применяет записи журнала к состоянию в памяти.
+
+        Недописанная последняя строка (например, после падения процесса) пропускается.
+
+        :param path: Путь к файлу журнала.
+        :return: Количество примененных записей.
+        """
+        applied = 0
+        with open(path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    logger.error('Поврежденная запись в журнале %s пропущена', path)
+                    continue
+                self._apply(entry)
+                applied += 1
+        return applied
+
+    def _apply(self, entry: Dict[str, Any]) -> None:
+        """
+        Применяет одну запись журнала к состоянию в памяти.
+
+        Дни частичной записи только откладываются, поэтому время применения
+        не зависит от длины истории пользователя.
+
+        :param entry: Запись журнала.
+        """
+        stored = self._users.get(entry["id"])
+        if entry["op"] == "put" or stored is None:
+            self._users[entry["id"]] = entry["user"]
+            self._days.pop(entry["id"], None)
+        elif entry["op"] == "days":
+            # Запись содержит профиль и только измененные дни: профиль заменяем сразу
+            profile = {key: value for key, value in entry["user"].items() if key != "days"}
+            self._users[entry["id"]] = {**stored, **profile}
+            self._days.setdefault(entry["id"], []).append(entry["user"]["days"])
+
+    @staticmethod
+    def _fold(user: Dict[str, Any], days: Sequence[str]) -> Dict[str, Any]:
+        """
+        Объединяет запись пользователя с отложенными днями частичных записей.
+
+        :param user: Запись пользователя.
+        :param days: Сериализованные дни от старых к новым.
+        :return: Запись пользователя со всеми днями.
+        """
+        if "days" not in user:
+            # Пользователь из старого файла users.json с рядами в виде словарей
+            from core.tools.users import User  # pylint: disable=import-outside-toplevel
+            user = User.model_validate(user).model_dump()
+        series = DaySeries.combine([_DAYS.validate_python(part) for part in (user["days"], *days)])
+        return {**user, "days": _DAYS.dump_python(series)}
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        """
+        Дописывает запись в журнал и применяет ее. Должен вызываться под блокировкой.
+
+        :param entry: Запись журнала.
+        """
+        self._journal.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._journal.flush()
+        if self.fsync:
+            os.fsync(self._journal.fileno())
+        self._apply(entry)
+        self._entries += 1
+        if self._entries >= self.compact_every and not self._is_compacting():
+            self._start_compaction()
+
+    def _is_compacting(self) -> bool:
+        return self._compactor is not None and self._compactor.is_alive()
+
+    def _start_compaction(self, reopen: bool = True) -> None:
+        """
+        Переключает запись на новый журнал и запускает запись снимка в фоновом потоке.
+        Должен вызываться под блокировкой.
+
+        :param reopen: Открывать ли новый журнал; False при закрытии бэкенда.
+        """
+        # Значения в словаре не изменяются на месте, а заменяются целиком,
+        # поэтому поверхностной копии достаточно для согласованного снимка.
+        users = dict(self._users)
+        days = {telegram_id: list(parts) for telegram_id, parts in self._days.items()}
+        self._journal.close()
+        self._seq += 1
+        self._entries = 0
+        if reopen:
+            self._journal = open(self._journal_path(self._seq), "a", encoding="utf-8")
+        self._compactor = threading.Thread(
+            target=self._write_snapshot,
+            args=(users, days, self._seq),
+            name="journal-compactor",
+            daemon=True,
+        )
+        self._compactor.start()
+
+    def _write_snapshot(self, users: Dict[str, Dict[str, Any]], days: Dict[str, List[str]], seq: int) -> None:
+        """
+        Атомарно записывает снимок и удаляет журналы, которые он покрывает.
+
+        :param users: Копия состояния пользователей.
+        :param days: Копия отложенных дней частичных записей; объединяется с пользователями здесь.
+        :param seq: Номер журнала, с которого нужно дополнять снимок при восстановлении.
+        """
+        for telegram_id, parts in days.items():
+            users[telegram_id] = self._fold(users[telegram_id], parts)
+        tmp_path = self._snapshot_path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"seq": seq, "users": users}, f, ensure_ascii=False)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._snapshot_path)
+        for journal in self._journal_seqs():
+            if journal < seq:
+                os.remove(self._journal_path(journal))
+        logger.info('Снимок хранилища записан: %d пользователей, журнал %d', len(users), seq)
+
+    def load(self, telegram_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            stored = self._users.get(telegram_id)
+            days = self._days.get(telegram_id)
+            if stored is None or not days:
+                return stored
+            days = list(days)
+        # Объединяем дни без блокировки и сохраняем результат, если за это время
+        # пользователь не изменился
+        folded = self._fold(stored, days)
+        with self._lock:
+            if self._users.get(telegram_id) is stored and len(self._days.get(telegram_id, ())) == len(days):
+                self._users[telegram_id] = folded
+                del self._days[telegram_id]
+        return folded
+
+    def save(self, user: 'User') -> None:
+        entry = {"op": "put", "id": str(user.telegram_id), "user": user.model_dump()}
+        with self._lock:
+            self._append(entry)
+
+    def save_days(self, user: 'User') -> None:
+        entry = {"op": "days", "id": str(user.telegram_id), "user": user.model_dump()}
+        with self._lock:
+            self._append(entry)
+
+    def close(self) -> None:
+        """
+        Дожидается фонового сворачивания и записывает итоговый снимок,
+        чтобы следующий запуск не проигрывал журнал.
+        """
+        while True:
+            with self._lock:
+                compactor = self._compactor if self._is_compacting() else None
+                if compactor is None:
+                    if self._entries:
+                        self._start_compaction(reopen=False)
+                    else:
+                        self._journal.close()
+                    break
+            # Сворачивание ждем без блокировки, чтобы не задерживать запись и чтение
+            compactor.join()
+        if self._compactor is not None:
+            self._compactor.join()
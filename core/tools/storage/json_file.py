@@ -0,0 +1,84 @@
+import os
+import json
+import threading
+from typing import Any, Dict, Iterable, Optional, TYPE_CHECKING
+
+from core.tools.storage.base import StorageBackend
+
+if TYPE_CHECKING:
+    from core.tools.users import User
+
+
+class JsonFileBackend(StorageBackend):
+    """
+    Бэкенд, хранящий всех пользователей в одном файле JSON.
+
+    Каждая запись читает и перезаписывает файл целиком, поэтому пачка пользователей
+    сохраняется одной перезаписью. Файл пишется во временный файл, который затем
+    атомарно переименовывается.
+    """
+
+    def __init__(self, path: str = "./data/users.json"):
+        """
+        Инициализирует бэкенд. Создает файл, если он не существует.
+
+        :param path: Путь к файлу с пользователями.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        if not os.path.exists(self.path):
+            self._write({})
+
+    def _read(self) -> Dict[str, Dict[str, Any]]:
+        """
+        Читает всех пользователей из файла. Должен вызываться под блокировкой.
+        """
+        with open(self.path, "r", encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write(self, users: Dict[str, Dict[str, Any]]) -> None:
+        """
+        Атомарно перезаписывает файл. Должен вызываться под блокировкой.
+
+        :param users: Все пользователи.
+        """
+        tmp_path = f"{self.path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(users, f)
+        os.replace(tmp_path, self.path)
+
+    def load(self, telegram_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            users = self._read()
+        return users.get(telegram_id)
+
+    def save(self, user: 'User') -> None:
+        self.save_many([user])
+
+    def save_many(self, users: Iterable['User']) -> None:
+        """
+        Сохраняет пользователей одной перезаписью файла.
+
+        :param users: Пользователи, которых нужно сохранить.
+        """
+        with self._lock:
+            stored = self._read()
+            for user in users:
+                stored[str(user.telegram_id)] = user.model_dump()
+            self._write(stored)
+
+    def save_days(self, user: 'User') -> None:
+        self.save_days_many([user])
+
+    def save_days_many(self, users: Iterable['User']) -> None:
+        """
+        Сохраняет профили и загруженные дни пользователей одной перезаписью файла.
+
+        :param users: Пользователи с частью дней.
+        """
+        with self._lock:
+            stored = self._read()
+            for user in users:
+                key = str(user.telegram_id)
+                stored[key] = self._merge_days(stored.get(key), user).model_dump()
+            self._write(stored)
@@ -0,0 +1,56 @@
+"""
+Однократный перенос пользователей из users.json в базу SQLite или дерево файлов.
+
+Запуск:
+    python -m core.tools.storage.migrate --source ./data/users.json --target ./data/users.sqlite3
+    python -m core.tools.storage.migrate --backend sharded --target ./data/users
+
+По умолчанию --target берется из настроек: SQLITE_PATH или SHARDS_DIR для --backend sharded.
+"""
+import json
+import argparse
+
+from core.tools.settings import settings
+from core.tools.users import User
+from core.tools.storage.base import StorageBackend
+from core.tools.storage.sqlite import SqliteBackend
+from core.tools.storage.sharded import ShardedBackend
+from core.tools.app_logger import get_logger
+
+logger = get_logger(__name__)
+
+
+def migrate(source: str, target: str, backend_name: str = "sqlite") -> int:
+    """
+    Переносит всех пользователей из файла JSON в базу SQLite (одной транзакцией)
+    или в дерево файлов.
+
+    :param source: Путь к файлу users.json.
+    :param target: Путь к базе SQLite или корневой каталог дерева файлов.
+    :param backend_name: Целевой бэкенд: sqlite или sharded.
+    :return: Количество перенесенных пользователей.
+    """
+    with open(source, "r", encoding="utf-8") as f:
+        users = json.load(f)
+    backend: StorageBackend
+    if backend_name == "sharded":
+        backend = ShardedBackend(target)
+    else:
+        backend = SqliteBackend(target)
+    try:
+        backend.save_many(User.model_validate(user) for user in users.values())
+    finally:
+        backend.close()
+    logger.info('Перенесено %d пользователей из %s в %s', len(users), source, target)
+    return len(users)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Перенос пользователей из users.json")
+    parser.add_argument("--source", default="./data/users.json")
+    parser.add_argument("--target", help="база SQLite или каталог файлов, по умолчанию SQLITE_PATH или SHARDS_DIR")
+    parser.add_argument("--backend", choices=("sqlite", "sharded"), default="sqlite")
+    args = parser.parse_args()
+    if args.target is None:
+        args.target = settings.shards_dir if args.backend == "sharded" else settings.sqlite_path
+    migrate(args.source, args.target, args.backend)
@@ -0,0 +1,141 @@
+import os
+import json
+import hashlib
+import threading
+from typing import Any, Callable, Dict, Optional, Sequence, TYPE_CHECKING
+
+from core.tools.day_series import DaySeries
+from core.tools.storage.base import StorageBackend
+
+if TYPE_CHECKING:
+    from core.tools.users import User
+
+
+class ShardedBackend(StorageBackend):
+    """
+    Бэкенд, хранящий каждого пользователя в отдельном небольшом файле.
+
+    Файлы раскладываются по дереву каталогов по хэшу ID пользователя
+    (<каталог>/ab/cd/<telegram_id>.user), чтобы в одном каталоге не оказалось
+    слишком много файлов. Запись пользователя переписывает только его файл:
+    данные пишутся во временный файл, который затем атомарно переименовывается.
+
+    Формат файла: строка JSON с профилем, перевод строки и ряды в бинарном формате DaySeries.
+    """
+
+    def __init__(self, directory: str = "./data/users", fsync: bool = False):
+        """
+        :param directory: Корневой каталог дерева файлов пользователей.
+        :param fsync: Вызывать ли fsync перед переименованием файла.
+        """
+        self.directory = directory
+        self.fsync = fsync
+        os.makedirs(self.directory, exist_ok=True)
+
+    def _path(self, telegram_id: str) -> str:
+        """
+        Возвращает путь к файлу пользователя.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        """
+        digest = hashlib.md5(telegram_id.encode("ascii")).hexdigest()
+        return os.path.join(self.directory, digest[:2], digest[2:4], f"{telegram_id}.user")
+
+    def load(self, telegram_id: str) -> Optional[Dict[str, Any]]:
+        return self._load(telegram_id, None)
+
+    def load_days(self, telegram_id: str, days: Sequence[str]) -> Optional[Dict[str, Any]]:
+        return self._load(telegram_id, days)
+
+    def _load(self, telegram_id: str, days: Optional[Sequence[str]]) -> Optional[Dict[str, Any]]:
+        """
+        Читает файл пользователя и декодирует профиль и нужные дни.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :param days: Даты, которые нужно декодировать, или None, чтобы декодировать все дни.
+        """
+        raw = self._read(telegram_id)
+        if raw is None:
+            return None
+        profile, series = raw.split(b"\n", 1)
+        user = json.loads(profile)
+        user["days"] = DaySeries.from_bytes(series, days)
+        return user
+
+    def save(self, user: 'User') -> None:
+        self._write(str(user.telegram_id), self._profile(user), user.days)
+
+    def save_days(self, user: 'User') -> None:
+        """
+        Сохраняет профиль и загруженные дни, переписывая только файл пользователя.
+        Остальные дни берутся из файла в бинарном виде, без разбора записи пользователя.
+
+        :param user: Объект пользователя с частью дней.
+        """
+        telegram_id = str(user.telegram_id)
+        raw = self._read(telegram_id)
+        days = user.days
+        if raw is not None:
+            days = DaySeries.combine([DaySeries.from_bytes(raw.split(b"\n", 1)[1]), days])
+        self._write(telegram_id, self._profile(user), days)
+
+    def archive_days(self, telegram_id: str, before: str, put: Callable[[DaySeries], None]) -> int:
+        """
+        Передает в put старые дни пользователя и переписывает его файл без них.
+        Профиль не разбирается.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :param before: Первая дата, которая остается в файле.
+        :param put: Функция, сохраняющая дни в архив.
+        :return: Количество перенесенных дней.
+        """
+        raw = self._read(telegram_id)
+        if raw is None:
+            return 0
+        profile, series = raw.split(b"\n", 1)
+        hot = DaySeries.from_bytes(series)
+        if not hot.dates or hot.dates[0] >= before:
+            return 0
+        hot = hot.copy()
+        cold = hot.split_before(before)
+        put(cold)
+        self._write(telegram_id, profile, hot)
+        return len(cold)
+
+    @staticmethod
+    def _profile(user: 'User') -> bytes:
+        """
+        Кодирует профиль пользователя в первую строку файла.
+        """
+        return json.dumps(user.model_dump(exclude={"days"}), ensure_ascii=False).encode("utf-8")
+
+    def _read(self, telegram_id: str) -> Optional[bytes]:
+        """
+        Читает файл пользователя.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :return: Содержимое файла или None, если пользователя нет.
+        """
+        try:
+            with open(self._path(telegram_id), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+
+    def _write(self, telegram_id: str, profile: bytes, days: DaySeries) -> None:
+        """
+        Атомарно записывает файл пользователя.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :param profile: Закодированный профиль.
+        :param days: Все дни пользователя.
+        """
+        path = self._path(telegram_id)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(tmp_path, "wb") as f:
+            f.write(profile + b"\n" + days.to_bytes())
+            if self.fsync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp_path, path)
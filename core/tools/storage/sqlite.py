@@ -0,0 +1,271 @@
+import json
+import sqlite3
+import threading
+from typing import Any, Callable, Dict, Iterable, Optional, Sequence, TYPE_CHECKING
+
+import numpy as np
+
+from core.tools.day_series import METRICS, HOURS, DaySeries
+from core.tools.storage.base import StorageBackend
+from core.tools.app_logger import get_logger
+
+if TYPE_CHECKING:
+    from core.tools.users import User
+
+logger = get_logger(__name__)
+
+PROFILE = ("weight", "height", "age", "activity", "city", "water_goal", "calorie_goal", "goals_day")
+
+# Колонки, добавленные после первой версии схемы: имя → определение
+_ADDED_COLUMNS = {
+    "water_goal": "INTEGER",
+    "calorie_goal": "INTEGER",
+    "goals_day": "TEXT",
+}
+
+# Версия схемы (PRAGMA user_version). Версия 1 хранила каждый ряд дня отдельной
+# колонкой user_days с JSON-списком, версия 2 — блоком int32 в колонке hours
+_SCHEMA_VERSION = 2
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    telegram_id INTEGER PRIMARY KEY,
+    weight INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    age INTEGER NOT NULL,
+    activity INTEGER NOT NULL,
+    city TEXT NOT NULL,
+    water_goal INTEGER,
+    calorie_goal INTEGER,
+    goals_day TEXT
+);
+"""
+
+_DAYS_TABLE = """
+CREATE TABLE IF NOT EXISTS user_days (
+    telegram_id INTEGER NOT NULL,
+    day TEXT NOT NULL,
+    hours BLOB NOT NULL,
+    PRIMARY KEY (telegram_id, day)
+) WITHOUT ROWID
+"""
+
+
+class SqliteBackend(StorageBackend):
+    """
+    Бэкенд, хранящий профили в таблице users, а почасовые ряды — по одной строке
+    на пользователя и день в таблице user_days. Ряды дня хранятся блоком
+    int32 (4, 24) в колонке hours.
+
+    База открывается в режиме WAL. Соединение общее для всех потоков и защищено
+    блокировкой, поэтому бэкенд можно вызывать из пула потоков.
+    """
+
+    def __init__(self, path: str = "./data/users.sqlite3"):
+        """
+        Открывает базу и создает таблицы, если их нет.
+
+        :param path: Путь к файлу базы SQLite.
+        """
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(_SCHEMA)
+        self._migrate()
+        self._conn.execute(_DAYS_TABLE)
+
+    def _migrate(self) -> None:
+        """
+        Обновляет базу, созданную старой версией: добавляет в таблицу users новые колонки
+        и переводит дни из колонок с JSON-списками в блоки int32.
+        """
+        existing = {row[1] for row in self._conn.execute("PRAGMA table_info(users)")}
+        for column, definition in _ADDED_COLUMNS.items():
+            if column not in existing:
+                self._conn.execute(f"ALTER TABLE users ADD COLUMN {column} {definition}")
+        version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+        if version >= _SCHEMA_VERSION:
+            return
+        day_columns = {row[1] for row in self._conn.execute("PRAGMA table_info(user_days)")}
+        if day_columns and "hours" not in day_columns:
+            self._convert_days()
+        self._conn.execute(f"PRAGMA user_version = {_SCHEMA_VERSION}")
+
+    def _convert_days(self) -> None:
+        """
+        Переписывает таблицу user_days версии 1 (ряд в колонке, JSON-список по часам)
+        в блоки int32 (4, 24) в одной транзакции.
+        """
+        self._conn.execute("BEGIN")
+        try:
+            self._conn.execute("ALTER TABLE user_days RENAME TO user_days_v1")
+            self._conn.execute(_DAYS_TABLE)
+            rows = self._conn.execute(f"SELECT telegram_id, day, {', '.join(METRICS)} FROM user_days_v1")
+            converted = 0
+            for telegram_id, day, *series in rows:
+                block = np.zeros((len(METRICS), HOURS), dtype="<i4")
+                for column, value in enumerate(series):
+                    hours = json.loads(value)[:HOURS]
+                    block[column, :len(hours)] = hours
+                self._conn.execute(
+                    "INSERT INTO user_days (telegram_id, day, hours) VALUES (?, ?, ?)",
+                    (telegram_id, day, block.tobytes()),
+                )
+                converted += 1
+            self._conn.execute("DROP TABLE user_days_v1")
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+        logger.info('База %s переведена на блоки дней: %d строк', self.path, converted)
+
+    def load(self, telegram_id: str) -> Optional[Dict[str, Any]]:
+        return self._load(telegram_id, None)
+
+    def load_days(self, telegram_id: str, days: Sequence[str]) -> Optional[Dict[str, Any]]:
+        return self._load(telegram_id, days)
+
+    def _load(self, telegram_id: str, days: Optional[Sequence[str]]) -> Optional[Dict[str, Any]]:
+        """
+        Загружает профиль и дни пользователя.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :param days: Даты, которые нужно загрузить, или None, чтобы загрузить все дни.
+        """
+        query = "SELECT day, hours FROM user_days WHERE telegram_id = ?"
+        params = [int(telegram_id)]
+        if days is not None:
+            query += f" AND day IN ({', '.join('?' * len(days))})"
+            params.extend(days)
+        with self._lock:
+            profile = self._conn.execute(
+                f"SELECT {', '.join(PROFILE)} FROM users WHERE telegram_id = ?",
+                (int(telegram_id),),
+            ).fetchone()
+            if profile is None:
+                return None
+            rows = self._conn.execute(query + " ORDER BY day", params).fetchall()
+        user: Dict[str, Any] = dict(zip(PROFILE, profile))
+        user["telegram_id"] = int(telegram_id)
+        data = np.frombuffer(b"".join(hours for _, hours in rows), dtype="<i4")
+        user["days"] = DaySeries(
+            [day for day, _ in rows],
+            data.reshape(len(rows), len(METRICS), HOURS),
+        )
+        return user
+
+    def save(self, user: 'User') -> None:
+        self.save_many([user])
+
+    def save_many(self, users: Iterable['User']) -> None:
+        """
+        Сохраняет пользователей в одной транзакции.
+
+        Перезаписываются только строки дней, содержимое которых изменилось.
+
+        :param users: Пользователи, которых нужно сохранить.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for user in users:
+                    self._write_user(user)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def save_days(self, user: 'User') -> None:
+        self.save_days_many([user])
+
+    def save_days_many(self, users: Iterable['User']) -> None:
+        """
+        Сохраняет профили и только те дни, которые есть в объектах пользователей,
+        в одной транзакции.
+
+        :param users: Пользователи с частью дней.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN")
+            try:
+                for user in users:
+                    self._write_profile(user)
+                    self._conn.executemany(
+                        "INSERT OR REPLACE INTO user_days (telegram_id, day, hours) VALUES (?, ?, ?)",
+                        [
+                            (user.telegram_id, day, user.days.day(day).astype("<i4", copy=False).tobytes())
+                            for day in user.days.dates
+                        ],
+                    )
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def archive_days(self, telegram_id: str, before: str, put: Callable[[DaySeries], None]) -> int:
+        """
+        Передает в put старые дни пользователя и удаляет только их строки.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :param before: Первая дата, которая остается в базе.
+        :param put: Функция, сохраняющая дни в архив.
+        :return: Количество перенесенных дней.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT day, hours FROM user_days WHERE telegram_id = ? AND day < ? ORDER BY day",
+                (int(telegram_id), before),
+            ).fetchall()
+            if not rows:
+                return 0
+            data = np.frombuffer(b"".join(hours for _, hours in rows), dtype="<i4")
+            put(DaySeries([day for day, _ in rows], data.reshape(len(rows), len(METRICS), HOURS)))
+            self._conn.execute(
+                "DELETE FROM user_days WHERE telegram_id = ? AND day < ?",
+                (int(telegram_id), before),
+            )
+        return len(rows)
+
+    def _write_profile(self, user: 'User') -> None:
+        """
+        Записывает профиль пользователя. Вызывается внутри транзакции.
+
+        :param user: Пользователь, профиль которого нужно сохранить.
+        """
+        self._conn.execute(
+            f"INSERT INTO users (telegram_id, {', '.join(PROFILE)}) "
+            f"VALUES (?, {', '.join('?' * len(PROFILE))}) "
+            "ON CONFLICT(telegram_id) DO UPDATE SET "
+            + ", ".join(f"{column} = excluded.{column}" for column in PROFILE),
+            (user.telegram_id, *(getattr(user, column) for column in PROFILE)),
+        )
+
+    def _write_user(self, user: 'User') -> None:
+        """
+        Записывает профиль и изменившиеся дни пользователя. Вызывается внутри транзакции.
+
+        :param user: Пользователь, которого нужно сохранить.
+        """
+        self._write_profile(user)
+        stored = dict(self._conn.execute(
+            "SELECT day, hours FROM user_days WHERE telegram_id = ?",
+            (user.telegram_id,),
+        ))
+        for day in user.days.dates:
+            hours = user.days.day(day).astype("<i4", copy=False).tobytes()
+            if stored.get(day) != hours:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO user_days (telegram_id, day, hours) VALUES (?, ?, ?)",
+                    (user.telegram_id, day, hours),
+                )
+        for day in stored.keys() - set(user.days.dates):
+            self._conn.execute(
+                "DELETE FROM user_days WHERE telegram_id = ? AND day = ?",
+                (user.telegram_id, day),
+            )
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
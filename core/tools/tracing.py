@@ -0,0 +1,51 @@
+"""
+Замер времени обработки обновления по подсистемам.
+
+Мидлваре открывает трассировку (trace) на время обработчика, а код хранилища,
+HTTP-клиентов, LLM и отрисовки оборачивает свои ожидания в span. Время span
+суммируется в трассировку текущего обновления через contextvars, поэтому
+функциям не нужно передавать ее явно. Вне трассировки span ничего не делает.
+"""
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, Optional
+
+# Подсистемы, время которых выводится в записи трассировки
+SPANS = ("storage", "http", "llm", "render")
+
+_trace: ContextVar[Optional[Dict[str, float]]] = ContextVar("trace", default=None)
+
+
+@contextmanager
+def trace() -> Iterator[Dict[str, float]]:
+    """
+    Открывает трассировку обновления.
+
+    :return: Время в секундах по подсистемам SPANS. Span параллельных задач
+             (например, при хеджировании запросов) могут пересекаться по времени.
+    """
+    spans = dict.fromkeys(SPANS, 0.0)
+    token = _trace.set(spans)
+    try:
+        yield spans
+    finally:
+        _trace.reset(token)
+
+
+@contextmanager
+def span(kind: str) -> Iterator[None]:
+    """
+    Добавляет время выполнения блока к подсистеме в текущей трассировке.
+
+    :param kind: Подсистема из SPANS.
+    """
+    spans = _trace.get()
+    if spans is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        spans[kind] = spans.get(kind, 0.0) + time.perf_counter() - start
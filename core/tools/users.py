@@ -1,10 +1,15 @@
-import os
-import json
-from datetime import datetime
-from typing import Dict, Any, List
-from pydantic import BaseModel
+import asyncio
+import inspect
+from datetime import date, datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional, Sequence, Set, Tuple
+from pydantic import BaseModel, Field, PrivateAttr, model_validator
+from core.tools.day_series import METRICS, DaySeries, MetricView
 from core.tools.openweathermap import get_weather
 from core.tools.settings import settings
+from core.tools.storage import StorageBackend, create_backend
+from core.tools.storage.archive import ArchiveStore
+from core.tools.storage.batching import FlushBatcher, KeyedLock
+from core.tools.tracing import span
 from core.tools.app_logger import get_logger
 
 logger = get_logger(__name__)
@@ -21,12 +26,14 @@ class User(BaseModel):
         age (int): Возраст пользователя.
         activity (int): Уровень активности пользователя (в минутах активности в день).
         city (str): Город пользователя.
-        logged_water (int): Количество выпитой воды в миллилитрах.
-        logged_calories (int): Количество потребленных калорий.
-        burned_calories (int): Количество сожженных калорий.
-        burned_water (int): Дополнительное количество воды, которое нужно выпить из-за активности.
-        water_goal (Optional[int]): Дневная норма воды.
-        calorie_goal (Optional[int]): Дневная норма калорий.
+        days (DaySeries): Почасовые ряды по дням в компактном виде.
+        logged_water (MetricView): Количество выпитой воды в миллилитрах по часам.
+        logged_calories (MetricView): Количество потребленных калорий по часам.
+        burned_calories (MetricView): Количество сожженных калорий по часам.
+        burned_water (MetricView): Дополнительное количество воды, которое нужно выпить из-за активности.
+        water_goal (Optional[int]): Дневная норма воды, рассчитанная на день goals_day.
+        calorie_goal (Optional[int]): Дневная норма калорий, рассчитанная на день goals_day.
+        goals_day (Optional[str]): День, на который рассчитаны нормы; None, если нормы нужно пересчитать.
     """
     telegram_id: int
     weight: int
@@ -34,20 +41,93 @@ class User(BaseModel):
     age: int
     activity: int
     city: str
-    logged_water: dict[str, List[int]] = {}
-    logged_calories: dict[str, List[int]] = {}
-    burned_calories: dict[str, List[int]] = {}
-    burned_water: dict[str, List[int]] = {}
+    days: DaySeries = Field(default_factory=DaySeries)
+    water_goal: Optional[int] = None
+    calorie_goal: Optional[int] = None
+    goals_day: Optional[str] = None
+
+    # Дни, запрошенные при частичной загрузке; None, если пользователь загружен целиком
+    _days_loaded: Optional[Tuple[str, ...]] = PrivateAttr(default=None)
+
+    @property
+    def is_partial(self) -> bool:
+        """
+        True, если пользователь загружен не целиком, а только с частью дней.
+        """
+        return self._days_loaded is not None
+
+    @model_validator(mode='before')
+    @classmethod
+    def _convert_legacy_series(cls, data: Any) -> Any:
+        """
+        Переводит ряды из старого формата (словарей по дням) в компактный DaySeries.
+        """
+        if isinstance(data, dict) and any(name in data for name in METRICS):
+            data = dict(data)
+            legacy: Dict[str, Any] = {name: data.pop(name, None) for name in METRICS}
+            data.setdefault('days', DaySeries.from_legacy(legacy))
+        return data
+
+    @property
+    def logged_water(self) -> MetricView:
+        return self.days.metric('logged_water')
+
+    @property
+    def logged_calories(self) -> MetricView:
+        return self.days.metric('logged_calories')
+
+    @property
+    def burned_calories(self) -> MetricView:
+        return self.days.metric('burned_calories')
+
+    @property
+    def burned_water(self) -> MetricView:
+        return self.days.metric('burned_water')
 
     async def add_day(self) -> None:
         """
         Добавляет новый день в данные о потреблении воды и калорий.
         """
+        self.days.add_day(str(datetime.now().date()))
+
+    def record(self, name: str, amount: int, when: Optional[datetime] = None) -> None:
+        """
+        Записывает значение в час и обновляет сумму дня.
+
+        :param name: Название ряда из METRICS.
+        :param amount: Записываемое значение.
+        :param when: Время записи, по умолчанию текущее.
+        """
+        when = when or datetime.now()
+        self.days.record(str(when.date()), name, when.hour, amount)
+
+    def day_totals(self, day: Optional[str] = None) -> Dict[str, int]:
+        """
+        Возвращает суммы дня по рядам без пересчета почасовых значений.
+
+        :param day: Дата в формате ГГГГ-ММ-ДД, по умолчанию сегодняшняя.
+        :return: Словарь название ряда → сумма за день (нули, если записей нет).
+        """
+        totals = self.days.totals(day or str(datetime.now().date()))
+        if totals is None:
+            return dict.fromkeys(METRICS, 0)
+        return dict(zip(METRICS, totals.tolist()))
+
+    async def ensure_goals(self) -> bool:
+        """
+        Рассчитывает дневные нормы, если они еще не рассчитаны на сегодня.
+
+        Норма воды зависит от погоды, поэтому она запрашивается не чаще раза в день.
+
+        :return: True, если нормы были пересчитаны и пользователя нужно сохранить.
+        """
         today = str(datetime.now().date())
-        self.logged_water[today] = [0] * 24
-        self.logged_calories[today] = [0] * 24
-        self.burned_calories[today] = [0] * 24
-        self.burned_water[today] = [0] * 24
+        if self.goals_day == today:
+            return False
+        self.water_goal = await self.calc_water_goal()
+        self.calorie_goal = self.calc_calorie_goal()
+        self.goals_day = today
+        return True
 
     async def calc_water_goal(self) -> int:
         """
@@ -57,12 +137,29 @@ class User(BaseModel):
 
         :return: Дневная норма воды в миллилитрах.
         """
-        weather = await get_weather(self.city, settings.openweathermap_api_key)
+        water_goal = self.calc_base_water_goal()
+        try:
+            weather = await get_weather(self.city, settings.openweathermap_api_key)
+        except Exception as e:  # pylint: disable=broad-except
+            # Недоступность сервиса погоды не должна мешать записи данных пользователя
+            logger.error('Ошибка запроса погоды для города %s: %s', self.city, e, user_id=self.telegram_id)
+            return water_goal
+        if not isinstance(weather, dict):
+            # Город не найден или сервис недоступен: считаем норму без поправки на жару
+            logger.error('Нет данных о погоде для города %s', self.city, user_id=self.telegram_id)
+            return water_goal
         temp = weather["main"]["temp"]
-        water_goal = self.weight * 15 + round(self.activity / 30 * 250)
         water_goal = water_goal + 1000 if temp > 25 else water_goal
         return water_goal
 
+    def calc_base_water_goal(self) -> int:
+        """
+        Рассчитывает дневную норму воды без поправки на погоду.
+
+        :return: Дневная норма воды в миллилитрах.
+        """
+        return self.weight * 15 + round(self.activity / 30 * 250)
+
     def calc_calorie_goal(self) -> int:
         """
         Рассчитывает дневную норму потребления калорий для пользователя.
@@ -76,45 +173,355 @@ class User(BaseModel):
 
 class UserStorage:
     """
-    Класс для хранения и управления данными пользователей в файле JSON.
+    Класс для хранения и управления данными пользователей.
+
+    Данные хранятся в бэкенде, выбранном в настройках (STORAGE_BACKEND).
+    При сохранении дни старше HISTORY_HOT_DAYS переносятся в холодный архив
+    и загружаются только методом get_history.
+
+    Пользователя можно загрузить частично — с профилем и только нужными днями
+    (get_user_days). Такой пользователь сохраняется частичной записью, которая
+    не трогает остальные дни.
 
     Методы:
-        put_user: Сохраняет данные пользователя в файл.
-        get_user: Получает данные пользователя из файла по его ID.
+        put_user: Сохраняет данные пользователя.
+        get_user: Получает данные пользователя по его ID.
+        get_user_days: Получает профиль пользователя и только указанные дни.
+        aput_user: Сохраняет данные пользователя в пуле потоков, не блокируя цикл событий.
+        aget_user: Получает данные пользователя в пуле потоков, не блокируя цикл событий.
+        aget_user_days: Асинхронный вариант get_user_days.
+        aget_user_days_with_goals: Асинхронно получает пользователя с днями и нормами на сегодня.
+        update: Атомарно изменяет данные пользователя.
+        get_history: Получает ряды пользователя за период, включая архивные дни.
+        close: Записывает отложенные изменения и закрывает бэкенд хранилища.
     """
+    backend: Optional[StorageBackend] = None
+    _locks: KeyedLock = KeyedLock()
+    _batcher: Optional[FlushBatcher] = None
+    _archive: Optional[ArchiveStore] = None
+    # Пользователи, которые сохраняются частично и уже проверены на архивацию в день _archived_day
+    _archived_day: Optional[str] = None
+    _archived_today: Set[str] = set()
 
-    def __init__(self):
+    def __init__(self, backend: Optional[StorageBackend] = None):
         """
-        Инициализирует хранилище пользователей. Создает файл users.json, если он не существует.
+        Инициализирует хранилище пользователей.
+
+        :param backend: Бэкенд хранилища. Если не передан, создается бэкенд из настроек.
         """
-        if not os.path.exists("./data/users.json"):
-            with open("./data/users.json", "w", encoding="utf-8") as f:
-                json.dump({}, f)
+        UserStorage.backend = backend or create_backend(settings.storage_backend)
 
-    @staticmethod
-    def put_user(user: User) -> None:
+    @classmethod
+    def _get_backend(cls) -> StorageBackend:
         """
-        Сохраняет данные пользователя в файл users.json.
+        Возвращает бэкенд хранилища, создавая его при первом обращении.
+        """
+        if cls.backend is None:
+            cls.backend = create_backend(settings.storage_backend)
+        return cls.backend
+
+    @classmethod
+    def put_user(cls, user: User) -> None:
+        """
+        Сохраняет данные пользователя. Частично загруженный пользователь
+        сохраняется частичной записью.
 
         :param user: Объект пользователя, данные которого нужно сохранить.
         """
-        with open("./data/users.json", "r", encoding="utf-8") as f:
-            users = json.load(f)
-        users[str(user.telegram_id)] = user.model_dump()
-        with open("./data/users.json", "w", encoding="utf-8") as f:
-            json.dump(users, f)
+        cls._persist([user])
+
+    @classmethod
+    def _get_archive(cls) -> ArchiveStore:
+        """
+        Возвращает холодный архив, создавая его при первом обращении.
+        """
+        if cls._archive is None:
+            cls._archive = ArchiveStore(settings.archive_dir)
+        return cls._archive
+
+    @classmethod
+    def _archive_cold(cls, user: User) -> User:
+        """
+        Переносит дни старше окна хранения в архив.
+
+        Переданный объект не изменяется, так как он может читаться из других потоков.
+
+        :param user: Объект пользователя.
+        :return: Пользователь без архивных дней.
+        """
+        if settings.history_hot_days <= 0 or not user.days.dates:
+            return user
+        cutoff = str(date.today() - timedelta(days=settings.history_hot_days - 1))
+        if user.days.dates[0] >= cutoff:
+            return user
+        hot = user.days.copy()
+        cold = hot.split_before(cutoff)
+        cls._get_archive().put(str(user.telegram_id), cold)
+        logger.info('В архив перенесено дней: %d', len(cold), user_id=user.telegram_id)
+        return user.model_copy(update={'days': hot})
+
+    @classmethod
+    def _archive_stored(cls, telegram_id: str) -> None:
+        """
+        Раз в день переносит в архив старые дни пользователя, который сохраняется
+        только частичными записями и поэтому никогда не проходит через _archive_cold целиком.
+
+        Бэкенд переносит только старые дни, не переписывая запись пользователя целиком,
+        если умеет это делать (archive_days).
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        """
+        if settings.history_hot_days <= 0:
+            return
+        today = date.today()
+        if cls._archived_day != str(today):
+            # Новый день: проверки прошлого дня больше не нужны
+            cls._archived_day = str(today)
+            cls._archived_today = set()
+        if telegram_id in cls._archived_today:
+            return
+        cls._archived_today.add(telegram_id)
+        cutoff = str(today - timedelta(days=settings.history_hot_days - 1))
+        archive = cls._get_archive()
+        moved = cls._get_backend().archive_days(telegram_id, cutoff, lambda cold: archive.put(telegram_id, cold))
+        if moved:
+            logger.info('В архив перенесено дней: %d', moved, user_id=telegram_id)
+
+    @classmethod
+    def _persist(cls, users: List[User]) -> None:
+        """
+        Записывает пачку пользователей, предварительно перенося старые дни в архив.
 
-    @staticmethod
-    def get_user(telegram_id: str) -> Dict[str, Any]:
+        :param users: Пользователи, которых нужно сохранить.
         """
-        Получает данные пользователя из файла users.json по его ID.
+        backend = cls._get_backend()
+        full = [cls._archive_cold(user) for user in users if not user.is_partial]
+        if full:
+            backend.save_many(full)
+        partial = [user for user in users if user.is_partial]
+        if partial:
+            backend.save_days_many(partial)
+        for user in partial:
+            cls._archive_stored(str(user.telegram_id))
 
-        :param id: Уникальный идентификатор пользователя.
-        :return: Словарь с данными пользователя или None, если пользователь не найден.
+    @classmethod
+    def _merge_pending(cls, old: User, new: User) -> User:
+        """
+        Объединяет новую версию пользователя с еще не записанной.
+
+        Частичная версия не должна вытеснить из очереди полную, иначе изменения
+        остальных дней будут потеряны.
+
+        :param old: Версия пользователя, которая уже стоит в очереди на запись.
+        :param new: Новая версия пользователя.
+        :return: Версия, которую нужно записать.
+        """
+        if not new.is_partial:
+            return new
+        merged = new.model_copy(update={'days': DaySeries.combine([old.days, new.days])})
+        if old.is_partial:
+            # pylint: disable=protected-access
+            merged._days_loaded = tuple(sorted(set(old._days_loaded) | set(new._days_loaded)))
+        else:
+            merged._days_loaded = None
+        return merged
+
+    @classmethod
+    def _get_batcher(cls) -> FlushBatcher:
+        """
+        Возвращает очередь отложенной записи, создавая ее при первом обращении.
+        """
+        if cls._batcher is None:
+            cls._batcher = FlushBatcher(
+                cls._persist,
+                delay=settings.storage_flush_delay,
+                merge=cls._merge_pending,
+            )
+        return cls._batcher
+
+    @classmethod
+    def _load(cls, telegram_id: str, days: Optional[Sequence[str]]) -> User:
+        """
+        Загружает пользователя целиком или частично с учетом еще не записанных изменений.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :param days: Даты, которые нужно загрузить, или None, чтобы загрузить все дни.
+        :return: Объект пользователя.
+        :raises KeyError: Если пользователь не найден.
+        """
+        layers = cls._batcher.layers(telegram_id) if cls._batcher is not None else []
+        full = [index for index, layer in enumerate(layers) if not layer.is_partial]
+        if full:
+            user = layers[full[-1]].model_copy(deep=True)
+            layers = layers[full[-1] + 1:]
+        else:
+            backend = cls._get_backend()
+            stored = backend.load(telegram_id) if days is None else backend.load_days(telegram_id, days)
+            if stored is not None:
+                user = User.model_validate(stored)
+            elif layers:
+                user = layers[0].model_copy(deep=True)
+            else:
+                raise KeyError("User not found")
+        for layer in layers:
+            profile = layer.model_dump(exclude={'days'})
+            user = user.model_copy(update={**profile, 'days': DaySeries.combine([user.days, layer.days])})
+        if days is not None:
+            user.days = user.days.select(days)
+        # pylint: disable=protected-access
+        user._days_loaded = tuple(days) if days is not None else None
+        return user
+
+    @classmethod
+    def get_user(cls, telegram_id: str) -> User:
+        """
+        Получает данные пользователя по его ID.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :return: Объект пользователя.
+        :raises KeyError: Если пользователь не найден.
+        """
+        return cls._load(telegram_id, None)
+
+    @classmethod
+    def get_user_days(cls, telegram_id: str, days: Optional[Sequence[str]] = None) -> User:
+        """
+        Получает профиль пользователя и только указанные дни, не разбирая остальную историю.
+
+        Полученный объект можно изменить и сохранить: будут записаны только его дни.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :param days: Даты в формате ГГГГ-ММ-ДД, по умолчанию только сегодняшний день.
+        :return: Частично загруженный объект пользователя.
+        :raises KeyError: Если пользователь не найден.
+        """
+        if days is None:
+            days = [str(datetime.now().date())]
+        return cls._load(telegram_id, days)
+
+    @classmethod
+    async def aput_user(cls, user: User) -> None:
+        """
+        Асинхронно сохраняет данные пользователя, выполняя запись в пуле потоков.
+
+        :param user: Объект пользователя, данные которого нужно сохранить.
+        """
+        with span("storage"):
+            await asyncio.to_thread(cls.put_user, user)
+
+    @classmethod
+    async def aget_user(cls, telegram_id: str) -> User:
+        """
+        Асинхронно получает данные пользователя, выполняя чтение в пуле потоков.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :return: Объект пользователя.
+        :raises KeyError: Если пользователь не найден.
+        """
+        with span("storage"):
+            return await asyncio.to_thread(cls.get_user, telegram_id)
+
+    @classmethod
+    async def aget_user_days(cls, telegram_id: str, days: Optional[Sequence[str]] = None) -> User:
+        """
+        Асинхронно получает профиль пользователя и указанные дни, выполняя чтение в пуле потоков.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :param days: Даты в формате ГГГГ-ММ-ДД, по умолчанию только сегодняшний день.
+        :return: Частично загруженный объект пользователя.
+        :raises KeyError: Если пользователь не найден.
+        """
+        with span("storage"):
+            return await asyncio.to_thread(cls.get_user_days, telegram_id, days)
+
+    @classmethod
+    async def aget_user_days_with_goals(cls, telegram_id: str, days: Optional[Sequence[str]] = None) -> User:
+        """
+        Асинхронно получает профиль пользователя и указанные дни с нормами на сегодня.
+
+        Если нормы еще не рассчитаны на сегодня, они рассчитываются и сохраняются
+        через update, поэтому погода запрашивается не чаще раза в день.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :param days: Даты в формате ГГГГ-ММ-ДД, по умолчанию только сегодняшний день.
+        :return: Частично загруженный объект пользователя.
+        :raises KeyError: Если пользователь не найден.
+        """
+        if days is None:
+            days = [str(datetime.now().date())]
+        user = await cls.aget_user_days(telegram_id, days)
+        if user.goals_day == str(datetime.now().date()):
+            return user
+        return await cls.update(telegram_id, User.ensure_goals, days=days)
+
+    @classmethod
+    async def update(
+        cls,
+        telegram_id: str,
+        mutator: Callable[[User], Any],
+        default: Optional[Callable[[], User]] = None,
+        days: Optional[Sequence[str]] = None,
+    ) -> User:
+        """
+        Атомарно изменяет данные пользователя.
+
+        Изменения одного пользователя выполняются строго по очереди, а записи
+        разных пользователей, пришедшие за короткое окно, сохраняются одной пачкой.
+        Метод завершается только после записи изменений в бэкенд.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :param mutator: Функция или корутина, изменяющая переданного пользователя.
+        :param default: Фабрика пользователя на случай, если он еще не сохранен.
+        :param days: Если переданы, загружаются и записываются только эти дни.
+        :return: Измененный объект пользователя.
+        :raises KeyError: Если пользователь не найден и default не передан.
+        """
+        async with cls._locks.acquire(telegram_id):
+            try:
+                with span("storage"):
+                    user = await asyncio.to_thread(cls._load, telegram_id, days)
+            except KeyError:
+                if default is None:
+                    raise
+                user = default()
+                # pylint: disable=protected-access
+                user._days_loaded = tuple(days) if days is not None else None
+            result = mutator(user)
+            if inspect.isawaitable(result):
+                await result
+            flushed = cls._get_batcher().submit(user)
+        with span("storage"):
+            await flushed
+        return user
+
+    @classmethod
+    async def get_history(cls, telegram_id: str, start: str, end: str) -> DaySeries:
+        """
+        Получает ряды пользователя за период. Архивные блоки читаются, только если
+        период начинается раньше самого старого дня в основном хранилище.
+
+        :param telegram_id: Уникальный идентификатор пользователя.
+        :param start: Первая дата периода включительно.
+        :param end: Последняя дата периода включительно.
+        :return: Ряды за период.
+        :raises KeyError: Если пользователь не найден.
+        """
+        user = await cls.aget_user(telegram_id)
+        hot = user.days.between(start, end)
+        if user.days.dates and start >= user.days.dates[0]:
+            return hot
+        with span("storage"):
+            cold = await asyncio.to_thread(cls._get_archive().get_range, telegram_id, start, end)
+        return DaySeries.combine([cold, hot])
+
+    @classmethod
+    async def close(cls) -> None:
+        """
+        Записывает отложенные изменения и закрывает бэкенд хранилища.
         """
-        with open("./data/users.json", "r", encoding="utf-8") as f:
-            users = json.load(f)
-        user = users.get(telegram_id)
-        if user is None:
-            raise KeyError("User not found")
-        return User.model_validate(user)
+        if cls._batcher is not None:
+            await cls._batcher.drain()
+            cls._batcher = None
+        if cls.backend is not None:
+            cls.backend.close()
+            cls.backend = None
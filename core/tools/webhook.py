@@ -0,0 +1,273 @@
+import hmac
+import signal
+import asyncio
+from typing import List, Optional
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from core.tools.settings import settings
+from core.tools.metrics import Counter, Gauge, metrics_handler
+from core.tools.app_logger import get_logger
+
+logger = get_logger(__name__)
+
+queue_depth = Gauge("bot_update_queue_depth", "Обновления, ожидающие обработки в очереди вебхука")
+queue_updates = Counter("bot_update_queue_total", "Обновления, поступившие в очередь вебхука", ("result",))
+
+# Заголовок, в котором Telegram передает секрет, указанный при установке вебхука
+SECRET_HEADER = "X-Telegram-Bot-Api-Secret-Token"
+
+
+async def _healthz(request: web.Request) -> web.Response:
+    return web.Response(text="ok")
+
+
+def create_web_app() -> web.Application:
+    """
+    Создает веб-приложение бота. Оно слушает порт в обоих режимах запуска.
+
+    :return: Приложение aiohttp с маршрутами /healthz и /metrics.
+    """
+    app = web.Application()
+    app.router.add_get("/healthz", _healthz)
+    app.router.add_get("/metrics", metrics_handler)
+    return app
+
+
+async def start_web_app(app: web.Application, host: str, port: int) -> web.AppRunner:
+    """
+    Запускает веб-приложение на указанном адресе.
+
+    :param app: Приложение aiohttp.
+    :param host: Адрес, на котором слушать.
+    :param port: Порт.
+    :return: Запущенный AppRunner; для остановки нужно вызвать cleanup.
+    """
+    runner = web.AppRunner(app, access_log=None)
+    await runner.setup()
+    await web.TCPSite(runner, host, port).start()
+    logger.info('Веб-сервер запущен на %s:%d', host, port)
+    return runner
+
+
+class UpdateQueue:
+    """
+    Очередь обновлений с фиксированным числом воркеров.
+
+    Одновременно выполняется не больше workers обработчиков, остальные обновления
+    ждут в очереди размером не больше queue_size.
+
+    Атрибуты:
+        received (int): Количество принятых обновлений.
+        rejected (int): Количество обновлений, отклоненных из-за заполненной очереди.
+    """
+
+    def __init__(self, dispatcher: Dispatcher, bot: Bot, workers: int = 16, queue_size: int = 1000):
+        """
+        :param dispatcher: Диспетчер, которому передаются обновления.
+        :param bot: Объект бота.
+        :param workers: Количество одновременно обрабатываемых обновлений.
+        :param queue_size: Максимальное количество обновлений в очереди.
+        """
+        self.dispatcher = dispatcher
+        self.bot = bot
+        self.workers = workers
+        self.received = 0
+        self.rejected = 0
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def depth(self) -> int:
+        """
+        Количество обновлений, ожидающих обработки.
+        """
+        return self._queue.qsize()
+
+    def put_nowait(self, update: Update) -> bool:
+        """
+        Ставит обновление в очередь, не дожидаясь свободного места.
+
+        :param update: Обновление Telegram.
+        :return: False, если очередь заполнена и обновление не принято.
+        """
+        try:
+            self._queue.put_nowait(update)
+        except asyncio.QueueFull:
+            self.rejected += 1
+            return False
+        self.received += 1
+        return True
+
+    async def put(self, update: Update) -> None:
+        """
+        Ставит обновление в очередь, дожидаясь свободного места.
+
+        :param update: Обновление Telegram.
+        """
+        await self._queue.put(update)
+        self.received += 1
+
+    async def _worker(self) -> None:
+        while True:
+            update = await self._queue.get()
+            try:
+                await self.dispatcher.feed_update(self.bot, update)
+            except Exception as e:  # pylint: disable=broad-except
+                logger.error('Ошибка обработки обновления %d: %s', update.update_id, e)
+            finally:
+                self._queue.task_done()
+
+    def start(self) -> None:
+        """
+        Запускает воркеры обработки обновлений и подключает очередь к метрикам.
+        """
+        queue_depth.set_function(lambda: self.depth)
+        queue_updates.set_function(lambda: {("accepted",): self.received, ("rejected",): self.rejected})
+        self._tasks = [asyncio.create_task(self._worker()) for _ in range(self.workers)]
+
+    async def stop(self) -> None:
+        """
+        Дожидается обработки принятых обновлений и останавливает воркеры.
+        """
+        await self._queue.join()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+
+def check_secret(request: web.Request, secret: str) -> bool:
+    """
+    Проверяет секретный токен запроса вебхука.
+
+    :param request: Запрос Telegram.
+    :param secret: Ожидаемый секретный токен.
+    :return: True, если токен совпадает.
+    """
+    token = request.headers.get(SECRET_HEADER, "")
+    if hmac.compare_digest(token, secret):
+        return True
+    logger.warning('Запрос вебхука с неверным секретным токеном от %s', request.remote)
+    return False
+
+
+class WebhookHandler:
+    """
+    Прием обновлений Telegram через вебхук.
+
+    Запрос проверяется по секретному токену, обновление кладется в очередь (UpdateQueue),
+    и Telegram сразу получает ответ 200. Если очередь заполнена, возвращается 503,
+    и Telegram повторит доставку позже.
+    """
+
+    def __init__(self, updates: UpdateQueue, secret: str):
+        """
+        :param updates: Очередь обработки обновлений.
+        :param secret: Секретный токен вебхука.
+        """
+        self.updates = updates
+        self.secret = secret
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """
+        Принимает обновление от Telegram.
+
+        :param request: Запрос Telegram.
+        :return: 200, если обновление принято; 401 при неверном токене; 503 при заполненной очереди.
+        """
+        if not check_secret(request, self.secret):
+            return web.Response(status=401)
+        try:
+            update = Update.model_validate(await request.json(), context={"bot": self.updates.bot})
+        except ValueError as e:
+            logger.error('Некорректное обновление: %s', e)
+            return web.Response(status=400)
+        if not self.updates.put_nowait(update):
+            logger.warning('Очередь обновлений заполнена, обновление %d отклонено', update.update_id)
+            return web.Response(status=503)
+        return web.Response()
+
+
+async def set_webhook(bot: Bot, allowed_updates: List[str]) -> None:
+    """
+    Устанавливает вебхук по адресу и секрету из настроек.
+
+    :param bot: Объект бота.
+    :param allowed_updates: Типы обновлений, которые нужно получать.
+    :raises ValueError: Если адрес или секрет вебхука не заданы.
+    """
+    if not settings.webhook_url or not settings.webhook_secret:
+        raise ValueError('Для режима webhook нужно задать WEBHOOK_URL и WEBHOOK_SECRET')
+    await bot.set_webhook(
+        settings.webhook_url.rstrip("/") + settings.webhook_path,
+        secret_token=settings.webhook_secret,
+        allowed_updates=allowed_updates,
+    )
+
+
+def wait_for_signal() -> asyncio.Event:
+    """
+    Возвращает событие, которое устанавливается при получении SIGINT или SIGTERM.
+    """
+    stop = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        try:
+            loop.add_signal_handler(sig, stop.set)
+        except NotImplementedError:
+            # Windows: остановка по Ctrl+C через KeyboardInterrupt
+            pass
+    return stop
+
+
+async def run_webhook(dispatcher: Dispatcher, bot: Bot, app: Optional[web.Application] = None) -> None:
+    """
+    Запускает бота в режиме вебхука и работает до получения сигнала остановки.
+
+    :param dispatcher: Диспетчер бота.
+    :param bot: Объект бота.
+    :param app: Веб-приложение, в которое добавляется маршрут вебхука; по умолчанию создается новое.
+    """
+    app = app or create_web_app()
+    updates = UpdateQueue(
+        dispatcher,
+        bot,
+        workers=settings.webhook_workers,
+        queue_size=settings.webhook_queue_size,
+    )
+    app.router.add_post(settings.webhook_path, WebhookHandler(updates, settings.webhook_secret).handle)
+    workflow_data = {"dispatcher": dispatcher, "bots": [bot], **dispatcher.workflow_data}
+
+    await dispatcher.emit_startup(bot=bot, **workflow_data)
+    updates.start()
+    runner = await start_web_app(app, settings.web_host, settings.web_port)
+    try:
+        await set_webhook(bot, dispatcher.resolve_used_update_types())
+        logger.info('Вебхук установлен, воркеров: %d', updates.workers)
+        await wait_for_signal().wait()
+    finally:
+        # Сначала перестаем принимать запросы, затем обрабатываем уже принятые обновления
+        await runner.cleanup()
+        await updates.stop()
+        await dispatcher.emit_shutdown(bot=bot, **workflow_data)
+
+
+async def run_polling(dispatcher: Dispatcher, bot: Bot, app: Optional[web.Application] = None) -> None:
+    """
+    Запускает бота в режиме опроса (для разработки). Веб-приложение при этом тоже
+    слушает порт, чтобы маршруты вроде /healthz были доступны в обоих режимах.
+
+    :param dispatcher: Диспетчер бота.
+    :param bot: Объект бота.
+    :param app: Веб-приложение; по умолчанию создается новое.
+    """
+    runner = await start_web_app(app or create_web_app(), settings.web_host, settings.web_port)
+    try:
+        # Получать обновления опросом можно, только если вебхук не установлен
+        await bot.delete_webhook()
+        await dispatcher.start_polling(bot)
+    finally:
+        await runner.cleanup()
@@ -0,0 +1,384 @@
+"""
+Запуск бота в нескольких процессах с привязкой пользователей к процессам.
+
+Внешний процесс принимает вебхук Telegram и пересылает обновление одному из
+воркеров, выбранному по консистентному хэшу id пользователя. Все обновления
+пользователя обрабатывает один и тот же воркер, поэтому его FSM-состояние,
+блокировки и очередь записи UserStorage остаются в одном процессе.
+
+Воркеры периодически передают снимки своих метрик внешнему процессу через общую
+очередь, и /metrics внешнего процесса отдает их с меткой worker.
+"""
+import json
+import signal
+import asyncio
+import hashlib
+import bisect
+import threading
+import multiprocessing
+from concurrent.futures import ThreadPoolExecutor
+from queue import Full
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from aiohttp import web
+from aiogram import Bot, Dispatcher
+from aiogram.types import Update
+
+from core.tools.settings import settings
+from core.tools.users import UserStorage
+from core.tools.metrics import REGISTRY, Counter, loop_monitor
+from core.tools.webhook import (
+    UpdateQueue,
+    check_secret,
+    create_web_app,
+    set_webhook,
+    start_web_app,
+    wait_for_signal,
+)
+from core.tools.app_logger import get_logger
+
+logger = get_logger(__name__)
+
+# Бэкенды, которые держат данные в памяти процесса или переписывают общий файл целиком
+# и поэтому не могут использоваться из нескольких процессов одновременно
+_SINGLE_PROCESS_BACKENDS = ("json", "journal")
+
+routed_updates = Counter("bot_worker_updates_total", "Обновления, переданные воркерам", ("worker", "result"))
+
+
+class HashRing:
+    """
+    Консистентное хэширование ключей на узлы.
+
+    Каждый узел представлен на кольце replicas виртуальными точками, поэтому ключи
+    распределяются равномерно, а при изменении числа узлов переезжает только их часть.
+    """
+
+    def __init__(self, nodes: int, replicas: int = 100):
+        """
+        :param nodes: Количество узлов.
+        :param replicas: Количество виртуальных точек на узел.
+        """
+        points = sorted(
+            (self._hash(f"{node}:{replica}"), node)
+            for node in range(nodes)
+            for replica in range(replicas)
+        )
+        self._hashes = [point for point, _ in points]
+        self._nodes = [node for _, node in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.md5(key.encode()).digest()[:8], "big")
+
+    def node(self, key: Any) -> int:
+        """
+        Возвращает узел для ключа.
+
+        :param key: Ключ (например, id пользователя).
+        :return: Номер узла.
+        """
+        index = bisect.bisect(self._hashes, self._hash(str(key)))
+        return self._nodes[index % len(self._nodes)]
+
+
+def update_user_id(update: Dict[str, Any]) -> int:
+    """
+    Находит id пользователя, от которого пришло обновление.
+
+    :param update: Обновление Telegram в виде словаря.
+    :return: id пользователя, id чата, если пользователя нет, или update_id.
+    """
+    for key, event in update.items():
+        if key == "update_id" or not isinstance(event, dict):
+            continue
+        for field in ("from", "user"):
+            user = event.get(field)
+            if isinstance(user, dict) and "id" in user:
+                return user["id"]
+        chat = event.get("chat")
+        if isinstance(chat, dict) and "id" in chat:
+            return chat["id"]
+    return update.get("update_id", 0)
+
+
+class AffinityRouter:
+    """
+    Принимает вебхук и пересылает обновления воркерам по id пользователя.
+
+    Атрибуты:
+        routed (List[int]): Количество обновлений, отправленных каждому воркеру.
+        rejected (List[int]): Количество обновлений, отклоненных из-за заполненной очереди каждого воркера.
+    """
+
+    def __init__(self, queues: List[Any], secret: str):
+        """
+        :param queues: Очереди multiprocessing воркеров.
+        :param secret: Секретный токен вебхука.
+        """
+        self.queues = queues
+        self.secret = secret
+        self.ring = HashRing(len(queues))
+        self.routed = [0] * len(queues)
+        self.rejected = [0] * len(queues)
+
+    async def handle(self, request: web.Request) -> web.Response:
+        """
+        Принимает обновление и кладет его в очередь воркера пользователя.
+
+        :param request: Запрос Telegram.
+        :return: 200, если обновление принято; 401 при неверном токене; 503 при заполненной очереди.
+        """
+        if not check_secret(request, self.secret):
+            return web.Response(status=401)
+        raw = await request.read()
+        try:
+            update = json.loads(raw)
+        except ValueError as e:
+            logger.error('Некорректное обновление: %s', e)
+            return web.Response(status=400)
+        worker = self.ring.node(update_user_id(update))
+        try:
+            self.queues[worker].put_nowait(raw)
+        except Full:
+            self.rejected[worker] += 1
+            logger.warning('Очередь воркера %d заполнена, обновление отклонено', worker)
+            return web.Response(status=503)
+        self.routed[worker] += 1
+        return web.Response()
+
+
+def _push_metrics(index: int, metrics_queue: Any) -> None:
+    """
+    Передает снимок метрик воркера внешнему процессу. Если очередь заполнена
+    (внешний процесс не успевает их читать), снимок пропускается.
+
+    :param index: Номер воркера.
+    :param metrics_queue: Общая очередь метрик воркеров.
+    """
+    try:
+        metrics_queue.put_nowait((index, REGISTRY.collect()))
+    except Full:
+        logger.warning('Очередь метрик заполнена, снимок воркера %d пропущен', index)
+
+
+async def _report_metrics(index: int, metrics_queue: Any, interval: float) -> None:
+    """
+    Каждые interval секунд передает метрики воркера внешнему процессу.
+
+    :param index: Номер воркера.
+    :param metrics_queue: Общая очередь метрик воркеров.
+    :param interval: Интервал в секундах.
+    """
+    while True:
+        await asyncio.sleep(interval)
+        _push_metrics(index, metrics_queue)
+
+
+def _receive_metrics(metrics_queue: Any) -> None:
+    """
+    Принимает снимки метрик воркеров до получения None. Выполняется в отдельном потоке
+    внешнего процесса.
+
+    :param metrics_queue: Общая очередь метрик воркеров.
+    """
+    while True:
+        item = metrics_queue.get()
+        if item is None:
+            return
+        index, families = item
+        REGISTRY.set_worker_snapshot(index, families)
+
+
+async def _serve_worker(
+    index: int,
+    queue: Any,
+    create_dispatcher: Callable[[], Dispatcher],
+    create_bot: Callable[[], Bot],
+    metrics_queue: Optional[Any] = None,
+) -> None:
+    """
+    Обрабатывает обновления, пересланные воркеру, до получения None.
+
+    :param index: Номер воркера.
+    :param queue: Очередь multiprocessing с обновлениями в виде JSON.
+    :param create_dispatcher: Функция, создающая диспетчер бота.
+    :param create_bot: Функция, создающая объект бота.
+    :param metrics_queue: Очередь, через которую метрики передаются внешнему процессу.
+    """
+    # Каждый воркер открывает свое подключение к общему хранилищу
+    UserStorage()
+    dispatcher = create_dispatcher()
+    dispatcher["worker_index"] = index
+    bot = create_bot()
+    updates = UpdateQueue(
+        dispatcher,
+        bot,
+        workers=settings.webhook_workers,
+        queue_size=settings.webhook_queue_size,
+    )
+    workflow_data = {"dispatcher": dispatcher, "bots": [bot], **dispatcher.workflow_data}
+    await dispatcher.emit_startup(bot=bot, **workflow_data)
+    updates.start()
+    loop = asyncio.get_running_loop()
+    # Чтение из очереди блокирует поток на все время работы воркера, поэтому у него свой
+    # поток, а пул по умолчанию остается свободным для asyncio.to_thread
+    reader = ThreadPoolExecutor(max_workers=1, thread_name_prefix=f"worker-{index}-queue")
+    reporter = None
+    if metrics_queue is not None:
+        reporter = asyncio.create_task(_report_metrics(index, metrics_queue, settings.worker_metrics_interval))
+    logger.info('Воркер %d запущен', index)
+    try:
+        while True:
+            raw = await loop.run_in_executor(reader, queue.get)
+            if raw is None:
+                break
+            try:
+                update = Update.model_validate_json(raw, context={"bot": bot})
+            except ValueError as e:
+                logger.error('Некорректное обновление: %s', e)
+                continue
+            # Ожидание места в очереди задерживает чтение из общей очереди воркера,
+            # и при перегрузке внешний процесс начинает отвечать Telegram 503
+            await updates.put(update)
+    finally:
+        reader.shutdown(wait=False)
+        await updates.stop()
+        if reporter is not None:
+            reporter.cancel()
+            await asyncio.gather(reporter, return_exceptions=True)
+            # Последний снимок содержит все обработанные воркером обновления
+            _push_metrics(index, metrics_queue)
+        await dispatcher.emit_shutdown(bot=bot, **workflow_data)
+        await bot.session.close()
+        logger.info('Воркер %d остановлен', index)
+
+
+def worker_main(
+    index: int,
+    queue: Any,
+    create_dispatcher: Callable[[], Dispatcher],
+    create_bot: Callable[[], Bot],
+    metrics_queue: Optional[Any] = None,
+) -> None:
+    """
+    Точка входа процесса-воркера.
+
+    :param index: Номер воркера.
+    :param queue: Очередь multiprocessing с обновлениями.
+    :param create_dispatcher: Функция, создающая диспетчер бота.
+    :param create_bot: Функция, создающая объект бота.
+    :param metrics_queue: Очередь, через которую метрики передаются внешнему процессу.
+    """
+    # Остановкой воркеров управляет внешний процесс
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    signal.signal(signal.SIGTERM, signal.SIG_IGN)
+    asyncio.run(_serve_worker(index, queue, create_dispatcher, create_bot, metrics_queue))
+
+
+def start_workers(
+    create_dispatcher: Callable[[], Dispatcher],
+    create_bot: Callable[[], Bot],
+    count: int,
+    metrics_queue: Optional[Any] = None,
+) -> Tuple[List[Any], List[Any]]:
+    """
+    Запускает процессы-воркеры.
+
+    :param create_dispatcher: Функция уровня модуля, создающая диспетчер бота.
+    :param create_bot: Функция уровня модуля, создающая объект бота.
+    :param count: Количество процессов-воркеров.
+    :param metrics_queue: Очередь multiprocessing для метрик воркеров; None — не передавать метрики.
+    :return: Очереди обновлений воркеров и их процессы.
+    """
+    context = multiprocessing.get_context("spawn")
+    queues = [context.Queue(maxsize=settings.webhook_queue_size) for _ in range(count)]
+    processes = [
+        context.Process(
+            target=worker_main,
+            args=(index, queue, create_dispatcher, create_bot, metrics_queue),
+            name=f"bot-worker-{index}",
+        )
+        for index, queue in enumerate(queues)
+    ]
+    for process in processes:
+        process.start()
+    return queues, processes
+
+
+async def _put_stop(queue: Any) -> None:
+    """
+    Кладет в очередь признак остановки, не блокируя цикл событий.
+
+    Если очередь заполнена, ожидание свободного места уходит в поток: получатель
+    дообрабатывает очередь, и место освобождается.
+
+    :param queue: Очередь multiprocessing.
+    """
+    try:
+        queue.put_nowait(None)
+    except Full:
+        await asyncio.to_thread(queue.put, None)
+
+
+async def stop_workers(queues: List[Any], processes: List[Any]) -> None:
+    """
+    Останавливает воркеры: они дообрабатывают принятые обновления и завершаются.
+
+    :param queues: Очереди обновлений воркеров.
+    :param processes: Процессы воркеров.
+    """
+    await asyncio.gather(*(_put_stop(queue) for queue in queues))
+    loop = asyncio.get_running_loop()
+    for process in processes:
+        await loop.run_in_executor(None, process.join)
+
+
+async def run_workers(
+    create_dispatcher: Callable[[], Dispatcher],
+    create_bot: Callable[[], Bot],
+    count: int,
+) -> None:
+    """
+    Запускает воркеры и внешний процесс приема вебхука, работает до сигнала остановки.
+
+    :param create_dispatcher: Функция уровня модуля, создающая диспетчер бота.
+    :param create_bot: Функция уровня модуля, создающая объект бота.
+    :param count: Количество процессов-воркеров.
+    :raises ValueError: Если выбранный бэкенд хранилища не поддерживает несколько процессов.
+    """
+    if settings.storage_backend in _SINGLE_PROCESS_BACKENDS:
+        raise ValueError(
+            f'Бэкенд {settings.storage_backend} не поддерживает несколько процессов, '
+            'используйте STORAGE_BACKEND=sqlite или sharded'
+        )
+    metrics_queue = multiprocessing.get_context("spawn").Queue(maxsize=count * 4)
+    receiver = threading.Thread(target=_receive_metrics, args=(metrics_queue,), name="worker-metrics", daemon=True)
+    receiver.start()
+    queues, processes = start_workers(create_dispatcher, create_bot, count, metrics_queue)
+    router = AffinityRouter(queues, settings.webhook_secret)
+    routed_updates.set_function(lambda: {
+        **{(str(index), "accepted"): count for index, count in enumerate(router.routed)},
+        **{(str(index), "rejected"): count for index, count in enumerate(router.rejected)},
+    })
+    app = create_web_app()
+    app.router.add_post(settings.webhook_path, router.handle)
+    bot = create_bot()
+    runner = await start_web_app(app, settings.web_host, settings.web_port)
+    # Диспетчер во внешнем процессе нужен только для списка типов обновлений
+    dispatcher = create_dispatcher()
+    allowed_updates = dispatcher.resolve_used_update_types()
+    await dispatcher.storage.close()
+    await loop_monitor.start()
+    try:
+        await set_webhook(bot, allowed_updates)
+        logger.info('Вебхук установлен, воркеров: %d', count)
+        await wait_for_signal().wait()
+    finally:
+        await loop_monitor.stop()
+        await runner.cleanup()
+        await stop_workers(queues, processes)
+        await _put_stop(metrics_queue)
+        await asyncio.to_thread(receiver.join)
+        await bot.session.close()
+        logger.info('Обновлений по воркерам: %s', router.routed)
@@ -0,0 +1,91 @@
+"""
+Общие настройки тестов.
+
+Настройки бота читаются из окружения при импорте, поэтому окружение задается
+до импорта модулей core: данные и логи пишутся во временный каталог.
+Тесты запускаются из корня репозитория:
+    python -m pytest -q
+"""
+import os
+import tempfile
+
+import pytest
+
+_workdir = tempfile.mkdtemp(prefix="fitness_bot_tests_")
+os.environ.setdefault("BOT_TOKEN", "123456:TEST")
+os.environ.setdefault("ADMIN_ID", "1")
+os.environ.update({
+    "STORAGE_BACKEND": "sqlite",
+    "SQLITE_PATH": os.path.join(_workdir, "users.sqlite3"),
+    "SHARDS_DIR": os.path.join(_workdir, "users"),
+    "ARCHIVE_DIR": os.path.join(_workdir, "archive"),
+    "FSM_DB_PATH": os.path.join(_workdir, "fsm.sqlite3"),
+    "FOOD_CACHE_PATH": os.path.join(_workdir, "food_cache.json"),
+    "FOOD_INDEX_PATH": os.path.join(_workdir, "food_index.npz"),
+    "LOG_FILE": os.path.join(_workdir, "bot.log"),
+    "TRACE_FILE": os.path.join(_workdir, "trace.log"),
+    "LOG_CONSOLE_LEVEL": "ERROR",
+})
+
+
+def make_backend(name: str, directory: str):
+    """
+    Создает бэкенд хранилища с данными в каталоге directory.
+
+    :param name: Название бэкенда: json, journal, sqlite или sharded.
+    :param directory: Каталог данных.
+    """
+    # pylint: disable=import-outside-toplevel
+    from core.tools.storage import JsonFileBackend, JournalBackend, SqliteBackend, ShardedBackend
+
+    if name == "json":
+        return JsonFileBackend(os.path.join(directory, "users.json"))
+    if name == "journal":
+        return JournalBackend(directory, compact_every=50)
+    if name == "sqlite":
+        return SqliteBackend(os.path.join(directory, "users.sqlite3"))
+    return ShardedBackend(os.path.join(directory, "users"))
+
+
+def open_storage(backend):
+    """
+    Подключает UserStorage к бэкенду и возвращает функцию, которая его отключает.
+    """
+    # pylint: disable=import-outside-toplevel
+    from core.tools.users import UserStorage
+
+    UserStorage(backend)
+
+    def close():
+        backend.close()
+        UserStorage.backend = None
+        # Очередь записи привязана к циклу событий теста
+        UserStorage._batcher = None  # pylint: disable=protected-access
+
+    return close
+
+
+@pytest.fixture
+def storage(tmp_path):
+    """
+    Хранилище пользователей в отдельной базе SQLite для каждого теста.
+    """
+    # pylint: disable=import-outside-toplevel
+    from core.tools.users import UserStorage
+
+    close = open_storage(make_backend("sqlite", str(tmp_path)))
+    yield UserStorage
+    close()
+
+
+@pytest.fixture(params=["json", "journal", "sqlite", "sharded"])
+def any_storage(request, tmp_path):
+    """
+    Хранилище пользователей на каждом из бэкендов.
+    """
+    # pylint: disable=import-outside-toplevel
+    from core.tools.users import UserStorage
+
+    close = open_storage(make_backend(request.param, str(tmp_path)))
+    yield UserStorage
+    close()
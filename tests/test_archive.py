@@ -0,0 +1,80 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from core.tools.settings import settings
+from core.tools.users import User, UserStorage
+from core.tools.storage.archive import ArchiveStore
+
+HOT_DAYS = 30
+HISTORY = 100
+
+
+@pytest.fixture
+def archive(any_storage, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "history_hot_days", HOT_DAYS)
+    store = ArchiveStore(str(tmp_path / "archive"))
+    monkeypatch.setattr(UserStorage, "_archive", store)
+    monkeypatch.setattr(UserStorage, "_archived_day", None)
+    return store
+
+
+def history_user(telegram_id: int = 1) -> User:
+    """
+    Пользователь с историей за HISTORY дней; в каждом дне записано значение, равное номеру дня.
+    """
+    user = User(telegram_id=telegram_id, weight=70, height=180, age=30, activity=30, city="Moscow")
+    for offset in range(HISTORY):
+        when = datetime.combine(date.today() - timedelta(days=offset), datetime.min.time())
+        user.record('logged_water', offset + 1, when.replace(hour=9))
+    return user
+
+
+def cutoff() -> str:
+    return str(date.today() - timedelta(days=HOT_DAYS - 1))
+
+
+def test_full_save_moves_old_days_to_archive(any_storage, archive):
+    any_storage.put_user(history_user())
+
+    hot = any_storage.get_user("1").days
+    assert len(hot) == HOT_DAYS and hot.dates[0] == cutoff()
+    cold = archive.get_range("1", "0000-01-01", "9999-12-31")
+    assert len(cold) == HISTORY - HOT_DAYS and cold.dates[-1] < cutoff()
+
+
+def test_partial_writes_archive_stored_days(any_storage, archive):
+    # Старая история попала в бэкенд, минуя архивацию (например, после переноса из users.json)
+    any_storage.backend.save(history_user())
+    today = str(date.today())
+
+    asyncio.run(any_storage.update("1", lambda user: user.record('logged_water', 1000), days=[today]))
+
+    assert any_storage.get_user("1").days.dates[0] == cutoff()
+    assert len(archive.get_range("1", "0000-01-01", "9999-12-31")) == HISTORY - HOT_DAYS
+    assert any_storage.get_user("1").day_totals(today)['logged_water'] == 1001
+
+
+def test_history_joins_hot_and_archived_days(any_storage, archive):
+    any_storage.put_user(history_user())
+    start = str(date.today() - timedelta(days=59))
+    end = str(date.today() - timedelta(days=10))
+
+    series = asyncio.run(any_storage.get_history("1", start, end))
+
+    expected = [str(date.today() - timedelta(days=offset)) for offset in range(59, 9, -1)]
+    assert series.dates == expected
+    water = series.array[:, 0].sum(axis=1)
+    assert np.array_equal(water, np.arange(60, 10, -1))
+    # Период целиком в основном хранилище: архив не читается
+    hot = asyncio.run(any_storage.get_history("1", cutoff(), str(date.today())))
+    assert len(hot) == HOT_DAYS
+
+
+def test_put_uses_unique_tmp_files(tmp_path):
+    store = ArchiveStore(str(tmp_path))
+    store.put("1", history_user().days)
+    assert not list(tmp_path.rglob("*.tmp"))
+    assert len(store.months("1")) >= 4
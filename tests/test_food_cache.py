@@ -0,0 +1,33 @@
+import json
+import threading
+
+from core.tools.food_cache import FoodCache
+
+
+def test_corrupt_cache_file_starts_empty(tmp_path):
+    path = tmp_path / "food_cache.json"
+    path.write_text('[["гречка", 3', encoding="utf-8")
+    cache = FoodCache(str(path))
+    assert cache.get("гречка") is None
+    cache.put("гречка", 343)
+    cache.save()
+    assert json.loads(path.read_text(encoding="utf-8")) == [["гречка", 343]]
+
+
+def test_concurrent_saves_leave_valid_file(tmp_path):
+    # Экземпляры с общим файлом, как в нескольких рабочих процессах
+    path = str(tmp_path / "food_cache.json")
+    caches = [FoodCache(path) for _ in range(4)]
+    for index, cache in enumerate(caches):
+        for item in range(200):
+            cache.put(f"продукт {index} {item}", item)
+
+    threads = [threading.Thread(target=cache.save) for cache in caches]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    with open(path, "r", encoding="utf-8") as f:
+        assert len(json.load(f)) == 200
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,83 @@
+import asyncio
+import os
+
+import numpy as np
+import pytest
+
+from core.tools import food_index
+from core.tools.food_index import FoodIndex, build_food_index
+
+SAMPLE_DUMP = os.path.join(os.path.dirname(__file__), "data", "openfoodfacts_sample.csv")
+
+
+@pytest.fixture
+def index_path(tmp_path):
+    path = str(tmp_path / "food_index.npz")
+    assert build_food_index(SAMPLE_DUMP, path) == 3
+    return path
+
+
+def test_lookup_in_index_built_from_dump(index_path):
+    index = FoodIndex.load(index_path)
+    # Одинаковые после нормализации названия объединяются с медианной калорийностью
+    assert index.lookup("отварная гречка") == {'name': 'Гречка отварная', 'calories': 115}
+    # Калорийность в кДж пересчитывается в ккал
+    assert index.lookup("chicken breast")['calories'] == 165
+    # Похожее название находится по триграммам
+    assert index.lookup("овсяная каша на молоке с сахаром")['name'] == 'Овсяная каша на молоке'
+    assert index.lookup("сломанный продукт") is None
+    assert index.lookup("пицца") is None
+
+
+def test_get_food_index_loads_once_off_the_loop(index_path, monkeypatch):
+    monkeypatch.setattr(food_index.settings, "food_index_path", index_path)
+    monkeypatch.setattr(food_index, "_food_index", None)
+    monkeypatch.setattr(food_index, "_food_index_loaded", False)
+    loads = []
+    load = food_index._load_food_index  # pylint: disable=protected-access
+
+    def counted_load():
+        loads.append(1)
+        return load()
+
+    monkeypatch.setattr(food_index, "_load_food_index", counted_load)
+
+    async def resolve_concurrently():
+        return await asyncio.gather(*(food_index.get_food_index() for _ in range(5)))
+
+    indexes = asyncio.run(resolve_concurrently())
+    assert len(loads) == 1
+    assert all(index is indexes[0] and len(index) == 3 for index in indexes)
+    assert asyncio.run(food_index.get_food_index()) is indexes[0]
+
+
+def brute_force_closest(index: FoodIndex, key: str):
+    """
+    Эталонный поиск: сходство со всеми продуктами индекса.
+    """
+    grams = food_index._trigrams(key)  # pylint: disable=protected-access
+    scores = [
+        2 * len(grams & food_index._trigrams(other)) / (len(grams) + len(food_index._trigrams(other)))  # pylint: disable=protected-access
+        for other in index.keys
+    ]
+    best = max(range(len(scores)), key=lambda i: (scores[i], -i))
+    return best if scores[best] >= index.cutoff else None
+
+
+@pytest.mark.parametrize("max_candidates", [5000, 0])
+def test_fuzzy_lookup_matches_brute_force(max_candidates):
+    rng = np.random.default_rng(0)
+    words = ["каша", "гречка", "молоко", "сыр", "творог", "отварная", "жареная", "куриная", "грудка", "салат",
+             "овощной", "суп", "томатный", "хлеб", "ржаной", "яблоко", "зеленое", "сок", "апельсиновый", "рис"]
+    names = {" ".join(rng.choice(words, size=rng.integers(1, 4), replace=False)) for _ in range(2000)}
+    index = FoodIndex.build((name, 100) for name in names)
+    # 0 — кандидаты не отбираются, общие триграммы считаются по всем спискам
+    index.max_candidates = max_candidates
+    queries = [" ".join(rng.choice(words, size=rng.integers(1, 5))) + suffix for suffix in ("", "ая", " 2") for _ in range(100)]
+
+    for query in queries:
+        key = food_index.normalize_food_name(query)
+        if key in index._ids:  # pylint: disable=protected-access
+            continue
+        assert index._closest(key) == brute_force_closest(index, key), query  # pylint: disable=protected-access
+
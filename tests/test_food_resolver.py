@@ -0,0 +1,97 @@
+import time
+import asyncio
+
+import pytest
+
+from core.tools import food_resolver as resolver_module
+from core.tools.food_cache import FoodCache
+from core.tools.food_resolver import DEFAULT_CALORIES, FoodResolver
+
+
+class Source:
+    """
+    Заглушка удаленного источника калорийности с задержкой ответа.
+    """
+
+    def __init__(self, calories, delay: float):
+        self.calories = calories
+        self.delay = delay
+        self.calls = 0
+        self.cancelled = 0
+
+    async def __call__(self, food_name, **kwargs):
+        self.calls += 1
+        try:
+            await asyncio.sleep(self.delay)
+        except asyncio.CancelledError:
+            self.cancelled += 1
+            raise
+        return None if self.calories is None else {"calories": self.calories}
+
+
+@pytest.fixture
+def sources(monkeypatch, tmp_path):
+    """
+    Подменяет кэш, индекс, OpenFoodFacts и LLM; задержки источников меняются в тесте.
+    """
+    async def no_index():
+        return None
+
+    off = Source(100, 0.0)
+    llm = Source(200, 0.0)
+    monkeypatch.setattr(resolver_module, "food_cache", FoodCache(str(tmp_path / "food_cache.json")))
+    monkeypatch.setattr(resolver_module, "get_food_index", no_index)
+    monkeypatch.setattr(resolver_module, "get_food_info", off)
+    monkeypatch.setattr(resolver_module, "get_food_info_llm", llm)
+    return off, llm
+
+
+def resolve(resolver: FoodResolver, name: str = "гречка"):
+    started = time.perf_counter()
+    result = asyncio.run(resolver.resolve(name))
+    return result, time.perf_counter() - started
+
+
+def test_fast_primary_does_not_hedge(sources):
+    off, llm = sources
+    off.delay = 0.01
+    result, _ = resolve(FoodResolver(deadline=1, hedge_delay=0.2))
+
+    assert (result.calories, result.tier) == (100, "openfoodfacts")
+    assert llm.calls == 0
+    # Ответ OpenFoodFacts сохраняется в кэш, и следующий поиск не идет в сеть
+    cached, _ = resolve(FoodResolver(deadline=1, hedge_delay=0.2))
+    assert cached.tier == "cache" and off.calls == 1
+
+
+def test_slow_primary_triggers_hedge(sources):
+    off, llm = sources
+    off.delay = 1
+    llm.delay = 0.01
+    result, elapsed = resolve(FoodResolver(deadline=2, hedge_delay=0.05))
+
+    assert (result.calories, result.tier) == (200, "llm")
+    assert elapsed < 0.5
+    assert off.cancelled == 1
+    assert set(result.latencies) == {"cache", "llm"}
+
+
+def test_primary_miss_hedges_without_waiting(sources):
+    off, llm = sources
+    off.calories = None
+    result, elapsed = resolve(FoodResolver(deadline=2, hedge_delay=1))
+
+    assert result.tier == "llm" and llm.calls == 1
+    assert elapsed < 0.5
+
+
+def test_deadline_returns_default(sources):
+    off, llm = sources
+    off.delay = llm.delay = 5
+    resolver = FoodResolver(deadline=0.2, hedge_delay=0.05)
+    result, elapsed = resolve(resolver)
+
+    assert (result.calories, result.tier) == (DEFAULT_CALORIES, "default")
+    assert 0.2 <= elapsed < 1
+    assert (off.cancelled, llm.cancelled) == (1, 1)
+    assert resolver.answered["default"] == 1
@@ -0,0 +1,86 @@
+import time
+import asyncio
+
+from aiogram.fsm.storage.base import StorageKey
+
+from core.states.log_states import LogFoodForm
+from core.tools.fsm_storage import SqliteFSMStorage
+
+KEY = StorageKey(bot_id=1, chat_id=2, user_id=2)
+
+
+def test_state_and_data_survive_restart(tmp_path):
+    path = str(tmp_path / "fsm.sqlite3")
+
+    async def fill():
+        storage = SqliteFSMStorage(path)
+        await storage.set_state(KEY, LogFoodForm.weight)
+        await storage.set_data(KEY, {"product": "гречка", "calories": 343})
+        await storage.close()
+
+    async def read():
+        storage = SqliteFSMStorage(path)
+        try:
+            return await storage.get_state(KEY), await storage.get_data(KEY), storage.misses
+        finally:
+            await storage.close()
+
+    asyncio.run(fill())
+    state, data, misses = asyncio.run(read())
+    assert state == LogFoodForm.weight.state
+    assert data == {"product": "гречка", "calories": 343}
+    assert misses == 1
+
+
+def test_abandoned_state_expires(tmp_path):
+    path = str(tmp_path / "fsm.sqlite3")
+
+    async def scenario():
+        storage = SqliteFSMStorage(path, ttl=0.05)
+        await storage.set_state(KEY, LogFoodForm.weight)
+        assert await storage.get_state(KEY) == LogFoodForm.weight.state
+        await asyncio.sleep(0.1)
+        assert await storage.get_state(KEY) is None
+        assert await storage.get_data(KEY) == {}
+        assert storage.expired == 1
+        await storage.set_state(KEY, LogFoodForm.name)
+        await asyncio.sleep(0.1)
+        await storage.close()
+
+    asyncio.run(scenario())
+    # Брошенные записи удаляются из базы при следующем запуске
+    reopened = SqliteFSMStorage(path, ttl=0.05)
+    assert reopened._conn.execute("SELECT COUNT(*) FROM fsm").fetchone()[0] == 0  # pylint: disable=protected-access
+    asyncio.run(reopened.close())
+
+
+def test_writes_of_one_key_reach_disk_in_order(tmp_path):
+    path = str(tmp_path / "fsm.sqlite3")
+    storage = SqliteFSMStorage(path)
+    write = storage._write  # pylint: disable=protected-access
+
+    def slow_first_write(name, record):
+        # Первая запись задерживается в пуле потоков и без очереди перезаписала бы вторую
+        if record.state == LogFoodForm.name.state:
+            time.sleep(0.1)
+        write(name, record)
+
+    storage._write = slow_first_write  # pylint: disable=protected-access
+
+    async def scenario():
+        await asyncio.gather(
+            storage.set_state(KEY, LogFoodForm.name),
+            storage.set_state(KEY, LogFoodForm.weight),
+        )
+        await storage.close()
+
+    asyncio.run(scenario())
+
+    async def read():
+        reopened = SqliteFSMStorage(path)
+        try:
+            return await reopened.get_state(KEY)
+        finally:
+            await reopened.close()
+
+    assert asyncio.run(read()) == LogFoodForm.weight.state
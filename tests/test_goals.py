@@ -0,0 +1,51 @@
+import asyncio
+from datetime import date, datetime
+
+import httpx
+
+from core.tools import users
+from core.tools.users import User
+
+
+def put_profile(storage, telegram_id: int) -> None:
+    storage.put_user(User(telegram_id=telegram_id, weight=70, height=180, age=30, activity=30, city="Moscow"))
+
+
+def test_record_survives_weather_error(storage, monkeypatch):
+    async def get_weather(city, api_key):
+        raise httpx.ConnectError("weather is down")
+
+    monkeypatch.setattr(users, "get_weather", get_weather)
+    put_profile(storage, 7)
+    today = str(date.today())
+
+    async def log_water(user: User) -> None:
+        await user.ensure_goals()
+        user.record('logged_water', 250, datetime.now())
+
+    asyncio.run(storage.update("7", log_water, days=[today]))
+    user = storage.get_user("7")
+    assert user.day_totals(today)['logged_water'] == 250
+    assert user.water_goal == user.calc_base_water_goal()
+    assert user.goals_day == today
+
+
+def test_goals_are_computed_and_saved_once_a_day(storage, monkeypatch):
+    calls = []
+
+    async def get_weather(city, api_key):
+        calls.append(city)
+        return {"main": {"temp": 30}}
+
+    monkeypatch.setattr(users, "get_weather", get_weather)
+    put_profile(storage, 8)
+
+    async def read_twice():
+        first = await storage.aget_user_days_with_goals("8")
+        second = await storage.aget_user_days_with_goals("8")
+        return first, second
+
+    first, second = asyncio.run(read_twice())
+    assert calls == ["Moscow"]
+    assert first.water_goal == second.water_goal == first.calc_base_water_goal() + 1000
+    assert storage.get_user("8").goals_day == str(date.today())
@@ -0,0 +1,71 @@
+import json
+from datetime import datetime
+
+from core.tools.storage import JournalBackend
+from core.tools.users import User
+
+DAY = datetime(2026, 10, 1, 9)
+
+
+def make_user(telegram_id: int = 1, weight: int = 70) -> User:
+    return User(telegram_id=telegram_id, weight=weight, height=180, age=30, activity=30, city="Moscow")
+
+
+def partial_user(telegram_id: int, day: int, amount: int, weight: int = 70) -> User:
+    user = make_user(telegram_id, weight)
+    when = DAY.replace(day=day)
+    user._days_loaded = (str(when.date()),)  # pylint: disable=protected-access
+    user.record('logged_water', amount, when)
+    return user
+
+
+def load(backend: JournalBackend, telegram_id: int = 1) -> User:
+    return User.model_validate(backend.load(str(telegram_id)))
+
+
+def test_recovery_replays_journal_after_crash(tmp_path):
+    backend = JournalBackend(str(tmp_path), compact_every=1000)
+    backend.save(make_user())
+    backend.save_days(partial_user(1, 1, 250))
+    backend.save_days(partial_user(1, 2, 500, weight=72))
+    backend.save_days(partial_user(1, 1, 300, weight=72))
+    # Процесс падает, не закрыв бэкенд, посреди записи строки журнала
+    journal = next(tmp_path.glob("users.journal.*"))
+    with open(journal, "a", encoding="utf-8") as f:
+        f.write('{"op": "put", "id": "1", "us')
+
+    user = load(JournalBackend(str(tmp_path)))
+    assert user.weight == 72
+    assert user.day_totals("2026-10-01")['logged_water'] == 300
+    assert user.day_totals("2026-10-02")['logged_water'] == 500
+
+
+def test_compaction_folds_partial_days_into_snapshot(tmp_path):
+    backend = JournalBackend(str(tmp_path), compact_every=3)
+    backend.save(make_user(1))
+    backend.save(make_user(2))
+    backend.save_days(partial_user(1, 1, 250))
+    backend._compactor.join()  # pylint: disable=protected-access
+    backend.save_days(partial_user(1, 2, 500))
+
+    with open(tmp_path / "users.snapshot.json", "r", encoding="utf-8") as f:
+        snapshot = json.load(f)
+    assert snapshot["seq"] == 1
+    assert User.model_validate(snapshot["users"]["1"]).days.dates == ["2026-10-01"]
+    # Журнал, покрытый снимком, удален; запись продолжается в следующий
+    assert [path.name for path in tmp_path.glob("users.journal.*")] == ["users.journal.00000001"]
+
+    user = load(JournalBackend(str(tmp_path)))
+    assert user.days.dates == ["2026-10-01", "2026-10-02"]
+
+
+def test_close_writes_final_snapshot_without_new_journal(tmp_path):
+    backend = JournalBackend(str(tmp_path), compact_every=1000)
+    backend.save(make_user())
+    backend.save_days(partial_user(1, 1, 250))
+    backend.close()
+
+    assert not list(tmp_path.glob("users.journal.*"))
+    reopened = JournalBackend(str(tmp_path))
+    assert reopened._entries == 0  # pylint: disable=protected-access
+    assert load(reopened).day_totals("2026-10-01")['logged_water'] == 250
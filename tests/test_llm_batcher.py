@@ -0,0 +1,132 @@
+import json
+import asyncio
+
+import httpx
+import pytest
+
+from core.tools import llm_api
+from core.tools.food_cache import FoodCache
+from core.tools.llm_batcher import MicroBatcher
+from core.tools.metrics import REGISTRY
+
+
+def completion(text: str) -> dict:
+    return {"result": {"alternatives": [{"message": {"role": "assistant", "text": text}}]}}
+
+
+@pytest.fixture
+def llm(monkeypatch, tmp_path):
+    """
+    Подменяет Yandex GPT заглушкой: ответы задаются списком replies, тела запросов пишутся в requests.
+    """
+    stub = {"replies": [], "requests": []}
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        stub["requests"].append(json.loads(request.content))
+        reply = stub["replies"].pop(0)
+        if isinstance(reply, str):
+            return httpx.Response(200, json=completion(reply))
+        return httpx.Response(200, json=reply)
+
+    client = httpx.AsyncClient(transport=httpx.MockTransport(handler), base_url="https://llm.test")
+    monkeypatch.setattr(llm_api, "get_http_client", lambda name: client)
+    monkeypatch.setattr(llm_api, "food_cache", FoodCache(str(tmp_path / "food_cache.json")))
+    return stub
+
+
+def test_batch_reply_is_parsed_per_line(llm):
+    llm["replies"].append("1: 343\n2. 52\nне знаю\n3) около 30\n9: 100\n1: 1")
+    answers = asyncio.run(llm_api._request_food_info_llm_batch(["гречка", "яблоко", "огурец"]))
+
+    assert answers == [{"calories": 343}, {"calories": 52}, None]
+    assert llm["requests"][0]["messages"][1]["text"] == "1: гречка\n2: яблоко\n3: огурец"
+    assert llm_api.food_cache.get("гречка") == 343
+    assert llm_api.food_cache.get("огурец") is None
+
+
+def test_malformed_batch_reply_falls_back_for_every_item(llm):
+    llm["replies"].append({"error": "internal"})
+    answers = asyncio.run(llm_api._request_food_info_llm_batch(["гречка", "яблоко"]))
+    assert answers == [None, None]
+
+
+def test_requests_are_exported_as_metric(llm):
+    llm["replies"].extend(["1: 343\n2: 52", "15"])
+
+    async def scenario():
+        await llm_api._request_food_info_llm_batch(["гречка", "яблоко"])
+        return await llm_api._request_food_info_llm("огурец")
+
+    assert asyncio.run(scenario()) == {"calories": 15}
+    text = REGISTRY.render()
+    assert 'bot_llm_requests_total{kind="batch"}' in text
+    assert 'bot_llm_requests_total{kind="single"}' in text
+    assert "bot_llm_fallbacks_total" in text
+
+
+class Upstream:
+    """
+    Заглушка запросов пачкой и по одному.
+    """
+
+    def __init__(self, batch_reply=None, batch_error: bool = False):
+        self.batch_reply = batch_reply
+        self.batch_error = batch_error
+        self.batches = []
+        self.singles = []
+
+    async def send_batch(self, items):
+        self.batches.append(items)
+        if self.batch_error:
+            raise httpx.ConnectError("down")
+        return self.batch_reply(items)
+
+    async def send_one(self, item):
+        self.singles.append(item)
+        return f"one:{item}"
+
+
+def run_batch(batcher: MicroBatcher, requests):
+    async def scenario():
+        return await asyncio.gather(*(batcher.submit(key, item) for key, item in requests))
+
+    return asyncio.run(scenario())
+
+
+def test_partial_batch_reply_falls_back_only_for_missing_items():
+    upstream = Upstream(lambda items: [f"batch:{item}" if item != "b" else None for item in items])
+    batcher = MicroBatcher(upstream.send_batch, upstream.send_one, window=0.01)
+
+    results = run_batch(batcher, [("a", "a"), ("b", "b"), ("c", "c"), ("a", "a")])
+
+    assert results == ["batch:a", "one:b", "batch:c", "batch:a"]
+    assert upstream.batches == [["a", "b", "c"]]
+    assert upstream.singles == ["b"]
+    assert (batcher.batches, batcher.fallbacks) == (1, 1)
+
+
+def test_failed_batch_falls_back_for_every_item():
+    upstream = Upstream(batch_error=True)
+    batcher = MicroBatcher(upstream.send_batch, upstream.send_one, window=0.01)
+
+    assert run_batch(batcher, [("a", "a"), ("b", "b")]) == ["one:a", "one:b"]
+    assert batcher.fallbacks == 2
+
+
+def test_single_item_skips_batch_prompt():
+    upstream = Upstream(lambda items: [f"batch:{item}" for item in items])
+    batcher = MicroBatcher(upstream.send_batch, upstream.send_one, window=0.01)
+
+    assert run_batch(batcher, [("a", "a"), ("a", "a")]) == ["one:a", "one:a"]
+    assert upstream.batches == []
+    assert batcher.fallbacks == 0
+
+
+def test_full_batch_is_sent_before_window():
+    upstream = Upstream(lambda items: [f"batch:{item}" for item in items])
+    batcher = MicroBatcher(upstream.send_batch, upstream.send_one, window=10, max_batch=3)
+
+    results = run_batch(batcher, [(item, item) for item in "abc"])
+
+    assert results == ["batch:a", "batch:b", "batch:c"]
+    assert upstream.batches == [["a", "b", "c"]]
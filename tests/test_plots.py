@@ -0,0 +1,92 @@
+import asyncio
+from datetime import date
+
+import numpy as np
+import pytest
+
+from core.tools import plots
+from core.tools.users import User
+
+
+@pytest.fixture
+def render_inline(monkeypatch):
+    """
+    Рисует графики в текущем процессе вместо пула и запоминает аргументы отрисовки.
+    """
+    calls = []
+
+    async def render(func, *args):
+        calls.append(args)
+        return func(*args)
+
+    monkeypatch.setattr(plots.render_pool, "render", render)
+    return calls
+
+
+def put_profile(storage, telegram_id: int) -> None:
+    user = User(telegram_id=telegram_id, weight=70, height=180, age=30, activity=30, city="Moscow")
+    # Нормы уже рассчитаны на сегодня, поэтому погода не запрашивается
+    user.water_goal = user.calc_base_water_goal()
+    user.calorie_goal = user.calc_calorie_goal()
+    user.goals_day = str(date.today())
+    storage.put_user(user)
+
+
+@pytest.mark.parametrize("plot", [plots.plot_water, plots.plot_food])
+def test_plot_without_records_today(storage, render_inline, plot):
+    put_profile(storage, 101)
+    image = asyncio.run(plot(101))
+    assert image.data.startswith(b"\x89PNG")
+    _, balance, _ = render_inline[-1]
+    assert balance.tolist() == [0] * 24
+
+
+@pytest.mark.parametrize("plot", [plots.plot_water, plots.plot_food])
+def test_plot_without_profile(storage, render_inline, plot):
+    with pytest.raises(KeyError):
+        asyncio.run(plot(404))
+    assert not render_inline
+
+
+def test_chart_cache_forgets_evicted_charts(render_inline):
+    cache = plots.ChartCache(max_entries=2)
+
+    async def plot_for_many_users():
+        for user in range(10):
+            await cache.get(str(user), "water", np.arange(24) * user, 2000)
+        # Одинаковый график двух пользователей хранится один раз
+        await cache.get("shared", "water", np.arange(24) * 9, 2000)
+
+    asyncio.run(plot_for_many_users())
+    assert len(cache._entries) == 2  # pylint: disable=protected-access
+    assert set(cache._user_keys) == {"8", "9", "shared"}  # pylint: disable=protected-access
+    cache.invalidate("9")
+    assert set(cache._user_keys) == {"8"}  # pylint: disable=protected-access
+    assert set(cache._key_users) == set(cache._entries)  # pylint: disable=protected-access
+
+
+def test_chart_cache_owner_cancel_keeps_waiters(monkeypatch):
+    renders = []
+
+    async def render(func, *args):
+        renders.append(args)
+        await asyncio.sleep(0.05)
+        return b"png"
+
+    monkeypatch.setattr(plots.render_pool, "render", render)
+    cache = plots.ChartCache()
+    balance = np.arange(24)
+
+    async def scenario():
+        owner = asyncio.create_task(cache.get("1", "water", balance, 2000))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get("2", "water", balance, 2000))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        image = await waiter
+        assert owner.cancelled()
+        return image
+
+    assert asyncio.run(scenario()) == b"png"
+    assert len(renders) == 1
+    assert set(cache._user_keys) == {"2"}  # pylint: disable=protected-access
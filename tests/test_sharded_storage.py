@@ -0,0 +1,68 @@
+import json
+from datetime import datetime
+
+from core.tools.storage import ShardedBackend
+from core.tools.storage.migrate import migrate
+from core.tools.users import User
+
+
+def make_user(telegram_id: int = 1, weight: int = 70) -> User:
+    return User(telegram_id=telegram_id, weight=weight, height=180, age=30, activity=30, city="Москва")
+
+
+def test_round_trip(tmp_path):
+    backend = ShardedBackend(str(tmp_path))
+    user = make_user()
+    user.record('logged_water', 250, datetime(2026, 10, 1, 9))
+    user.record('logged_calories', 600, datetime(2026, 10, 2, 13))
+    user.water_goal = 2000
+    backend.save(user)
+
+    assert User.model_validate(backend.load("1")) == user
+    assert backend.load("2") is None
+    partial = User.model_validate(backend.load_days("1", ["2026-10-02"]))
+    assert partial.days.dates == ["2026-10-02"]
+    assert partial.day_totals("2026-10-02")['logged_calories'] == 600
+    # Файл лежит в дереве каталогов по хэшу и без временных файлов
+    assert [path.relative_to(tmp_path).parts[-1] for path in tmp_path.rglob("*") if path.is_file()] == ["1.user"]
+
+
+def test_save_days_keeps_other_days(tmp_path):
+    backend = ShardedBackend(str(tmp_path))
+    user = make_user()
+    user.record('logged_water', 250, datetime(2026, 10, 1, 9))
+    backend.save(user)
+
+    partial = make_user(weight=72)
+    partial._days_loaded = ("2026-10-02",)  # pylint: disable=protected-access
+    partial.record('logged_water', 500, datetime(2026, 10, 2, 10))
+    backend.save_days(partial)
+    backend.save_days(make_user(2))
+
+    stored = User.model_validate(backend.load("1"))
+    assert stored.weight == 72
+    assert stored.days.dates == ["2026-10-01", "2026-10-02"]
+    assert stored.day_totals("2026-10-01")['logged_water'] == 250
+    assert stored.day_totals("2026-10-02")['logged_water'] == 500
+    assert User.model_validate(backend.load("2")).days.dates == []
+
+
+def test_migrate_from_json(tmp_path):
+    water = [0] * 24
+    water[9] = 250
+    legacy = {
+        str(telegram_id): {
+            "telegram_id": telegram_id, "weight": 70, "height": 180, "age": 30, "activity": 30,
+            "city": "Moscow", "logged_water": {"2024-05-01": water}, "logged_calories": {},
+            "burned_calories": {}, "burned_water": {},
+        }
+        for telegram_id in range(1, 21)
+    }
+    source = tmp_path / "users.json"
+    source.write_text(json.dumps(legacy), encoding="utf-8")
+
+    assert migrate(str(source), str(tmp_path / "users"), "sharded") == 20
+    backend = ShardedBackend(str(tmp_path / "users"))
+    for telegram_id in legacy:
+        user = User.model_validate(backend.load(telegram_id))
+        assert user.day_totals("2024-05-01")['logged_water'] == 250
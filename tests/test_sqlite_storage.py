@@ -0,0 +1,62 @@
+import json
+import sqlite3
+
+from core.tools.storage import SqliteBackend
+from core.tools.users import User
+
+
+def create_v1_database(path: str) -> None:
+    """
+    Создает базу в схеме первой версии: ряды дня в колонках с JSON-списками.
+    """
+    conn = sqlite3.connect(path)
+    conn.executescript("""
+        CREATE TABLE users (
+            telegram_id INTEGER PRIMARY KEY, weight INTEGER NOT NULL, height INTEGER NOT NULL,
+            age INTEGER NOT NULL, activity INTEGER NOT NULL, city TEXT NOT NULL
+        );
+        CREATE TABLE user_days (
+            telegram_id INTEGER NOT NULL, day TEXT NOT NULL,
+            logged_water TEXT NOT NULL, logged_calories TEXT NOT NULL,
+            burned_calories TEXT NOT NULL, burned_water TEXT NOT NULL,
+            PRIMARY KEY (telegram_id, day)
+        ) WITHOUT ROWID;
+    """)
+    conn.execute("INSERT INTO users VALUES (5, 70, 180, 30, 30, 'Moscow')")
+    water = [0] * 24
+    water[9] = 250
+    calories = [0] * 24
+    calories[13] = 600
+    conn.execute(
+        "INSERT INTO user_days VALUES (5, '2024-05-01', ?, ?, ?, ?)",
+        (json.dumps(water), json.dumps(calories), json.dumps([0] * 24), json.dumps([0] * 24)),
+    )
+    conn.commit()
+    conn.close()
+
+
+def test_v1_database_is_converted(tmp_path):
+    path = str(tmp_path / "users.sqlite3")
+    create_v1_database(path)
+    backend = SqliteBackend(path)
+    user = User.model_validate(backend.load("5"))
+    assert user.day_totals("2024-05-01") == {
+        'logged_water': 250, 'logged_calories': 600, 'burned_calories': 0, 'burned_water': 0,
+    }
+    assert user.logged_water["2024-05-01"][9] == 250
+    assert user.goals_day is None
+    backend.close()
+
+    # Повторное открытие не конвертирует базу заново
+    backend = SqliteBackend(path)
+    assert User.model_validate(backend.load("5")).day_totals("2024-05-01")['logged_calories'] == 600
+    backend.close()
+
+
+def test_new_database_has_current_schema(tmp_path):
+    path = str(tmp_path / "users.sqlite3")
+    SqliteBackend(path).close()
+    conn = sqlite3.connect(path)
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == 2
+    assert "hours" in {row[1] for row in conn.execute("PRAGMA table_info(user_days)")}
+    conn.close()
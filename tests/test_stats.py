@@ -0,0 +1,107 @@
+import asyncio
+from datetime import date, datetime, timedelta
+
+import numpy as np
+import pytest
+
+from core.tools.day_series import DaySeries
+from core.tools.settings import settings
+from core.tools.stats import build_report
+from core.tools.storage.archive import ArchiveStore
+from core.tools.users import User, UserStorage
+
+WATER_GOAL = 1000
+CALORIE_GOAL = 2000
+TODAY = date(2024, 3, 10)
+
+
+def water_series(amounts) -> DaySeries:
+    """
+    Ряды, в которых за день i до TODAY (последний элемент — TODAY) выпито amounts[i] мл в 9 часов.
+    """
+    series = DaySeries()
+    for offset, amount in enumerate(reversed(amounts)):
+        if amount:
+            series.record(str(TODAY - timedelta(days=offset)), 'logged_water', 9, amount)
+    return series
+
+
+def week_report(series: DaySeries):
+    return build_report(series, TODAY - timedelta(days=6), 7, WATER_GOAL, CALORIE_GOAL)
+
+
+@pytest.mark.parametrize("amounts, streak", [
+    # Сегодня норма еще не выполнена: серия заканчивается вчера
+    ([0, 1000, 0, 1000, 1000, 1000, 0], (3, 3)),
+    # Сегодня норма выполнена: серия включает сегодня
+    ([0, 1000, 0, 1000, 1000, 1000, 1500], (4, 4)),
+    # Пропущены и вчера, и сегодня: текущей серии нет
+    ([1000, 1000, 1000, 0, 1000, 0, 0], (0, 3)),
+    ([1000] * 7, (7, 7)),
+])
+def test_current_and_best_streak(amounts, streak):
+    report = week_report(water_series(amounts))
+
+    assert report.water_streak == streak
+    assert report.water_hits.tolist() == [amount >= WATER_GOAL for amount in amounts]
+
+
+def test_empty_history():
+    report = week_report(DaySeries())
+
+    assert report.active_days == 0
+    assert report.water_streak == (0, 0) and report.calorie_streak == (0, 0)
+    assert not report.water_hits.any() and not report.calorie_hits.any()
+    assert not report.averages.any()
+    assert report.water_heatmap.shape == (7, 24) and not report.water_heatmap.any()
+    assert report.labels == ['04.03', '05.03', '06.03', '07.03', '08.03', '09.03', '10.03']
+
+
+def test_goal_hits_and_heatmap():
+    series = water_series([0, 0, 0, 0, 0, 1000, 1000])
+    yesterday, today = str(TODAY - timedelta(days=1)), str(TODAY)
+    # Вода, потерянная на тренировке, добавляется к норме
+    series.record(today, 'burned_water', 18, 500)
+    series.record(yesterday, 'logged_calories', 13, 2500)
+    series.record(yesterday, 'burned_calories', 18, 600)
+    series.record(today, 'logged_calories', 8, 2100)
+    # Дни вне периода не попадают в отчет
+    series.record(str(TODAY + timedelta(days=1)), 'logged_water', 9, 5000)
+    series.record(str(TODAY - timedelta(days=7)), 'logged_water', 9, 5000)
+
+    report = week_report(series)
+
+    assert report.active_days == 2
+    assert report.water_hits.tolist() == [False] * 5 + [True, False]
+    # Баланс вчера 1900 ккал, сегодня 2100; дни без записей не считаются выполненными
+    assert report.daily_balance.tolist() == [0] * 5 + [1900, 2100]
+    assert report.calorie_hits.tolist() == [False] * 5 + [True, False]
+    # Сегодня норма калорий превышена, но день не закончился: серия заканчивается вчера
+    assert report.calorie_streak == (1, 1)
+    assert report.water_heatmap[5, 9] == 1000 and report.water_heatmap.sum() == 2000
+    assert report.calorie_heatmap[5, 13] == 2500 and report.calorie_heatmap[6, 8] == 2100
+    assert report.averages[0] == 1000
+
+
+def test_report_spans_archived_days(storage, tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "history_hot_days", 10)
+    archive = ArchiveStore(str(tmp_path / "archive"))
+    monkeypatch.setattr(UserStorage, "_archive", archive)
+    monkeypatch.setattr(UserStorage, "_archived_day", None)
+    today = date.today()
+    user = User(telegram_id=1, weight=70, height=180, age=30, activity=30, city="Moscow")
+    for offset in range(40):
+        when = datetime.combine(today - timedelta(days=offset), datetime.min.time()).replace(hour=9)
+        # Норма воды выполнена во все дни, кроме 15-го дня назад
+        user.record('logged_water', 500 if offset == 15 else WATER_GOAL, when)
+    storage.put_user(user)
+    assert len(storage.get_user("1").days) == 10
+
+    start = today - timedelta(days=29)
+    history = asyncio.run(storage.get_history("1", str(start), str(today)))
+    report = build_report(history, start, 30, WATER_GOAL, CALORIE_GOAL)
+
+    assert report.active_days == 30
+    assert np.flatnonzero(~report.water_hits).tolist() == [29 - 15]
+    assert report.water_streak == (15, 15)
+    assert report.daily_water.sum() == 29 * WATER_GOAL + 500
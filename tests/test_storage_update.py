@@ -0,0 +1,55 @@
+import asyncio
+from datetime import date, datetime
+
+from core.tools.users import User
+
+
+def make_user(telegram_id: str) -> User:
+    return User(telegram_id=int(telegram_id), weight=70, height=180, age=30, activity=30, city="Moscow")
+
+
+def test_concurrent_updates_lose_no_writes(any_storage):
+    ids = [str(telegram_id) for telegram_id in range(1, 6)]
+    today = str(date.today())
+    writes = 40
+
+    async def log_water(telegram_id: str, amount: int, partial: bool):
+        await any_storage.update(
+            telegram_id,
+            lambda user: user.record('logged_water', amount, datetime.now()),
+            default=lambda: make_user(telegram_id),
+            days=[today] if partial else None,
+        )
+
+    async def scenario():
+        # Полные и частичные записи одних и тех же пользователей вперемешку
+        await asyncio.gather(*(
+            log_water(telegram_id, 1, bool(write % 2))
+            for write in range(writes)
+            for telegram_id in ids
+        ))
+
+    asyncio.run(scenario())
+    for telegram_id in ids:
+        assert any_storage.get_user(telegram_id).day_totals(today)['logged_water'] == writes
+
+
+def test_flush_writes_batch_once(tmp_path):
+    from core.tools.storage import JsonFileBackend  # pylint: disable=import-outside-toplevel
+
+    backend = JsonFileBackend(str(tmp_path / "users.json"))
+    writes = []
+    write = backend._write  # pylint: disable=protected-access
+
+    def counting_write(users):
+        writes.append(len(users))
+        write(users)
+
+    backend._write = counting_write  # pylint: disable=protected-access
+    backend.save_many([make_user(str(telegram_id)) for telegram_id in range(1, 11)])
+    partial = make_user("3")
+    partial._days_loaded = (str(date.today()),)  # pylint: disable=protected-access
+    partial.record('logged_water', 100)
+    backend.save_days_many([partial, make_user("11")])
+    assert writes == [10, 11]
+    assert not list(tmp_path.glob("*.tmp"))
@@ -0,0 +1,110 @@
+import time
+import asyncio
+
+from core.tools.openweathermap import WeatherCache
+
+WEATHER = {"main": {"temp": 20}}
+
+
+class Upstream:
+    """
+    Заглушка API погоды, считающая запросы.
+    """
+
+    def __init__(self, status: int = 200, result=WEATHER, delay: float = 0):
+        self.status = status
+        self.result = result
+        self.delay = delay
+        self.calls = 0
+
+    async def fetch(self):
+        self.calls += 1
+        await asyncio.sleep(self.delay)
+        return self.status, self.result
+
+
+def test_hit_and_miss():
+    cache = WeatherCache(ttl=60)
+    upstream = Upstream()
+
+    async def scenario():
+        first = await cache.get("Moscow", upstream.fetch)
+        second = await cache.get(" moscow ", upstream.fetch)
+        return first, second
+
+    assert asyncio.run(scenario()) == (WEATHER, WEATHER)
+    assert upstream.calls == 1
+    assert (cache.hits, cache.misses) == (1, 1)
+
+
+def test_server_error_is_not_cached():
+    cache = WeatherCache(ttl=60)
+    upstream = Upstream(status=500, result="error")
+
+    async def scenario():
+        await cache.get("Moscow", upstream.fetch)
+        await cache.get("Moscow", upstream.fetch)
+
+    asyncio.run(scenario())
+    assert upstream.calls == 2
+
+
+def test_concurrent_requests_share_one_fetch():
+    cache = WeatherCache(ttl=60)
+    upstream = Upstream(delay=0.05)
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get("Moscow", upstream.fetch) for _ in range(10)))
+
+    assert asyncio.run(scenario()) == [WEATHER] * 10
+    assert upstream.calls == 1
+    assert (cache.hits, cache.misses) == (9, 1)
+
+
+def test_cancelled_owner_does_not_cancel_waiters():
+    cache = WeatherCache(ttl=60)
+    upstream = Upstream(delay=0.05)
+
+    async def scenario():
+        owner = asyncio.create_task(cache.get("Moscow", upstream.fetch))
+        await asyncio.sleep(0)
+        waiter = asyncio.create_task(cache.get("Moscow", upstream.fetch))
+        await asyncio.sleep(0.01)
+        owner.cancel()
+        result = await waiter
+        assert owner.cancelled()
+        return result
+
+    assert asyncio.run(scenario()) == WEATHER
+    assert upstream.calls == 1
+
+
+def test_fetch_error_reaches_every_waiter():
+    cache = WeatherCache(ttl=60)
+
+    async def fetch():
+        await asyncio.sleep(0.01)
+        raise ConnectionError("down")
+
+    async def scenario():
+        return await asyncio.gather(*(cache.get("Moscow", fetch) for _ in range(3)), return_exceptions=True)
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, ConnectionError) for result in results)
+
+
+def test_expired_entries_are_refetched_and_evicted():
+    cache = WeatherCache(ttl=0.05, negative_ttl=0.05)
+    upstream = Upstream()
+    unknown = Upstream(status=404, result="city not found")
+
+    async def scenario():
+        await cache.get("Moscow", upstream.fetch)
+        await cache.get("Atlantis", unknown.fetch)
+        assert await cache.get("Atlantis", unknown.fetch) == "city not found"
+        time.sleep(0.06)
+        await cache.get("Moscow", upstream.fetch)
+
+    asyncio.run(scenario())
+    assert (upstream.calls, unknown.calls) == (2, 1)
+    assert set(cache._entries) == {"moscow"}  # pylint: disable=protected-access
@@ -0,0 +1,98 @@
+import asyncio
+import json
+
+import pytest
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from core.tools.webhook import SECRET_HEADER, UpdateQueue, WebhookHandler
+
+SECRET = "secret"
+
+
+def make_update(update_id: int) -> dict:
+    user = {"id": 42, "is_bot": False, "first_name": "Test"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": 42, "type": "private"},
+            "from": user,
+            "text": "hi",
+        },
+    }
+
+
+def create_dispatcher(handled: list) -> Dispatcher:
+    router = Router()
+
+    @router.message()
+    async def handle(message: Message) -> None:
+        handled.append(message.message_id)
+
+    dispatcher = Dispatcher()
+    dispatcher.include_router(router)
+    return dispatcher
+
+
+async def post_updates(updates: UpdateQueue, requests) -> list:
+    """
+    Отправляет обработчику вебхука запросы (тело, заголовки) и возвращает коды ответов.
+    """
+    app = web.Application()
+    app.router.add_post("/webhook", WebhookHandler(updates, SECRET).handle)
+    statuses = []
+    async with TestClient(TestServer(app)) as client:
+        for body, headers in requests:
+            response = await client.post("/webhook", data=body, headers=headers)
+            statuses.append(response.status)
+    return statuses
+
+
+@pytest.mark.parametrize("headers", [{}, {SECRET_HEADER: "wrong"}])
+def test_wrong_or_missing_secret_is_rejected(headers):
+    handled = []
+
+    async def run() -> list:
+        updates = UpdateQueue(create_dispatcher(handled), Bot(token="123456:TEST"))
+        statuses = await post_updates(updates, [(json.dumps(make_update(1)), headers)])
+        assert updates.depth == 0 and updates.received == 0
+        await updates.bot.session.close()
+        return statuses
+
+    assert asyncio.run(run()) == [401]
+    assert handled == []
+
+
+def test_valid_update_is_accepted_and_handled():
+    handled = []
+
+    async def run() -> list:
+        updates = UpdateQueue(create_dispatcher(handled), Bot(token="123456:TEST"), workers=2)
+        updates.start()
+        statuses = await post_updates(updates, [
+            (json.dumps(make_update(number)), {SECRET_HEADER: SECRET}) for number in (1, 2, 3)
+        ])
+        await updates.stop()
+        await updates.bot.session.close()
+        return statuses
+
+    assert asyncio.run(run()) == [200, 200, 200]
+    assert sorted(handled) == [1, 2, 3]
+
+
+def test_full_queue_returns_503():
+    async def run() -> list:
+        # Воркеры не запущены, поэтому очередь из двух мест заполняется первыми обновлениями
+        updates = UpdateQueue(create_dispatcher([]), Bot(token="123456:TEST"), queue_size=2)
+        statuses = await post_updates(updates, [
+            (json.dumps(make_update(number)), {SECRET_HEADER: SECRET}) for number in (1, 2, 3)
+        ])
+        assert (updates.received, updates.rejected, updates.depth) == (2, 1, 2)
+        await updates.bot.session.close()
+        return statuses
+
+    assert asyncio.run(run()) == [200, 200, 503]
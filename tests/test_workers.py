@@ -0,0 +1,167 @@
+import asyncio
+import json
+import multiprocessing
+import re
+import threading
+import time
+from functools import partial
+from queue import Empty
+
+from aiogram import Bot, Dispatcher, Router
+from aiogram.types import Message
+from aiohttp import web
+from aiohttp.test_utils import TestClient, TestServer
+
+from core.tools.metrics import REGISTRY
+from core.tools.workers import (
+    AffinityRouter,
+    HashRing,
+    _receive_metrics,
+    start_workers,
+    stop_workers,
+    update_user_id,
+)
+
+
+def create_dispatcher(results) -> Dispatcher:
+    """
+    Диспетчер воркера, который сообщает, какой воркер обработал сообщение пользователя.
+    """
+    router = Router()
+
+    @router.message()
+    async def handle(message: Message, worker_index: int) -> None:
+        results.put((worker_index, message.from_user.id, message.message_id))
+
+    dispatcher = Dispatcher()
+    dispatcher.include_router(router)
+    return dispatcher
+
+
+def create_bot() -> Bot:
+    return Bot(token="123456:TEST")
+
+
+def make_update(update_id: int, user_id: int) -> dict:
+    user = {"id": user_id, "is_bot": False, "first_name": "Test"}
+    return {
+        "update_id": update_id,
+        "message": {
+            "message_id": update_id,
+            "date": 0,
+            "chat": {"id": user_id, "type": "private"},
+            "from": user,
+            "text": "hi",
+        },
+    }
+
+
+def test_hash_ring_is_stable_and_uses_all_nodes():
+    ring = HashRing(3)
+    assert [ring.node(user) for user in range(100)] == [HashRing(3).node(user) for user in range(100)]
+    assert {ring.node(user) for user in range(100)} == {0, 1, 2}
+
+
+def test_update_user_id():
+    assert update_user_id(make_update(1, 42)) == 42
+    assert update_user_id({"update_id": 5}) == 5
+
+
+def test_updates_of_one_user_reach_one_worker():
+    context = multiprocessing.get_context("spawn")
+    results = context.Queue()
+    metrics_queue = context.Queue()
+    receiver = threading.Thread(target=_receive_metrics, args=(metrics_queue,), daemon=True)
+    receiver.start()
+    queues, processes = start_workers(partial(create_dispatcher, results), create_bot, 3, metrics_queue)
+    users = list(range(1000, 1012))
+    updates = [make_update(number, users[number % len(users)]) for number in range(1, 61)]
+    router = AffinityRouter(queues, "secret")
+
+    async def feed() -> None:
+        app = web.Application()
+        app.router.add_post("/webhook", router.handle)
+        async with TestClient(TestServer(app)) as client:
+            response = await client.post("/webhook", data=b"{}", headers={
+                "X-Telegram-Bot-Api-Secret-Token": "wrong",
+            })
+            assert response.status == 401
+            for update in updates:
+                response = await client.post("/webhook", data=json.dumps(update), headers={
+                    "X-Telegram-Bot-Api-Secret-Token": "secret",
+                })
+                assert response.status == 200
+        await stop_workers(queues, processes)
+
+    try:
+        asyncio.run(feed())
+    finally:
+        for process in processes:
+            process.join(timeout=30)
+            if process.is_alive():
+                process.kill()
+    assert all(process.exitcode == 0 for process in processes)
+    metrics_queue.put(None)
+    receiver.join(timeout=30)
+
+    handled = []
+    while True:
+        try:
+            handled.append(results.get(timeout=1))
+        except Empty:
+            break
+    assert sorted(message_id for _, _, message_id in handled) == list(range(1, 61))
+    workers_by_user = {}
+    for worker, user, _ in handled:
+        workers_by_user.setdefault(user, set()).add(worker)
+    assert all(len(workers) == 1 for workers in workers_by_user.values())
+    assert {user: workers.pop() for user, workers in workers_by_user.items()} == {
+        user: router.ring.node(user) for user in users
+    }
+    assert len(set(router.ring.node(user) for user in users)) > 1
+
+    # Метрики воркеров доступны во внешнем процессе с меткой worker
+    accepted = {
+        worker: float(value)
+        for worker, value in re.findall(
+            r'^bot_update_queue_total\{result="accepted",worker="(\d+)"\} (\S+)$', REGISTRY.render(), re.M
+        )
+    }
+    assert set(accepted) == {"0", "1", "2"}
+    assert sum(accepted.values()) == 60
+    for worker, count in accepted.items():
+        assert count == sum(1 for _, user, _ in handled if router.ring.node(user) == int(worker))
+
+
+def test_stop_workers_does_not_block_loop_on_full_queue():
+    queue = multiprocessing.get_context("spawn").Queue(maxsize=1)
+    queue.put("update")
+    stopped = []
+
+    def drain() -> None:
+        # Воркер забирает принятое обновление не сразу
+        time.sleep(0.3)
+        stopped.append(queue.get(timeout=5))
+        stopped.append(queue.get(timeout=5))
+
+    async def run() -> int:
+        ticks = 0
+
+        async def tick() -> None:
+            nonlocal ticks
+            while True:
+                ticks += 1
+                await asyncio.sleep(0.01)
+
+        ticker = asyncio.create_task(tick())
+        await asyncio.wait_for(stop_workers([queue], []), timeout=5)
+        ticker.cancel()
+        return ticks
+
+    thread = threading.Thread(target=drain)
+    thread.start()
+    ticks = asyncio.run(run())
+    thread.join(timeout=5)
+    assert stopped == ["update", None]
+    # Пока очередь была заполнена, цикл событий продолжал работать
+    assert ticks > 10